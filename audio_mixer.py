@@ -5,29 +5,515 @@ Combines TTS narration with baseball sound effects (glove catches, bat hits, cro
 Uses user's custom sound effect organization with pitch speed-based selection
 """
 
-from pydub import AudioSegment
-from pydub.playback import play
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import copy
+import math
+import numpy as np
 import os
 import random
+from instrumentation import annotate, span, traced
+from sfx_cache import SAMPLE_DTYPES, SoundBank, SoundEffectCache
+from stem_cache import STEM_NAMES, StemCache
+
+# Frames rendered per pass over the plan (~1.4 s at 48 kHz)
+RENDER_BLOCK_FRAMES = 65536
+
+# Stems are stored wider than the output and left unclipped, so re-summing them
+# saturates exactly where a one-pass render would
+STEM_DTYPES = {1: np.int32, 2: np.int32, 4: np.int64}
+
+# Overlay mode: narration is ducked under sound effects louder than the threshold
+DUCK_GAIN_DB = -9
+DUCK_THRESHOLD_DBFS = -30
+DUCK_ATTACK_MS = 40
+DUCK_RELEASE_MS = 250
+
+# Sample format every asset is converted to before mixing
+AudioFormat = namedtuple('AudioFormat', ['frame_rate', 'channels', 'sample_width'])
+
+# One placement on the output timeline: `frames` frames of plan.sources[source],
+# starting at source frame `start`, written at output frame `offset`
+RenderOp = namedtuple('RenderOp', ['offset', 'source', 'start', 'frames', 'track'])
+
+
+def audio_format(segment):
+    """AudioFormat of an AudioSegment"""
+    return AudioFormat(segment.frame_rate, segment.channels, segment.sample_width)
+
+
+def describe_format(fmt):
+    return f"{fmt[0]} Hz/{fmt[1]} ch/{8 * fmt[2]}-bit"
+
+
+def segment_samples(segment):
+    """Zero-copy (frames, channels) view of an AudioSegment's samples"""
+    dtype = SAMPLE_DTYPES[segment.sample_width]
+    return np.frombuffer(segment.raw_data, dtype=dtype).reshape(-1, segment.channels)
+
+
+class RenderPlan:
+    """
+    Timeline of a mix: where every narration slice, sound effect and pause lands
+
+    Building the plan is cheap (no audio is touched); render_plan() then writes
+    the whole timeline into one preallocated sample buffer.
+    """
+
+    def __init__(self, frame_rate, channels, sample_width):
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.sources = {}       # name -> (frames, channels) sample array
+        self.ops = []           # RenderOps sorted by offset
+        self.envelopes = {}     # track -> GainEnvelope applied to that track's ops
+        self.event_offsets = [] # Output frame where each pitch event's sound starts
+        self.total_frames = 0
+
+    @property
+    def dtype(self):
+        return SAMPLE_DTYPES[self.sample_width]
+
+    def add_source(self, name, samples):
+        self.sources[name] = samples
+        return name
+
+    def append(self, source, start, frames, track):
+        """Place source frames at the end of the timeline"""
+        if frames > 0:
+            self.ops.append(RenderOp(self.total_frames, source, start, frames, track))
+            self.total_frames += frames
+
+    def append_silence(self, frames):
+        """Advance the timeline; the render buffer is already silent there"""
+        self.total_frames += max(0, frames)
+
+    def place(self, offset, source, start, frames, track):
+        """
+        Place source frames at a fixed output position, on top of whatever is there
+
+        Frames past the end of the timeline are dropped. Callers place ops in
+        offset order (or sort plan.ops afterwards).
+        """
+        frames = min(frames, self.total_frames - offset)
+        if frames > 0:
+            self.ops.append(RenderOp(offset, source, start, frames, track))
+
+    def to_segment(self, samples):
+        """Wrap rendered samples as an AudioSegment"""
+        from pydub import AudioSegment
+
+        return AudioSegment(
+            data=samples.tobytes(),
+            sample_width=self.sample_width,
+            frame_rate=self.frame_rate,
+            channels=self.channels
+        )
+
+
+class CrowdBed:
+    """
+    Looping crowd ambiance, generated block by block at any timeline position
+
+    The loop is gain-adjusted once (it is only a few seconds long) and tiled into
+    each block with modular indexing, so no broadcast-length crowd track is built.
+    """
+
+    def __init__(self, samples, gain_db=-15, frames=None, phase_offset=0):
+        """
+        Args:
+            samples: (frames, channels) crowd loop, already in the mix's format
+            gain_db: Level relative to the source (-15 dB so it doesn't overpower narration)
+            frames: Timeline length the bed covers (None = unlimited)
+            phase_offset: Broadcast position of timeline frame 0, for rendering one
+                piece of a longer broadcast with the loop continuing seamlessly
+        """
+        factor = 10 ** (gain_db / 20.0)
+        # Same rounding as pydub's gain (audioop.mul floors)
+        self.loop = np.floor(np.asarray(samples, dtype=np.float64) * factor).astype(np.int64)
+        self.frames = frames
+        self.phase_offset = phase_offset
+
+    def at_offset(self, phase_offset):
+        """The same bed for a timeline starting phase_offset frames into the broadcast"""
+        bed = copy.copy(self)
+        bed.phase_offset = phase_offset
+        return bed
+
+    def add_to(self, block, start):
+        """Add the bed for timeline frames [start, start + len(block)) into a wide block"""
+        end = start + len(block)
+        if self.frames is not None:
+            end = min(end, self.frames)
+        if end <= start or not len(self.loop):
+            return
+        # Global position modulo the loop length is the phase, so any block lines up
+        loop_frames = len(self.loop)
+        written = 0
+        while start + written < end:
+            phase = (start + written + self.phase_offset) % loop_frames
+            count = min(loop_frames - phase, end - start - written)
+            block[written:written + count] += self.loop[phase:phase + count]
+            written += count
+
+
+class GainEnvelope:
+    """
+    Piecewise-linear gain over timeline frames
+
+    Stored as breakpoints only and evaluated per render block with np.interp,
+    so no broadcast-length gain curve is ever built.
+    """
+
+    def __init__(self, frames, gains):
+        """
+        Args:
+            frames: Non-decreasing breakpoint positions (timeline frames)
+            gains: Linear gain at each breakpoint (held flat before the first and after the last)
+        """
+        self.frames = np.asarray(frames, dtype=np.float64)
+        self.gains = np.asarray(gains, dtype=np.float64)
+
+    def evaluate(self, start, end):
+        """Gains for frames [start, end), or None where the envelope is flat at unity"""
+        if not len(self.frames):
+            return None
+        first = np.searchsorted(self.frames, start, side='right')
+        last = np.searchsorted(self.frames, end, side='left')
+        if first == last:
+            # No breakpoint inside the range - gain runs straight between the neighbours
+            left = self.gains[max(first - 1, 0)]
+            right = self.gains[min(first, len(self.gains) - 1)]
+            if left == 1.0 and right == 1.0:
+                return None
+        return np.interp(np.arange(start, end), self.frames, self.gains)
+
+
+def ducking_envelope(spans, gain_db=DUCK_GAIN_DB, attack_frames=0, release_frames=0):
+    """
+    Envelope that dips to gain_db over each (start, end) frame span
+
+    The gain ramps down over attack_frames before a span and back up over
+    release_frames after it. Spans whose ramps would overlap are merged so
+    the narration stays ducked between closely spaced effects.
+    """
+    gain = 10 ** (gain_db / 20.0)
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start - attack_frames <= merged[-1][1] + release_frames:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    frames = []
+    gains = []
+    for start, end in merged:
+        frames += [start - attack_frames, start, end, end + release_frames]
+        gains += [1.0, gain, gain, 1.0]
+    return GainEnvelope(frames, gains)
+
+
+def samples_dbfs(samples, sample_width):
+    """Loudness of samples in dBFS, computed like pydub's AudioSegment.dBFS"""
+    rms = int(math.sqrt(np.square(samples, dtype=np.float64).sum() / samples.size)) if samples.size else 0
+    if not rms:
+        return -float('inf')
+    return 20 * math.log(rms / (2 ** (8 * sample_width) / 2), 10)  # math.log, as pydub, to the last bit
+
+
+def pydub_overlay_frames(frames, frame_rate):
+    """
+    Frames pydub's original crowd overlay covered for audio of this length
+
+    The looped crowd was trimmed to len(audio) in whole milliseconds, which can
+    fall a frame short of the audio itself.
+    """
+    length_ms = round(1000 * (frames / frame_rate))
+    return min(frames, int(length_ms * (frame_rate / 1000.0)))
+
+
+def mix_crowd_into(buffer, bed, start=0, block_frames=RENDER_BLOCK_FRAMES):
+    """
+    Mix a crowd bed into an existing sample buffer in place, block by block
+
+    Args:
+        buffer: (frames, channels) samples, modified in place
+        bed: CrowdBed to add
+        start: Timeline position of buffer[0] (sets the loop phase)
+        block_frames: Frames mixed per block
+    """
+    limits = np.iinfo(buffer.dtype)
+    for block_start in range(0, len(buffer), block_frames):
+        view = buffer[block_start:block_start + block_frames]
+        block = view.astype(np.int64)
+        bed.add_to(block, start + block_start)
+        np.clip(block, limits.min, limits.max, out=block)
+        view[:] = block
+    return buffer
+
+
+def render_plan(plan, out=None, start=0, frames=None, block_frames=RENDER_BLOCK_FRAMES, crowd=None,
+                tracks=None):
+    """
+    Render a window of the plan in a single pass, block by block
+
+    Ops overlapping each block are summed in a wide scratch buffer and clipped
+    into the output (to the limits of out's dtype), so the cost is linear in
+    output length and overlapping sounds saturate exactly like pydub's overlay.
+
+    Args:
+        plan: RenderPlan to render
+        out: Preallocated (frames, channels) buffer to fill (allocated in the plan's
+            format if None; a wider dtype, as for stems, keeps the sums unclipped)
+        start: First output frame of the window
+        frames: Window length (defaults to the rest of the plan)
+        block_frames: Frames mixed per block
+        crowd: Optional CrowdBed mixed in under everything (never enveloped)
+        tracks: Only render ops on these tracks (None = all), e.g. to render a stem
+
+    Returns:
+        The filled output buffer
+    """
+    if frames is None:
+        frames = plan.total_frames - start
+    if out is None:
+        out = np.zeros((frames, plan.channels), dtype=plan.dtype)
+
+    limits = np.iinfo(out.dtype)
+    scratch = np.empty((block_frames, plan.channels), dtype=np.int64)
+    ops = plan.ops
+    if tracks is not None:
+        ops = [op for op in ops if op.track in tracks]
+    next_op = 0
+    active = []
+
+    for block_start in range(start, start + frames, block_frames):
+        block_end = min(block_start + block_frames, start + frames)
+        block = scratch[:block_end - block_start]
+        block.fill(0)
+
+        # Sweep: pick up ops that have started, drop ops that have finished
+        while next_op < len(ops) and ops[next_op].offset < block_end:
+            active.append(ops[next_op])
+            next_op += 1
+        active = [op for op in active if op.offset + op.frames > block_start]
+
+        for op in active:
+            lo = max(op.offset, block_start)
+            hi = min(op.offset + op.frames, block_end)
+            if lo >= hi:
+                continue
+            source_start = op.start + (lo - op.offset)
+            samples = plan.sources[op.source][source_start:source_start + (hi - lo)]
+            envelope = plan.envelopes.get(op.track)
+            gains = envelope.evaluate(lo, hi) if envelope is not None else None
+            if gains is not None:
+                samples = np.floor(samples * gains[:, None]).astype(np.int64)
+            block[lo - block_start:hi - block_start] += samples
+
+        if crowd is not None:
+            crowd.add_to(block, block_start)
+
+        np.clip(block, limits.min, limits.max, out=block)
+        out[block_start - start:block_end - start] = block
+
+    return out
+
+
+def _share_array(array):
+    """Copy an array into a new shared memory block; returns (block, spec to attach by)"""
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach_array(spec):
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _render_window(job):
+    """Worker: render one window of a plan straight into the shared output buffer"""
+    plan, source_specs, out_spec, start, frames, crowd = job
+    blocks = []
+    try:
+        for name, spec in source_specs.items():
+            block, plan.sources[name] = _attach_array(spec)
+            blocks.append(block)
+        block, out = _attach_array(out_spec)
+        blocks.append(block)
+        render_plan(plan, out=out[start:start + frames], start=start, frames=frames, crowd=crowd)
+        del out
+        plan.sources.clear()
+    finally:
+        for block in blocks:
+            block.close()
+    return frames
+
+
+def split_windows(total_frames, boundaries):
+    """(start, frames) windows covering [0, total_frames), cut at the given frames"""
+    cuts = sorted({cut for cut in boundaries if 0 < cut < total_frames})
+    edges = [0] + cuts + [total_frames]
+    return [(start, end - start) for start, end in zip(edges, edges[1:]) if end > start]
+
+
+def render_plan_parallel(plan, windows, max_workers=None, crowd=None):
+    """
+    Render plan windows in a process pool and join them into one buffer
+
+    Sources and the output live in shared memory, so workers read the same
+    narration and sound effects without copies and write their window in
+    place. Every sample depends only on its timeline position (the crowd
+    loop's phase included), so the windows join sample-for-sample with no
+    seams - the result is identical to render_plan(plan).
+
+    Args:
+        plan: RenderPlan to render
+        windows: (start, frames) windows covering the plan, e.g. from split_windows
+        max_workers: Worker processes (defaults to the CPU count)
+        crowd: Optional CrowdBed mixed in under everything
+
+    Returns:
+        (frames, channels) rendered samples
+    """
+    shared = []
+    try:
+        source_specs = {}
+        for name, samples in plan.sources.items():
+            block, source_specs[name] = _share_array(np.ascontiguousarray(samples))
+            shared.append(block)
+        out_block, out_spec = _share_array(np.zeros((plan.total_frames, plan.channels), dtype=plan.dtype))
+        shared.append(out_block)
+
+        jobs = []
+        for start, frames in windows:
+            # Each worker gets only the ops it touches, not the audio
+            window_plan = copy.copy(plan)
+            window_plan.sources = {}
+            window_plan.ops = [op for op in plan.ops
+                               if op.offset < start + frames and op.offset + op.frames > start]
+            jobs.append((window_plan, source_specs, out_spec, start, frames, crowd))
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(_render_window, jobs))
+
+        return np.ndarray((plan.total_frames, plan.channels), dtype=plan.dtype, buffer=out_block.buf).copy()
+    finally:
+        for block in shared:
+            block.close()
+            block.unlink()
+
+
+def mix_stems(stems, gains_db=None, crowd=None, block_frames=RENDER_BLOCK_FRAMES, dtype=None):
+    """
+    Weighted sum of rendered stems, block by block
+
+    Stems at 0 dB are added as-is and the sum is clipped only once, so a remix
+    of unclipped stems (see render_stems) at unity gain is sample-identical to
+    rendering the plan in one pass.
+
+    Args:
+        stems: dict of stem name -> (frames, channels) samples, all the same shape and dtype
+        gains_db: dict of stem name -> gain in dB (missing = 0 dB, None = muted)
+        crowd: Optional CrowdBed mixed in under everything
+        block_frames: Frames mixed per block
+        dtype: Output sample dtype (defaults to the stems')
+
+    Returns:
+        (frames, channels) mixed samples, clipped to dtype
+    """
+    gains_db = gains_db or {}
+    first = next(iter(stems.values()))
+    dtype = dtype or first.dtype
+    out = np.empty(first.shape, dtype=dtype)
+    limits = np.iinfo(dtype)
+    scratch = np.empty((block_frames, first.shape[1]), dtype=np.int64)
+
+    factors = {}
+    for name in stems:
+        gain_db = gains_db.get(name, 0.0)
+        if gain_db is not None:
+            factors[name] = 10 ** (gain_db / 20.0)
+
+    for block_start in range(0, len(first), block_frames):
+        block_end = min(block_start + block_frames, len(first))
+        block = scratch[:block_end - block_start]
+        block.fill(0)
+        for name, factor in factors.items():
+            samples = stems[name][block_start:block_end]
+            if factor == 1.0:
+                block += samples
+            else:
+                block += np.floor(samples * factor).astype(np.int64)
+        if crowd is not None:
+            crowd.add_to(block, block_start)
+        np.clip(block, limits.min, limits.max, out=block)
+        out[block_start:block_end] = block
+
+    return out
+
+
+def _pydub_slice_frames(segment, start_ms, end_ms):
+    """
+    Frame range and trailing padding of pydub's segment[start_ms:end_ms]
+
+    Mirrors AudioSegment.__getitem__ so planned slices match pydub sample for sample.
+    """
+    length_ms = len(segment)
+    start_ms = min(start_ms, length_ms)
+    end_ms = min(end_ms, length_ms)
+    start = int(segment.frame_count(ms=start_ms))
+    end = int(segment.frame_count(ms=end_ms))
+    if end <= start:
+        return start, 0, 0
+    available = max(0, min(end, int(segment.frame_count())) - start)
+    return start, available, (end - start) - available
 
 class BaseballAudioMixer:
     """Mixes TTS narration with baseball sound effects"""
 
-    def __init__(self, sound_effects_dir="sound_effects", enable_background_crowd=True):
+    def __init__(self, sound_effects_dir="sound_effects", enable_background_crowd=True,
+                 frame_rate=24000, channels=1, sample_width=2, cache_dir=None, stem_cache_dir=None,
+                 render_workers=1):
         """
         Initialize mixer with sound effects directory
 
         Args:
             sound_effects_dir: Directory containing sound effect folders
             enable_background_crowd: Whether to mix in continuous crowd ambiance
+            frame_rate: Output sample rate (OpenAI narration is 24 kHz)
+            channels: Output channel count (narration is mono)
+            sample_width: Output bytes per sample
+            cache_dir: Decoded PCM cache (defaults to <sound_effects_dir>/.pcm_cache)
+            stem_cache_dir: Keep rendered narration/SFX stems here so re-mixing with
+                other levels or crowd settings skips re-rendering (None = off)
+            render_workers: Processes rendering half-innings in parallel (1 = render in-process)
+
+        Every asset - sound effects, crowd loop, narration - is converted to this
+        one output format once, as it is loaded, so mixing never resamples.
         """
         self.sound_effects_dir = sound_effects_dir
         self.enable_background_crowd = enable_background_crowd
-        self.sounds = {}
+        self.format = AudioFormat(frame_rate, channels, sample_width)
+        self.conversions = {}   # asset name -> AudioFormat it arrived in
+        self.sfx_cache = SoundEffectCache(sound_effects_dir, cache_dir=cache_dir, frame_rate=frame_rate,
+                                          channels=channels, sample_width=sample_width)
+        self._sound_files = {}
+        self.sounds = SoundBank(self.sfx_cache, self._sound_files)
+        self.stem_cache = StemCache(stem_cache_dir) if stem_cache_dir else None
+        self.render_workers = render_workers
         self._load_sound_effects()
 
     def _load_sound_effects(self):
-        """Load all sound effects from user's folder structure"""
+        """
+        Find all sound effects in user's folder structure
+
+        Files are only located here; each one is read from the decoded PCM cache
+        (or decoded into it) the first time the mix uses it.
+        """
         if not os.path.exists(self.sound_effects_dir):
             print(f"⚠️  Sound effects directory not found: {self.sound_effects_dir}")
             print(f"   Sound effects will be skipped.")
@@ -47,7 +533,7 @@ class BaseballAudioMixer:
         #     any hit or homerun.mp3
         #     normal croud sound.mp3
 
-        print("🔊 Loading sound effects...")
+        print("🔊 Finding sound effects...")
 
         # Catching ball sounds
         catching_dir = os.path.join(self.sound_effects_dir, "catching ball")
@@ -66,27 +552,100 @@ class BaseballAudioMixer:
         self._load_file(reaction_dir, "any hit or homerun.mp3", "hit_reaction")
         self._load_file(reaction_dir, "normal croud sound.mp3", "crowd_ambient")
 
-        print(f"\n✅ Loaded {len(self.sounds)} sound effects")
+        self.sounds = SoundBank(self.sfx_cache, self._sound_files)
+        print(f"\n✅ Found {len(self.sounds)} sound effects (decoded on first use)")
+
+    def preload_sounds(self):
+        """
+        Decode every sound effect now instead of on first use
+
+        For long-lived processes (broadcast_daemon.py), so no broadcast pays for it.
+
+        Returns:
+            Number of sounds loaded
+        """
+        return sum(1 for key in self.sounds.files if self.sounds.get_samples(key) is not None)
 
     def _load_file(self, directory, filename, key):
-        """Helper to load a single sound file"""
+        """Helper to register a single sound file"""
         filepath = os.path.join(directory, filename)
         if os.path.exists(filepath):
-            try:
-                self.sounds[key] = AudioSegment.from_mp3(filepath)
-                print(f"   ✅ {key}: {filename}")
-            except Exception as e:
-                print(f"   ⚠️  Failed to load {filename}: {e}")
+            self._sound_files[key] = filepath
+            print(f"   ✅ {key}: {filename}")
         else:
             print(f"   ⚠️  Not found: {filepath}")
 
     def create_silence(self, duration_ms):
-        """Create silent audio segment"""
-        return AudioSegment.silent(duration=duration_ms)
+        """Create silent audio segment in the output format"""
+        from pydub import AudioSegment
 
-    def get_catching_sound(self, pitch_type, speed):
+        silence = AudioSegment.silent(duration=duration_ms, frame_rate=self.format.frame_rate)
+        return silence.set_channels(self.format.channels).set_sample_width(self.format.sample_width)
+
+    def conform(self, segment, name):
         """
-        Get appropriate catching sound based on pitch type and speed
+        Convert an asset to the output format, recording it if it needed conversion
+
+        Args:
+            segment: AudioSegment to convert
+            name: Asset name for the conversion report
+
+        Returns:
+            AudioSegment in self.format (the same object if it already was)
+        """
+        source = audio_format(segment)
+        if source == self.format:
+            return segment
+        self.conversions[name] = source
+        return (segment.set_channels(self.format.channels)
+                       .set_frame_rate(self.format.frame_rate)
+                       .set_sample_width(self.format.sample_width))
+
+    def conversion_report(self):
+        """
+        Assets that arrived in a different format than the output format
+
+        Returns:
+            dict of asset name -> AudioFormat it was converted from. Sound effects
+            are listed once they have been decoded into the PCM cache.
+        """
+        report = {}
+        for key, path in self._sound_files.items():
+            source = self.sfx_cache.source_format(path)
+            if source is not None and tuple(source) != self.format:
+                report[key] = AudioFormat(*source)
+        report.update(self.conversions)
+        return report
+
+    def print_conversion_report(self):
+        report = self.conversion_report()
+        if not report:
+            return
+        print(f"🔄 Converted to {describe_format(self.format)} once at load:")
+        for name, source in sorted(report.items()):
+            print(f"   • {name} (was {describe_format(source)})")
+
+    def sound_samples(self, key):
+        """
+        A sound effect's (frames, channels) samples in the output format
+
+        Sounds from the PCM cache come straight from their memory map, so mixing
+        never builds (or copies into) an AudioSegment.
+
+        Returns:
+            Sample array, or None if the sound is missing or failed to load
+        """
+        if isinstance(self.sounds, SoundBank):
+            return self.sounds.get_samples(key)
+        segment = self.sounds.get(key)  # Plain dict of AudioSegments
+        return None if segment is None else segment_samples(self.conform(segment, key))
+
+    def has_sound(self, key):
+        return self.sound_samples(key) is not None
+
+    def catching_sound_key(self, pitch_type, speed):
+        """
+        Key of the catching sound for a pitch type and speed
 
         Rules:
         - fastball.mp3: four-seam fastball, sinker (>93 mph), cutter (>94 mph), any pitch >95 mph
@@ -97,32 +656,36 @@ class BaseballAudioMixer:
             speed: Pitch speed in MPH
 
         Returns:
-            AudioSegment or None
+            'catch_fastball' or 'catch_slowball'
         """
         pitch_lower = pitch_type.lower() if pitch_type else ""
 
         # Rule 1: Four-seam fastball always uses fastball sound
         if "fastball" in pitch_lower and "seam" not in pitch_lower:
-            return self.sounds.get('catch_fastball')
+            return 'catch_fastball'
 
         # Rule 2: Sinker > 93 mph uses fastball sound
         if "sinker" in pitch_lower and speed > 93:
-            return self.sounds.get('catch_fastball')
+            return 'catch_fastball'
 
         # Rule 3: Cutter > 94 mph uses fastball sound
         if "cutter" in pitch_lower and speed > 94:
-            return self.sounds.get('catch_fastball')
+            return 'catch_fastball'
 
         # Rule 4: Any pitch > 95 mph uses fastball sound
         if speed > 95:
-            return self.sounds.get('catch_fastball')
+            return 'catch_fastball'
 
         # All other pitches use slowball sound
-        return self.sounds.get('catch_slowball')
+        return 'catch_slowball'
 
-    def get_hitting_sound(self, at_bat_event):
+    def get_catching_sound(self, pitch_type, speed):
+        """AudioSegment (or None) of the catching sound, see catching_sound_key"""
+        return self.sounds.get(self.catching_sound_key(pitch_type, speed))
+
+    def hitting_sound_key(self, at_bat_event, rng=None):
         """
-        Get appropriate hitting sound based on at-bat outcome
+        Key of the hitting sound for an at-bat outcome
 
         Rules:
         - Home run: bat1.mp3
@@ -131,34 +694,35 @@ class BaseballAudioMixer:
 
         Args:
             at_bat_event: At-bat outcome (e.g., "Home Run", "Single", "Bunt")
+            rng: random.Random for the bat choice (defaults to the random module)
 
         Returns:
-            AudioSegment or None
+            Sound key, or None when no bat sound is available
         """
-        if not at_bat_event:
-            # Random bat sound for generic hits
-            bat_sounds = [self.sounds.get('bat1'), self.sounds.get('bat2'), self.sounds.get('bat3')]
-            bat_sounds = [s for s in bat_sounds if s is not None]
-            return random.choice(bat_sounds) if bat_sounds else None
+        rng = rng or random
+        if at_bat_event:
+            event_lower = at_bat_event.lower()
 
-        event_lower = at_bat_event.lower()
+            # Home run always uses bat1
+            if "home run" in event_lower or "homerun" in event_lower:
+                return 'bat1'
 
-        # Home run always uses bat1
-        if "home run" in event_lower or "homerun" in event_lower:
-            return self.sounds.get('bat1')
+            # Bunt uses bunt sound
+            if "bunt" in event_lower:
+                return 'bunt'
 
-        # Bunt uses bunt sound
-        if "bunt" in event_lower:
-            return self.sounds.get('bunt')
+        # Generic or any other hit: random bat sound
+        bat_sounds = [key for key in ('bat1', 'bat2', 'bat3') if self.has_sound(key)]
+        return rng.choice(bat_sounds) if bat_sounds else None
 
-        # Any other hit: random bat sound
-        bat_sounds = [self.sounds.get('bat1'), self.sounds.get('bat2'), self.sounds.get('bat3')]
-        bat_sounds = [s for s in bat_sounds if s is not None]
-        return random.choice(bat_sounds) if bat_sounds else None
+    def get_hitting_sound(self, at_bat_event, rng=None):
+        """AudioSegment (or None) of the hitting sound, see hitting_sound_key"""
+        key = self.hitting_sound_key(at_bat_event, rng)
+        return self.sounds.get(key) if key else None
 
-    def get_reaction_sound(self, at_bat_event):
+    def reaction_sound_key(self, at_bat_event):
         """
-        Get crowd reaction sound
+        Key of the crowd reaction sound
 
         Rules:
         - Any hit or home run: "any hit or homerun.mp3"
@@ -168,7 +732,7 @@ class BaseballAudioMixer:
             at_bat_event: At-bat outcome
 
         Returns:
-            AudioSegment or None
+            'hit_reaction' or None
         """
         if not at_bat_event:
             return None
@@ -177,37 +741,56 @@ class BaseballAudioMixer:
 
         # Any hit or home run gets crowd reaction
         if any(word in event_lower for word in ["home run", "homerun", "single", "double", "triple", "hit"]):
-            return self.sounds.get('hit_reaction')
+            return 'hit_reaction'
 
         return None
 
-    def get_sound_for_result(self, pitch_type, speed, result, at_bat_event=None):
+    def get_reaction_sound(self, at_bat_event):
+        """AudioSegment (or None) of the crowd reaction, see reaction_sound_key"""
+        key = self.reaction_sound_key(at_bat_event)
+        return self.sounds.get(key) if key else None
+
+    def sound_keys_for_result(self, pitch_type, speed, result, at_bat_event=None, rng=None):
         """
-        Get appropriate sound effect(s) for pitch result
+        Keys of the sound effect(s) for a pitch result
 
         Args:
             pitch_type: Type of pitch (e.g., "fastball", "curveball")
             speed: Pitch speed in MPH
             result: Pitch result (e.g., "Called Strike", "Ball", "In Play")
             at_bat_event: At-bat outcome (e.g., "Home Run", "Strikeout")
+            rng: random.Random for the bat choice (defaults to the random module)
 
         Returns:
-            dict with 'catch' and 'reaction' sounds, or None
+            dict with 'hit' and 'reaction', or 'catch', sound keys (None where there is none)
         """
         result_lower = result.lower()
-        sounds = {}
+        keys = {}
 
         # Ball in play - use hitting sound + reaction
         if "in play" in result_lower or "hit" in result_lower:
-            sounds['hit'] = self.get_hitting_sound(at_bat_event)
-            sounds['reaction'] = self.get_reaction_sound(at_bat_event)
+            keys['hit'] = self.hitting_sound_key(at_bat_event, rng)
+            keys['reaction'] = self.reaction_sound_key(at_bat_event)
         else:
             # Strike, ball, or foul - use catching sound
-            sounds['catch'] = self.get_catching_sound(pitch_type, speed)
+            keys['catch'] = self.catching_sound_key(pitch_type, speed)
+
+        return keys
+
+    def get_sound_for_result(self, pitch_type, speed, result, at_bat_event=None, rng=None):
+        """
+        Get appropriate sound effect(s) for pitch result (see sound_keys_for_result)
 
-        return sounds
+        Returns:
+            dict with 'catch' and 'reaction' sounds, or None
+        """
+        keys = self.sound_keys_for_result(pitch_type, speed, result, at_bat_event, rng)
+        return {kind: self.sounds.get(key) if key else None for kind, key in keys.items()}
 
-    def mix_broadcast_with_effects(self, narration_audio, pitch_events, output_file, enable_background_crowd=None):
+    @traced('mix')
+    def mix_broadcast_with_effects(self, narration_audio, pitch_events, output_file, enable_background_crowd=None,
+                                   mode="insert", narration_gain_db=0.0, sfx_gain_db=0.0, crowd_gain_db=-15,
+                                   rng=None):
         """
         Mix narration with sound effects
 
@@ -220,97 +803,324 @@ class BaseballAudioMixer:
                   'at_bat_event': 'Strikeout', 'timestamp_ms': 1000}, ...]
             output_file: Output filename
             enable_background_crowd: Override instance setting for background crowd
+            mode: "insert" splits the narration at each event and inserts the effects
+                plus a pause (the broadcast grows); "overlay" plays effects on top of
+                the narration at their exact timestamps, ducking it under loud ones
+                (the broadcast keeps the narration's length and timing)
+            narration_gain_db: Narration level (None mutes it)
+            sfx_gain_db: Sound effect level (None mutes them)
+            crowd_gain_db: Background crowd level
+            rng: random.Random for the bat sound choices (e.g. random.Random(seed) for
+                the same mix on every rebuild; defaults to the random module)
+
+        With a stem cache, the narration and sound-effect tracks are rendered once
+        per input and later calls only re-sum them with the requested levels.
 
         Returns:
             AudioSegment of mixed audio
         """
         if enable_background_crowd is None:
             enable_background_crowd = self.enable_background_crowd
+        annotate(mode=mode, events=len(pitch_events), crowd=enable_background_crowd)
+
+        narration_audio = self.conform(narration_audio, 'narration')
 
         if not pitch_events:
             # No events, just add background crowd if enabled
-            final_audio = self._add_background_crowd(narration_audio) if enable_background_crowd else narration_audio
-            final_audio.export(output_file, format="mp3")
+            final_audio = (self._add_background_crowd(narration_audio, crowd_gain_db)
+                           if enable_background_crowd else narration_audio)
+            self._export(final_audio, output_file)
             return final_audio
 
-        # Start with empty audio
-        final_audio = AudioSegment.empty()
-        prev_timestamp = 0
+        if self.stem_cache is None and narration_gain_db == 0 and sfx_gain_db == 0:
+            # Plan the timeline, then render it - crowd ambiance included - in one pass
+            plan = self.build_plan(narration_audio, pitch_events, mode, rng)
+            crowd = self._crowd_bed(plan.total_frames, crowd_gain_db) if enable_background_crowd else None
+            final_audio = plan.to_segment(self._render(plan, pitch_events, crowd))
+        else:
+            # Render (or reuse) the stems, then re-sum them at the requested levels
+            stems = self.render_stems(narration_audio, pitch_events, mode, rng)
+            frames = len(stems['narration'])
+            crowd = self._crowd_bed(frames, crowd_gain_db) if enable_background_crowd else None
+            mixed = mix_stems(stems, {'narration': narration_gain_db, 'sfx': sfx_gain_db}, crowd=crowd,
+                              dtype=SAMPLE_DTYPES[self.format.sample_width])
+            final_audio = RenderPlan(*self.format).to_segment(mixed)
+        self.print_conversion_report()
+
+        # Export final mix
+        self._export(final_audio, output_file)
+        print(f"✅ Mixed audio saved to {output_file}")
+
+        return final_audio
+
+    def choose_event_sounds(self, pitch_events, rng=None):
+        """
+        Pick the sound effects for every pitch event, in event order
+
+        Choosing up front keeps the random bat choices (drawn from rng, or the
+        random module) in event order.
 
+        Returns:
+            List (one per event) of sound keys to play, in order: catching/hitting
+            sound, then crowd reaction (see sound_samples for their audio)
+        """
+        event_sounds = []
         for event in pitch_events:
-            timestamp_ms = event.get('timestamp_ms', 0)
-            pitch_type = event.get('pitch_type', '')
-            speed = event.get('speed', 0)
-            result = event.get('result', '')
-            at_bat_event = event.get('at_bat_event')
+            keys = self.sound_keys_for_result(
+                event.get('pitch_type', ''),
+                event.get('speed', 0),
+                event.get('result', ''),
+                event.get('at_bat_event'),
+                rng
+            )
+            event_sounds.append([keys[kind] for kind in ('catch', 'hit', 'reaction')
+                                 if keys.get(kind) and self.has_sound(keys[kind])])
+        return event_sounds
+
+    def _export(self, audio, output_file):
+        """Encode the final mix to MP3"""
+        with span('export', format="mp3") as export:
+            audio.export(output_file, format="mp3")
+            export.add('bytes_out', os.path.getsize(output_file))
+
+    @traced('mix.streaming')
+    def mix_broadcast_streaming(self, narration, pitch_events, output_file, enable_background_crowd=None, **kwargs):
+        """
+        Mix in bounded memory, feeding fixed-size blocks straight to the encoder
+
+        See streaming_mixer.stream_mix_broadcast for arguments.
+        """
+        from streaming_mixer import stream_mix_broadcast
+        if enable_background_crowd is None:
+            enable_background_crowd = self.enable_background_crowd
+        return stream_mix_broadcast(self, narration, pitch_events, output_file,
+                                    enable_background_crowd=enable_background_crowd, **kwargs)
+
+    def _render(self, plan, pitch_events, crowd=None):
+        """Render a plan in-process, or by half-inning across render_workers processes"""
+        if self.render_workers <= 1:
+            return render_plan(plan, crowd=crowd)
+
+        windows = split_windows(plan.total_frames, self.half_inning_boundaries(plan, pitch_events))
+        print(f"   Rendering {len(windows)} segments on {self.render_workers} processes...")
+        return render_plan_parallel(plan, windows, max_workers=self.render_workers, crowd=crowd)
+
+    def half_inning_boundaries(self, plan, pitch_events):
+        """
+        Output frames where each half-inning's first event starts
+
+        Events without inning information are grouped into even runs instead,
+        a few per worker, so the pool stays busy.
+        """
+        offsets = plan.event_offsets
+        if pitch_events and all('inning' in event for event in pitch_events):
+            return [offsets[i] for i in range(1, len(offsets))
+                    if (pitch_events[i]['inning'], pitch_events[i].get('half_inning'))
+                    != (pitch_events[i - 1]['inning'], pitch_events[i - 1].get('half_inning'))]
+
+        runs = self.render_workers * 2
+        step = max(1, len(offsets) // runs)
+        return offsets[step::step]
+
+    def build_plan(self, narration_audio, pitch_events, mode="insert", rng=None):
+        """RenderPlan for a mix mode (see mix_broadcast_with_effects)"""
+        if mode == "overlay":
+            return self.build_overlay_plan(narration_audio, pitch_events, rng=rng)
+        if mode == "insert":
+            return self.build_render_plan(narration_audio, pitch_events, rng)
+        raise ValueError(f"Unknown mix mode: {mode!r} (expected 'insert' or 'overlay')")
+
+    def render_stems(self, narration_audio, pitch_events, mode="insert", rng=None):
+        """
+        Narration (with pauses and ducking) and sound-effect tracks rendered separately
+
+        Reuses the stem cache when the same narration, events, mode and sound
+        effect files were mixed before - and, given a seeded rng, from the same rng
+        state, since that picks the bat sounds. Stems are unclipped sums in a wider
+        dtype (STEM_DTYPES), so mix_stems clips only once, after the weighted sum.
+
+        Returns:
+            dict of 'narration' and 'sfx' -> (frames, channels) samples
+        """
+        narration_audio = self.conform(narration_audio, 'narration')
+        dtype = STEM_DTYPES[self.format.sample_width]
+        key = None
+        if self.stem_cache is not None:
+            settings = {'mode': mode, 'format': list(self.format), 'stem_dtype': np.dtype(dtype).name}
+            if rng is not None and rng is not random:
+                settings['rng_state'] = rng.getstate()  # Unseeded mixes may reuse any earlier draw
+            key = self.stem_cache.key(segment_samples(narration_audio), pitch_events, settings, self._sound_files)
+            stems = self.stem_cache.load(key)
+            if stems is not None:
+                print("♻️  Reusing cached narration/SFX stems")
+                if settings.get('rng_state') is not None:
+                    self.choose_event_sounds(pitch_events, rng)  # Leave rng where a fresh render would
+                return stems
+
+        plan = self.build_plan(narration_audio, pitch_events, mode, rng)
+        stems = {track: render_plan(plan, np.zeros((plan.total_frames, plan.channels), dtype=dtype), tracks={track})
+                 for track in STEM_NAMES}
+
+        if key is not None:
+            self.stem_cache.save(key, stems, {'mode': mode, 'events': len(pitch_events),
+                                              'frames': plan.total_frames})
+        return stems
+
+    def build_render_plan(self, narration_audio, pitch_events, rng=None):
+        """
+        Lay out narration slices, sound effects and pauses without touching audio
+
+        Each pitch event cuts the narration at its timestamp and inserts the
+        event's sound effect(s) followed by a 200 ms pause.
+
+        Args:
+            narration_audio: AudioSegment of TTS narration
+            pitch_events: List of pitch event dicts (see mix_broadcast_with_effects)
+            rng: random.Random for the bat sound choices
 
-            # Add narration chunk up to this event
-            narration_chunk = narration_audio[prev_timestamp:timestamp_ms]
-            final_audio += narration_chunk
+        Returns:
+            RenderPlan
+        """
+        event_sounds = self.choose_event_sounds(pitch_events, rng)
+        plan, narration = self._start_plan(narration_audio, event_sounds)
+        narration_frames = len(plan.sources['narration'])
+        pause_frames = int(self.create_silence(200).frame_count())
 
-            # Get appropriate sound effect(s)
-            sounds = self.get_sound_for_result(pitch_type, speed, result, at_bat_event)
+        def append_narration(start_ms, end_ms):
+            start, frames, padding = _pydub_slice_frames(narration, start_ms, end_ms)
+            frames = min(frames, narration_frames - start)
+            plan.append('narration', start, frames, 'narration')
+            plan.append_silence(padding)
 
-            # Add sound effects
-            if sounds.get('catch'):
-                # Catching sound (already has pitch windup built-in)
-                final_audio += sounds['catch']
+        prev_timestamp = 0
+        for event, sounds in zip(pitch_events, event_sounds):
+            timestamp_ms = event.get('timestamp_ms', 0)
 
-            if sounds.get('hit'):
-                # Hitting sound (already has pitch windup built-in)
-                final_audio += sounds['hit']
+            # Narration up to this event
+            append_narration(prev_timestamp, timestamp_ms)
+            plan.event_offsets.append(plan.total_frames)
 
-            if sounds.get('reaction'):
-                # Crowd reaction (comes right after hit)
-                final_audio += sounds['reaction']
+            # Catching/hitting sound (already has pitch windup built-in), then crowd reaction
+            for source in sounds:
+                plan.append(source, 0, len(plan.sources[source]), 'sfx')
 
             # Brief pause after sound effects before next narration
-            final_audio += self.create_silence(200)
+            plan.append_silence(pause_frames)
 
             prev_timestamp = timestamp_ms
 
-        # Add remaining narration
-        final_audio += narration_audio[prev_timestamp:]
+        # Remaining narration
+        append_narration(prev_timestamp, len(narration))
 
-        # Add background crowd ambiance if enabled
-        if enable_background_crowd:
-            final_audio = self._add_background_crowd(final_audio)
+        return plan
 
-        # Export final mix
-        final_audio.export(output_file, format="mp3")
-        print(f"✅ Mixed audio saved to {output_file}")
+    def build_overlay_plan(self, narration_audio, pitch_events, duck_db=DUCK_GAIN_DB,
+                           duck_threshold_dbfs=DUCK_THRESHOLD_DBFS, rng=None):
+        """
+        Lay out sound effects on top of the unbroken narration
 
-        return final_audio
+        Each event's sound effect(s) start exactly at its timestamp, so the output
+        is as long as the narration and every timestamp stays valid. The narration
+        is ducked by duck_db while an effect louder than duck_threshold_dbfs plays.
+
+        Args:
+            narration_audio: AudioSegment of TTS narration
+            pitch_events: List of pitch event dicts (see mix_broadcast_with_effects)
+            duck_db: Narration gain under loud effects
+            duck_threshold_dbfs: Effects quieter than this don't duck the narration
+            rng: random.Random for the bat sound choices
 
-    def _add_background_crowd(self, audio):
+        Returns:
+            RenderPlan
         """
-        Add continuous background crowd ambiance throughout the broadcast
+        event_sounds = self.choose_event_sounds(pitch_events, rng)
+        plan, narration = self._start_plan(narration_audio, event_sounds)
+        narration_frames = len(plan.sources['narration'])
+        plan.append('narration', 0, narration_frames, 'narration')
+
+        loudness = {}
+        duck_spans = []
+        for event, sounds in zip(pitch_events, event_sounds):
+            offset = int(event.get('timestamp_ms', 0) * (plan.frame_rate / 1000.0))
+            plan.event_offsets.append(min(offset, plan.total_frames))
+            for source in sounds:
+                frames = len(plan.sources[source])
+                plan.place(offset, source, 0, frames, 'sfx')
+                if source not in loudness:
+                    loudness[source] = samples_dbfs(plan.sources[source], plan.sample_width)
+                if loudness[source] > duck_threshold_dbfs:
+                    duck_spans.append((offset, offset + frames))
+                offset += frames
+
+        plan.ops.sort(key=lambda op: op.offset)
+        if duck_spans:
+            plan.envelopes['narration'] = ducking_envelope(
+                duck_spans, gain_db=duck_db,
+                attack_frames=int(DUCK_ATTACK_MS * plan.frame_rate / 1000),
+                release_frames=int(DUCK_RELEASE_MS * plan.frame_rate / 1000)
+            )
+        return plan
+
+    def _start_plan(self, narration_audio, event_sounds):
+        """
+        Empty RenderPlan in the output format, with the narration and every
+        sound effect the events play added as sources, named by sound key
+
+        Returns:
+            (plan, conformed narration AudioSegment)
+        """
+        plan = RenderPlan(*self.format)
+        narration = self.conform(narration_audio, 'narration')
+        plan.add_source('narration', segment_samples(narration))
+
+        for sounds in event_sounds:
+            for key in sounds:
+                if key not in plan.sources:
+                    plan.add_source(key, self.sound_samples(key))
+
+        return plan, narration
+
+    def _crowd_bed(self, frames, gain_db=-15):
+        """
+        CrowdBed in the output format for a timeline of `frames` frames
 
         Args:
-            audio: Main audio (narration + effects)
+            frames: Timeline length in frames (None = unlimited, for streaming)
+            gain_db: Crowd level (-15 dB so it doesn't overpower narration)
 
         Returns:
-            AudioSegment with crowd ambiance mixed in
+            CrowdBed, or None without a crowd sound
         """
-        crowd = self.sounds.get('crowd_ambient')
-        if not crowd:
-            return audio
+        crowd = self.sound_samples('crowd_ambient')
+        if crowd is None or not len(crowd):
+            return None
 
-        # Loop crowd sound to match broadcast length
-        crowd_length = len(crowd)
-        audio_length = len(audio)
-        loops_needed = (audio_length // crowd_length) + 1
+        if frames is not None:
+            frames = pydub_overlay_frames(frames, self.format.frame_rate)
+        return CrowdBed(crowd, gain_db=gain_db, frames=frames)
 
-        looped_crowd = crowd * loops_needed
-        looped_crowd = looped_crowd[:audio_length]  # Trim to exact length
+    def _add_background_crowd(self, audio, gain_db=-15):
+        """
+        Add continuous background crowd ambiance throughout the broadcast
+
+        The crowd loop is tiled and mixed in block by block, in place, so only
+        the output buffer is ever broadcast-length.
 
-        # Mix at lower volume (-15 dB so it doesn't overpower narration)
-        looped_crowd = looped_crowd - 15
+        Args:
+            audio: Main audio (narration + effects)
+            gain_db: Crowd level
 
-        # Overlay crowd behind main audio
-        mixed = audio.overlay(looped_crowd)
+        Returns:
+            AudioSegment with crowd ambiance mixed in
+        """
+        audio = self.conform(audio, 'narration')
+        samples = segment_samples(audio)
+        bed = self._crowd_bed(len(samples), gain_db)
+        if bed is None:
+            return audio
 
-        return mixed
+        mixed = mix_crowd_into(np.array(samples), bed)
+        return audio._spawn(mixed.tobytes())
 
 
 def main():
@@ -4,36 +4,78 @@ AI Baseball Broadcast Generator
 Generate sleep-friendly AI broadcasts of MLB games focusing on pitch-by-pitch action
 """
 
-import os
-from openai import OpenAI
+import argparse
 
 # Import functions from our modules instead of duplicating them!
 from fetch_game_data import get_recent_games, get_game_pitch_data, get_key_innings_from_scoring
-from generate_broadcast import generate_broadcast_script
+from generate_broadcast import generate_broadcast_units
+from instrumentation import annotate, enable_tracing, print_summary, span, tracing_enabled
+from mp3_frames import stitch_mp3
+from streaming_tts import stream_text_to_speech
+from tts_backends import MAX_CHARS, get_tts_backend, split_text_into_chunks, synthesize_chunks
+from unit_timing import synthesize_units, timing_path
 
 # === AUDIO GENERATION ===
 
-def text_to_speech(text, output_file="broadcast_audio.mp3"):
-    """Convert text to speech using OpenAI TTS API"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("Error: OPENAI_API_KEY environment variable not set")
-        print("Please set your OpenAI API key:")
-        print("export OPENAI_API_KEY='your-api-key-here'")
+def text_to_speech(text, output_file="broadcast_audio.mp3", backend=None,
+                   max_workers=4, max_retries=3, max_chars=MAX_CHARS, stats=None, stream=False, units=None):
+    """
+    Convert text to speech using the configured TTS backend (OpenAI by default)
+
+    Long scripts are split into request-sized chunks that are synthesized
+    concurrently and written in order as one MP3 stream. With stream=True the
+    file grows as audio arrives, so it can be played within seconds.
+
+    Args:
+        text: Broadcast script
+        output_file: MP3 file to write
+        backend: TTSBackend to use (defaults to get_tts_backend())
+        max_workers: Concurrent TTS requests
+        max_retries: Retries per chunk on rate limits and server errors
+        max_chars: Maximum characters per request
+        stats: Optional tts_backends.SynthesisStats to record latency and retries
+        stream: Append audio to output_file progressively instead of at the end
+        units: Broadcast units (generate_broadcast_units) to synthesize one by one
+            instead of chunking text; a timing map of every pitch's position in
+            the audio is saved next to output_file for the mixer
+    """
+    backend = backend or get_tts_backend()
+    if backend is None:
         return False
     
     try:
-        client = OpenAI(api_key=api_key)
-        
-        print("Generating speech audio...")
-        response = client.audio.speech.create(
-            model="tts-1-hd",  # HD model for better prosody and naturalness
-            voice="onyx",  # Deep, calm voice for baseball broadcasting
-            speed=0.95,  # Slightly slower for clear, natural pacing
-            input=text
+        if units is not None:
+            print(f"Generating speech audio ({len(units)} timed units)...")
+            synthesize_units(units, output_file, backend, max_workers=max_workers,
+                             max_retries=max_retries, stats=stats)
+            print(f"Audio saved to {output_file} (timing in {timing_path(output_file)})")
+            return True
+
+        if stream:
+            print("Streaming speech audio...")
+            result = stream_text_to_speech(
+                text, output_file, backend=backend,
+                max_workers=max_workers,
+                max_retries=max_retries,
+                max_chars=max_chars,
+                stats=stats
+            )
+            print(f"Audio saved to {output_file} ({result['total_s']:.1f}s total)")
+            return True
+
+        chunks = split_text_into_chunks(text, max_chars)
+        print(f"Generating speech audio ({len(chunks)} chunks)...")
+        audio_chunks = synthesize_chunks(
+            backend, chunks,
+            max_workers=max_workers,
+            max_retries=max_retries,
+            stats=stats,
+            response_format="mp3"
         )
         
-        response.stream_to_file(output_file)
+        # Join at the frame level so the file has one header with the full duration
+        with open(output_file, 'wb') as f:
+            f.write(stitch_mp3(audio_chunks))
         print(f"Audio saved to {output_file}")
         return True
         
@@ -43,7 +85,13 @@ def text_to_speech(text, output_file="broadcast_audio.mp3"):
 
 # === MAIN APPLICATION ===
 
-def main():
+def broadcast_latest_game(script_only=False, stream=True):
+    """
+    Write the script (and unless script_only, the audio) for the most recent final game
+
+    With stream, the audio is playable while it is still being synthesized;
+    otherwise it is written in one go once every chunk is ready.
+    """
     print("🎙️  AI Baseball Broadcast Generator")
     print("=" * 50)
     
@@ -70,6 +118,7 @@ def main():
     game_id = selected_game.get('game_id', '')
     
     print(f"\nGenerating broadcast for: {away_team} @ {home_team}")
+    annotate(game=game_id)
     
     # Get pitch data
     pitch_data = get_game_pitch_data(game_id)
@@ -90,7 +139,8 @@ def main():
         print("No scoring plays found, using all pitches")
 
     # Generate script using key innings
-    script = generate_broadcast_script(pitch_data, max_pitches=40, key_innings=key_innings, away_team=away_team, home_team=home_team)
+    units = generate_broadcast_units(pitch_data, max_pitches=40, key_innings=key_innings, away_team=away_team, home_team=home_team)
+    script = "".join(unit['text'] for unit in units)
     
     # Save script
     script_file = "broadcast_script.txt"
@@ -104,12 +154,15 @@ def main():
     print("="*60)
     print(script[:200] + "...")
     print("="*60)
+
+    if script_only:
+        return
     
     # Generate audio
     audio_file = f"{away_team.replace(' ', '_')}_vs_{home_team.replace(' ', '_')}_broadcast.mp3"
     print(f"\nGenerating audio broadcast...")
     
-    if text_to_speech(script, audio_file):
+    if text_to_speech(script, audio_file, stream=stream):
         print(f"✅ Success! Audio broadcast saved to: {audio_file}")
         print(f"🎧 Play your bedtime baseball broadcast:")
         print(f"   open '{audio_file}'")
@@ -117,5 +170,20 @@ def main():
         print("❌ Audio generation failed. Set OPENAI_API_KEY to enable TTS.")
         print(f"📝 Text script available in: {script_file}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Generate a sleep-friendly broadcast of a recent MLB game")
+    parser.add_argument('--script-only', action='store_true', help="Write the script and skip speech synthesis")
+    parser.add_argument('--no-stream', action='store_true',
+                        help="Write the audio once it is complete instead of streaming it as it is synthesized")
+    parser.add_argument('--trace', help="Write instrumentation spans to this JSON lines file")
+    args = parser.parse_args()
+    if args.trace:
+        enable_tracing(args.trace)
+
+    with span('broadcast'):
+        broadcast_latest_game(args.script_only, stream=not args.no_stream)
+    if tracing_enabled():
+        print_summary()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Nightly slate batch runner
+Broadcasts every Final game from get_recent_games without prompts: games whose
+artifact already exists for the current config are skipped, the rest share a
+worker pool in order of their delivery deadline (earliest first), and the run
+ends with a throughput and missed-deadline report
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from audio_mixer import BaseballAudioMixer
+from broadcast_pipeline import run_pipeline
+from fetch_game_data import get_recent_games
+from instrumentation import enable_tracing, print_summary, span, tracing_enabled
+from single_flight import print_flight_stats
+from tts_backends import get_tts_backend
+
+DEFAULT_BEDTIME = "22:00"
+
+
+def config_hash(settings):
+    """Short stable hash of the settings that shape an artifact"""
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def next_deadline(bedtime, now):
+    """The next time the clock reads bedtime ("HH:MM"), at or after now"""
+    hour, minute = (int(part) for part in bedtime.split(':'))
+    deadline = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return deadline if deadline >= now else deadline + timedelta(days=1)
+
+
+class BroadcastJob:
+    """One game to broadcast, ordered by delivery deadline"""
+
+    def __init__(self, game, deadline, output_file):
+        self.game = game
+        self.deadline = deadline
+        self.output_file = output_file
+        self.status = "pending"
+        self.finished_at = None
+        self.duration_s = 0.0
+        self.error = None
+
+    @property
+    def label(self):
+        return f"{self.game.get('away_name', '?')} @ {self.game.get('home_name', '?')}"
+
+    @property
+    def missed(self):
+        return self.finished_at is not None and self.finished_at > self.deadline
+
+    def __lt__(self, other):
+        return (self.deadline, self.game['game_id']) < (other.deadline, other.game['game_id'])
+
+
+def plan_jobs(games, settings, out_dir, bedtimes=None, default_bedtime=DEFAULT_BEDTIME, now=None):
+    """
+    Work out which games need broadcasting and when each is due
+
+    A game's deadline is the earliest bedtime of either team's subscribers
+    (bedtimes maps team name -> "HH:MM"), falling back to default_bedtime.
+
+    Returns:
+        (jobs to run, jobs skipped because their artifact exists)
+    """
+    now = now or datetime.now()
+    bedtimes = bedtimes or {}
+    suffix = config_hash(settings)
+    extension = settings.get('format', 'mp3')
+
+    jobs, skipped = [], []
+    seen = set()
+    for game in games:
+        if game['game_id'] in seen:
+            continue  # Doubleheaders and overlapping date ranges list games twice
+        seen.add(game['game_id'])
+
+        team_bedtimes = [bedtimes[team] for team in (game.get('away_name'), game.get('home_name')) if team in bedtimes]
+        deadline = min(next_deadline(bedtime, now) for bedtime in team_bedtimes or [default_bedtime])
+        output_file = os.path.join(out_dir, f"{game['game_id']}_{suffix}.{extension}")
+
+        job = BroadcastJob(game, deadline, output_file)
+        if os.path.exists(output_file):
+            job.status = "skipped"
+            skipped.append(job)
+        else:
+            jobs.append(job)
+    return jobs, skipped
+
+
+def run_job(job, settings, backend, mixer=None, pool=None):
+    """
+    Produce one game's broadcast, publishing the file only once it is complete
+
+    Args:
+        job: BroadcastJob to run
+        settings: Run settings (see main)
+        backend: TTSBackend shared by every job
+        mixer: BaseballAudioMixer shared by every job (sound effects decoded once)
+        pool: Process pool shared by every job for rendering half-innings
+
+    Returns:
+        Seconds of audio produced
+    """
+    stem, extension = os.path.splitext(job.output_file)
+    partial_file = stem + ".partial" + extension
+    mixer = mixer or BaseballAudioMixer(enable_background_crowd=settings['crowd'])
+    try:
+        with span('broadcast', game=job.game['game_id'], output=job.output_file):
+            result = asyncio.run(run_pipeline(
+                partial_file,
+                game_id=job.game['game_id'],
+                away_team=job.game.get('away_name'),
+                home_team=job.game.get('home_name'),
+                backend=backend,
+                mixer=mixer,
+                tts_workers=settings['tts_workers'],
+                mix_workers=settings['mix_workers'],
+                mode=settings['mode'],
+                enable_background_crowd=settings['crowd'],
+                max_pitches=settings['max_pitches'],
+                pool=pool
+            ))
+        if result is None:
+            raise RuntimeError("no pitch data")
+        os.replace(partial_file, job.output_file)
+    except BaseException:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)  # Never leave a half-written broadcast behind
+        raise
+    return result['duration_s']
+
+
+def run_batch(jobs, workers, run):
+    """
+    Run jobs on a shared pool of worker threads, earliest deadline first
+
+    Args:
+        jobs: BroadcastJobs to run
+        workers: Worker threads
+        run: Callable(job) -> seconds of audio produced
+
+    Returns:
+        Wall time in seconds
+    """
+    pending = queue.PriorityQueue()
+    for job in jobs:
+        pending.put(job)
+
+    def worker():
+        while True:
+            try:
+                job = pending.get_nowait()
+            except queue.Empty:
+                return
+            print(f"▶️  {job.label} (due {job.deadline:%H:%M})")
+            try:
+                job.duration_s = run(job)
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                print(f"❌ {job.label}: {e}")
+            job.finished_at = datetime.now()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def print_report(jobs, skipped, wall_s):
+    done = [job for job in jobs if job.status == "done"]
+    failed = [job for job in jobs if job.status == "failed"]
+    missed = [job for job in jobs if job.missed]
+    audio_s = sum(job.duration_s for job in done)
+
+    print("\n" + "=" * 78)
+    print(f"{'game':>8}  {'matchup':<40} {'due':>5} {'status':>8} {'done at':>8}")
+    print("-" * 78)
+    for job in sorted(jobs + skipped):
+        finished = f"{job.finished_at:%H:%M:%S}" if job.finished_at else "-"
+        status = "LATE" if job.missed else job.status
+        print(f"{job.game['game_id']:>8}  {job.label[:40]:<40} {job.deadline:%H:%M} {status:>8} {finished:>8}")
+    print("=" * 78)
+
+    print(f"🏁 {len(done)} built, {len(skipped)} already up to date, {len(failed)} failed in {wall_s:.1f}s")
+    if done:
+        print(f"   Throughput: {len(done) / wall_s * 3600:.1f} games/hour, "
+              f"{audio_s / wall_s:.1f}x real time ({audio_s / 60:.0f} min of audio)")
+    if missed:
+        print(f"⚠️  {len(missed)} missed deadline(s): " + ", ".join(job.label for job in missed))
+    else:
+        print("✅ Every deadline met")
+    print_flight_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast every final game on the slate")
+    parser.add_argument('--days-back', type=int, default=1, help="How far back to look for final games")
+    parser.add_argument('--out-dir', default="broadcasts")
+    parser.add_argument('--workers', type=int, default=2, help="Games produced at the same time")
+    parser.add_argument('--bedtime', default=DEFAULT_BEDTIME, help="Default delivery deadline (HH:MM)")
+    parser.add_argument('--deadlines', help="JSON file mapping team name -> bedtime (HH:MM)")
+    parser.add_argument('--mode', choices=['insert', 'overlay'], default='insert')
+    parser.add_argument('--no-crowd', action='store_true')
+    parser.add_argument('--format', choices=['mp3', 'wav'], default='mp3')
+    parser.add_argument('--tts-workers', type=int, default=4)
+    parser.add_argument('--mix-workers', type=int, default=1, help="Render processes, shared by every game")
+    parser.add_argument('--max-pitches', type=int, default=40)
+    parser.add_argument('--dry-run', action='store_true', help="Show the schedule without building")
+    parser.add_argument('--trace', help="Write instrumentation spans to this JSON lines file")
+    args = parser.parse_args()
+    if args.trace:
+        enable_tracing(args.trace)
+
+    bedtimes = {}
+    if args.deadlines:
+        with open(args.deadlines) as f:
+            bedtimes = json.load(f)
+
+    backend = get_tts_backend()
+    if backend is None:
+        return
+
+    settings = {
+        'backend': backend.name,
+        'model': backend.model,
+        'voice': backend.voice,
+        'speed': backend.speed,
+        'mode': args.mode,
+        'crowd': not args.no_crowd,
+        'format': args.format,
+        'max_pitches': args.max_pitches,
+    }
+
+    print("🌙 Nightly Slate Batch")
+    print("=" * 60)
+    games = get_recent_games(days_back=args.days_back)
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs, skipped = plan_jobs(games, settings, args.out_dir, bedtimes, args.bedtime)
+    print(f"{len(games)} final games: {len(jobs)} to build, {len(skipped)} up to date "
+          f"(config {config_hash(settings)})")
+
+    if args.dry_run:
+        for job in sorted(jobs):
+            print(f"   {job.deadline:%a %H:%M}  {job.label} -> {job.output_file}")
+        return
+
+    run_settings = dict(settings, tts_workers=args.tts_workers, mix_workers=args.mix_workers)
+    mixer = BaseballAudioMixer(enable_background_crowd=settings['crowd'])
+    with ProcessPoolExecutor(max_workers=max(1, args.mix_workers)) as pool:
+        pool.submit(int).result()  # Fork the render processes here, not from a worker thread
+        wall_s = run_batch(jobs, args.workers, lambda job: run_job(job, run_settings, backend, mixer, pool))
+    print_report(jobs, skipped, wall_s)
+    if tracing_enabled():
+        print_summary()
+
+
+if __name__ == "__main__":
+    main()
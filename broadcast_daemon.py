@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Resident broadcast daemon
+Keeps one BroadcastService running behind a local Unix socket, so the TTS
+client, decoded sound effects, team registry, game feeds and synthesized units
+are loaded once and stay warm between jobs. CLI clients submit a game and get
+the finished broadcast copied to the path they asked for; the client side only
+needs the standard library and starts instantly
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+FORMATS = ('mp3', 'wav')
+
+
+def default_socket_path():
+    """BROADCAST_DAEMON_SOCKET, or a per-user socket in the temp directory"""
+    return os.environ.get('BROADCAST_DAEMON_SOCKET') or os.path.join(
+        tempfile.gettempdir(), f"baseball-broadcast-{os.getuid()}.sock")
+
+
+def default_output_dir():
+    """BROADCAST_DAEMON_OUTPUT_DIR, or the user's home directory"""
+    return os.environ.get('BROADCAST_DAEMON_OUTPUT_DIR') or os.path.expanduser('~')
+
+
+# === CLIENT ===
+
+def request(socket_path, message, timeout=None):
+    """
+    Send one request to the daemon and yield its replies
+
+    Args:
+        socket_path: Daemon socket
+        message: Request dict ('op' plus its arguments)
+        timeout: Seconds to wait for each reply (None waits as long as a render takes)
+
+    Yields:
+        Reply dicts, in the order the daemon sends them
+
+    Raises:
+        OSError: If no daemon is listening on socket_path
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        with sock.makefile('rb') as replies:
+            for line in replies:
+                yield json.loads(line)
+
+
+def is_running(socket_path):
+    """True if a daemon answers on socket_path"""
+    try:
+        list(request(socket_path, {'op': 'ping'}, timeout=2))
+        return True
+    except OSError:
+        return False
+
+
+def submit(socket_path, game_pk, output_file, fmt=None, voice=None, crowd=True, mode="insert"):
+    """
+    Have the daemon render a broadcast and copy it to output_file
+
+    Args:
+        socket_path: Daemon socket
+        game_pk: Game to broadcast
+        output_file: Where to write the broadcast
+        fmt: 'mp3' or 'wav' (defaults to output_file's extension)
+        voice: TTS voice (defaults to the daemon backend's)
+        crowd: Mix in background crowd noise
+        mode: 'insert' or 'overlay' sound effects
+
+    Returns:
+        The daemon's final reply, or None if no daemon is running
+    """
+    fmt = fmt or os.path.splitext(output_file)[1].lstrip('.').lower() or 'mp3'
+    message = {
+        'op': 'broadcast',
+        'game_pk': int(game_pk),
+        'format': fmt,
+        'voice': voice,
+        'crowd': '1' if crowd else '0',
+        'mode': mode,
+        'output': os.path.abspath(output_file),
+    }
+    try:
+        reply = None
+        for reply in request(socket_path, message):
+            if reply['status'] == 'accepted':
+                print(f"⏳ Game {game_pk}: {reply['source']}")
+        return reply
+    except OSError as e:
+        print(f"❌ No broadcast daemon on {socket_path} ({e}). Start one with: broadcast_daemon.py serve")
+        return None
+
+
+# === SERVER ===
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per connection, answered with one or more JSON lines"""
+
+    def send(self, reply):
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline())
+            op = message.get('op')
+        except (ValueError, AttributeError):
+            self.send({'status': 'error', 'error': "Requests are one JSON object per line"})
+            return
+
+        if op == 'ping':
+            self.send({'status': 'ok'})
+        elif op == 'stats':
+            self.send(dict(self.server.stats(), status='ok'))
+        elif op == 'broadcast':
+            self.handle_broadcast(message)
+        elif op == 'shutdown':
+            self.send({'status': 'ok'})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            self.send({'status': 'error', 'error': f"Unknown op {op!r}"})
+
+    def handle_broadcast(self, message):
+        from broadcast_service import ServiceBusy, parse_options
+
+        start = time.perf_counter()
+        try:
+            game_pk = int(message['game_pk'])
+            fmt = message.get('format', 'mp3')
+            if fmt not in FORMATS:
+                raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+            output_file = message['output']
+            if not os.path.isabs(output_file):
+                raise ValueError("output must be an absolute path")
+            output_file = os.path.realpath(output_file)  # No escaping through symlinks or ..
+            if os.path.commonpath([output_file, self.server.output_dir]) != self.server.output_dir:
+                raise ValueError(f"output must be inside {self.server.output_dir}")
+            options = parse_options(fmt, {name: [str(message[name])] for name in ('voice', 'crowd', 'mode')
+                                          if message.get(name) is not None})
+        except (KeyError, TypeError, ValueError) as e:
+            self.send({'status': 'error', 'error': f"Bad request: {e}"})
+            return
+
+        try:
+            source, artifact = self.server.service.broadcast(game_pk, options)
+        except ServiceBusy:
+            self.send({'status': 'busy', 'error': "Too many broadcasts rendering, try again shortly"})
+            return
+        self.server.count_job()
+        self.send({'status': 'accepted', 'source': source})
+
+        if source != "cache":
+            artifact.done.wait()
+            if artifact.error is not None:
+                self.send({'status': 'error', 'error': str(artifact.error)})
+                return
+            artifact = artifact.open_output()
+
+        try:
+            with artifact, open(output_file, 'wb') as out:
+                shutil.copyfileobj(artifact, out)
+        except OSError as e:
+            self.send({'status': 'error', 'error': f"Could not write {output_file}: {e}"})
+            return
+        self.send({'status': 'done', 'source': source, 'output': output_file,
+                   'seconds': round(time.perf_counter() - start, 3)})
+
+
+class BroadcastDaemon(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server holding the warm BroadcastService"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, service, output_dir=None):
+        """
+        Args:
+            socket_path: Where to listen (created owner-only)
+            service: Warm BroadcastService rendering the jobs
+            output_dir: Jobs may only write broadcasts inside this directory
+        """
+        self.socket_path = socket_path
+        self.service = service
+        self.output_dir = os.path.realpath(output_dir or default_output_dir())
+        self.started = time.time()
+        self.jobs = 0
+        self._lock = threading.Lock()
+        umask = os.umask(0o077)  # Only this user may connect - from the moment the socket exists
+        try:
+            super().__init__(socket_path, DaemonRequestHandler)
+        finally:
+            os.umask(umask)
+
+    def count_job(self):
+        with self._lock:
+            self.jobs += 1
+
+    def stats(self):
+        with self._lock:
+            jobs = self.jobs
+        return {'pid': os.getpid(), 'uptime_s': round(time.time() - self.started, 1), 'jobs': jobs,
+                'service': self.service.stats()}
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def serve(socket_path, tts=None, feed='statsapi', cache_dir=".broadcast_cache", workers=2, max_queue=8,
+          render_processes=2, tts_workers=4, output_dir=None):
+    """
+    Load everything once and answer jobs until stopped
+
+    Args:
+        output_dir: Jobs may only write broadcasts inside this directory
+            (defaults to BROADCAST_DAEMON_OUTPUT_DIR or the home directory)
+
+    Returns:
+        False if the daemon could not start, True once it has stopped
+    """
+    if os.path.exists(socket_path):
+        if is_running(socket_path):
+            print(f"❌ A broadcast daemon is already running on {socket_path}")
+            return False
+        os.remove(socket_path)  # Left behind by a daemon that did not shut down cleanly
+
+    from broadcast_service import FEEDS, BroadcastService
+    from fetch_game_data import get_teams
+    from tts_backends import get_tts_backend
+
+    backend = get_tts_backend(tts)
+    if backend is None:
+        return False
+
+    start = time.perf_counter()
+    service = BroadcastService(backend, FEEDS[feed], cache_dir, workers, max_queue, render_processes, tts_workers)
+    sounds = service.mixer.preload_sounds()
+    if feed == 'statsapi':
+        try:
+            print(f"⚾ {len(get_teams())} teams loaded")
+        except Exception as e:
+            print(f"⚠️  Could not load teams yet: {e}")
+    print(f"🔥 Warm in {time.perf_counter() - start:.2f}s ({backend.name} TTS, {sounds} sounds decoded)")
+
+    daemon = BroadcastDaemon(socket_path, service, output_dir)
+    print(f"📡 Broadcast daemon listening on {socket_path} (writing broadcasts under {daemon.output_dir})")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping daemon")
+    finally:
+        daemon.server_close()
+        service.close()
+    print(f"👋 Daemon stopped after {daemon.jobs} jobs")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a warm broadcast renderer running and submit jobs to it")
+    parser.add_argument('--socket', default=default_socket_path(),
+                        help="Daemon socket (defaults to BROADCAST_DAEMON_SOCKET or a per-user temp path)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="Start the daemon in the foreground")
+    serve_parser.add_argument('--tts', choices=['openai', 'local'], default=None,
+                              help="TTS backend (defaults to the TTS_BACKEND environment variable)")
+    serve_parser.add_argument('--feed', choices=['standin', 'statsapi'], default='statsapi')
+    serve_parser.add_argument('--cache-dir', default=".broadcast_cache")
+    serve_parser.add_argument('--workers', type=int, default=2, help="Broadcasts rendered at the same time")
+    serve_parser.add_argument('--max-queue', type=int, default=8)
+    serve_parser.add_argument('--render-processes', type=int, default=2)
+    serve_parser.add_argument('--tts-workers', type=int, default=4)
+    serve_parser.add_argument('--output-dir', default=default_output_dir(),
+                              help="Only write broadcasts inside this directory "
+                                   "(defaults to BROADCAST_DAEMON_OUTPUT_DIR or your home directory)")
+
+    submit_parser = commands.add_parser('submit', help="Render a game's broadcast")
+    submit_parser.add_argument('game_pk', type=int)
+    submit_parser.add_argument('-o', '--output', help="Output file (defaults to <gamePk>_broadcast.<format>)")
+    submit_parser.add_argument('--format', choices=FORMATS)
+    submit_parser.add_argument('--voice')
+    submit_parser.add_argument('--no-crowd', action='store_true')
+    submit_parser.add_argument('--mode', choices=['insert', 'overlay'], default='insert')
+
+    commands.add_parser('status', help="Show the running daemon's stats")
+    commands.add_parser('stop', help="Stop the running daemon")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        ok = serve(args.socket, args.tts, args.feed, args.cache_dir, args.workers, args.max_queue,
+                   args.render_processes, args.tts_workers, args.output_dir)
+        raise SystemExit(0 if ok else 1)
+
+    if args.command == 'submit':
+        output_file = args.output or f"{args.game_pk}_broadcast.{args.format or 'mp3'}"
+        reply = submit(args.socket, args.game_pk, output_file, args.format, args.voice,
+                       not args.no_crowd, args.mode)
+        if reply and reply['status'] == 'done':
+            print(f"✅ Broadcast saved to {reply['output']} ({reply['source']}, {reply['seconds']:.2f}s)")
+            return
+        if reply:
+            print(f"❌ {reply.get('error', reply['status'])}")
+        raise SystemExit(1)
+
+    op = 'stats' if args.command == 'status' else 'shutdown'
+    try:
+        for reply in request(args.socket, {'op': op}, timeout=10):
+            if op == 'stats':
+                print(json.dumps(reply, indent=1))
+            else:
+                print("🛑 Daemon stopping")
+    except OSError:
+        print(f"No broadcast daemon running on {args.socket}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
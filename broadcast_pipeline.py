@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Pipelined broadcast orchestrator
+Runs fetch -> script -> TTS -> mix -> encode as overlapping stages connected by
+bounded queues, one half-inning at a time - so the first half-inning is being
+mixed and encoded while later ones are still being synthesized, and a game takes
+about as long as its slowest stage instead of the sum of all of them
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from audio_mixer import BaseballAudioMixer, render_plan
+from fetch_game_data import get_game_pitch_data, get_key_innings_from_scoring, get_recent_games
+from generate_broadcast import generate_broadcast_units, seeded_rng, select_broadcast_pitches
+from instrumentation import enable_tracing, print_summary, span, tracing_enabled
+from streaming_mixer import EncoderSink
+from tts_backends import audio_segment_from_bytes, get_tts_backend, synthesize_chunks
+
+_DONE = object()
+
+
+class HalfInning:
+    """One pipeline item: a half-inning's script units, then its audio as it is produced"""
+
+    def __init__(self, index, units, pitches):
+        self.index = index
+        self.units = units          # Broadcast units, in order
+        self.pitches = pitches      # {pitch_index: pitch dict} for the pitches in this half
+        self.narration = None       # AudioSegment once synthesized
+        self.pitch_events = []      # Mixer events with timestamps inside this half
+        self.frames = 0             # Mixed length in frames
+
+    @property
+    def label(self):
+        if not self.pitches:
+            return f"segment {self.index + 1}"
+        first = self.pitches[min(self.pitches)]
+        return f"{first['half_inning'].capitalize()} {first['inning']}"
+
+
+def split_half_innings(units, selected_pitches):
+    """
+    Group broadcast units by half-inning
+
+    A new group starts at every inning intro, so each half-inning carries its
+    intro and pitches, and the previous half's score summary stays with it.
+    """
+    groups = []
+    for unit in units:
+        if unit['kind'] == 'intro' or not groups:
+            groups.append(HalfInning(len(groups), [], {}))
+        group = groups[-1]
+        group.units.append(unit)
+        if unit['pitch_index'] is not None:
+            group.pitches[unit['pitch_index']] = selected_pitches[unit['pitch_index']]
+    return groups
+
+
+def _render_half_inning(plan, crowd):
+    """Process pool worker: render one half-inning's plan, returning (samples, seconds)"""
+    began = time.perf_counter()
+    samples = render_plan(plan, crowd=crowd)
+    return samples, time.perf_counter() - began
+
+
+async def run_stages(*stages):
+    """
+    Run pipeline stage coroutines together until all of them finish
+
+    The first stage to fail cancels the others - a stage blocked handing work to a
+    stage that stopped consuming would otherwise wait on its full queue forever -
+    and its error is raised once they have all stopped.
+    """
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in tasks:
+        if task in done and task.exception() is not None:
+            raise task.exception()
+
+
+class StageClock:
+    """Busy time per stage, to compare with wall time"""
+
+    def __init__(self):
+        self.busy = {}
+
+    def add(self, stage, seconds):
+        self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+
+
+async def run_pipeline(output_file, game_id=None, pitch_data=None, key_innings=None, away_team=None,
+                       home_team=None, backend=None, mixer=None, tts_workers=4, mix_workers=2,
+                       queue_size=3, mode="insert", enable_background_crowd=True, max_pitches=40, seed=None,
+                       pool=None):
+    """
+    Produce a mixed broadcast with all stages overlapping
+
+    Args:
+        output_file: Mixed output (.wav written directly, anything else via ffmpeg)
+        game_id: Game to fetch (ignored when pitch_data is given)
+        pitch_data: Pre-fetched pitch data, to skip the fetch stage
+        key_innings: Innings to cover (fetched from scoring plays if None and game_id given)
+        away_team: Away team name (for score summaries)
+        home_team: Home team name (for score summaries)
+        backend: TTSBackend (defaults to get_tts_backend())
+        mixer: BaseballAudioMixer (defaults to one on sound_effects/)
+        tts_workers: Concurrent TTS requests within a half-inning
+        mix_workers: Processes rendering half-innings
+        queue_size: Half-innings allowed to wait between two stages
+        mode: Mixer mode ("insert" or "overlay")
+        enable_background_crowd: Whether to mix in continuous crowd ambiance
+        max_pitches: Pitch limit when no key innings are given
+        seed: Seed for the script's phrasing and bat sounds (None for a different broadcast each run)
+        pool: Executor to render on, shared between broadcasts (mix_workers is
+            then ignored); defaults to a process pool for this broadcast
+
+    Returns:
+        dict with 'wall_s', 'first_audio_s', 'stage_busy_s', 'half_innings' and
+        'duration_s', or None if there was nothing to broadcast
+    """
+    backend = backend or get_tts_backend()
+    if backend is None:
+        return None
+    mixer = mixer or BaseballAudioMixer()
+    rng = seeded_rng(seed)  # Half-innings are planned in order, so one source is repeatable
+    loop = asyncio.get_running_loop()
+    clock = StageClock()
+    start = time.perf_counter()
+
+    to_tts = asyncio.Queue(maxsize=queue_size)
+    to_mix = asyncio.Queue(maxsize=queue_size)
+    to_encode = asyncio.Queue(maxsize=queue_size)
+    result = {'first_audio_s': None, 'half_innings': 0, 'frames': 0}
+
+    # Each stage passes _DONE on only when it finishes cleanly; a failed stage
+    # is handled by run_stages cancelling the rest
+    async def fetch_and_script():
+        nonlocal pitch_data, key_innings
+        began = time.perf_counter()
+        if pitch_data is None:
+            fetches = [asyncio.to_thread(get_game_pitch_data, game_id)]
+            if key_innings is None:
+                fetches.append(asyncio.to_thread(get_key_innings_from_scoring, game_id))
+            fetched = await asyncio.gather(*fetches)
+            pitch_data = fetched[0]
+            if key_innings is None:
+                key_innings = fetched[1]
+        clock.add('fetch', time.perf_counter() - began)
+
+        began = time.perf_counter()
+        selected = select_broadcast_pitches(pitch_data, max_pitches, key_innings)
+        units = generate_broadcast_units(pitch_data, max_pitches, key_innings, away_team, home_team, seed)
+        half_innings = split_half_innings(units, selected)
+        clock.add('script', time.perf_counter() - began)
+
+        for half in half_innings:
+            await to_tts.put(half)
+        await to_tts.put(_DONE)
+
+    async def synthesize():
+        while (half := await to_tts.get()) is not _DONE:
+            began = time.perf_counter()
+            spoken = [unit for unit in half.units if unit['text'].strip()]
+            with span('tts.half_inning', half_inning=half.label):
+                audio = await asyncio.to_thread(
+                    synthesize_chunks, backend, [unit['text'].strip() for unit in spoken],
+                    max_workers=tts_workers, response_format="pcm"
+                )
+
+            # PCM length is the exact duration, so event times need no estimation
+            position = 0
+            ends = {}
+            for unit, pcm in zip(spoken, audio):
+                position += len(pcm)
+                if unit['pitch_index'] is not None:
+                    ends[unit['pitch_index']] = position
+            half.narration = audio_segment_from_bytes(b''.join(audio), "pcm")
+            bytes_per_ms = half.narration.frame_rate * half.narration.frame_width / 1000.0
+            for pitch_index, pitch in sorted(half.pitches.items()):
+                half.pitch_events.append({
+                    'timestamp_ms': int(ends[pitch_index] / bytes_per_ms),
+                    'pitch_type': pitch['pitch_type'],
+                    'speed': pitch['speed'],
+                    'result': pitch['result'],
+                    'at_bat_event': pitch.get('at_bat_event'),
+                    'inning': pitch['inning'],
+                    'half_inning': pitch['half_inning'],
+                })
+
+            clock.add('tts', time.perf_counter() - began)
+            print(f"   🎙️  {half.label}: narration ready ({len(half.narration) / 1000:.1f}s)")
+            await to_mix.put(half)
+        await to_mix.put(_DONE)
+
+    async def mix(pool):
+        offset = 0
+        while (half := await to_mix.get()) is not _DONE:
+            began = time.perf_counter()
+            # Planning is cheap and fixes this half's length, so the next half's
+            # crowd phase is known before this one is rendered
+            plan = mixer.build_plan(half.narration, half.pitch_events, mode, rng)
+            crowd = mixer._crowd_bed(None) if enable_background_crowd else None
+            if crowd is not None:
+                crowd = crowd.at_offset(offset)
+            half.frames = plan.total_frames
+            offset += plan.total_frames
+            clock.add('plan', time.perf_counter() - began)
+
+            rendered = loop.run_in_executor(pool, _render_half_inning, plan, crowd)
+            await to_encode.put((half, rendered))
+        await to_encode.put(_DONE)
+
+    async def encode():
+        fmt = mixer.format
+        item = await to_encode.get()
+        if item is _DONE:
+            return  # Nothing survived selection - don't leave an empty output file behind
+        with EncoderSink(output_file, fmt.frame_rate, fmt.channels, fmt.sample_width) as sink:
+            while item is not _DONE:
+                half, rendered = item
+                with span('mix.half_inning', half_inning=half.label) as render:
+                    samples, seconds = await rendered
+                    render.set(render_s=round(seconds, 3))
+                clock.add('render', seconds)
+
+                began = time.perf_counter()
+                with span('encode', half_inning=half.label) as encoded:
+                    await asyncio.to_thread(sink.write, samples)
+                    encoded.add('bytes_out', samples.nbytes)
+                clock.add('encode', time.perf_counter() - began)
+
+                if result['first_audio_s'] is None:
+                    result['first_audio_s'] = time.perf_counter() - start
+                result['half_innings'] += 1
+                result['frames'] += half.frames
+                print(f"   💾 {half.label}: mixed and written ({half.frames / fmt.frame_rate:.1f}s)")
+                item = await to_encode.get()
+
+    with span('pipeline', mode=mode, crowd=enable_background_crowd):
+        if pool is not None:
+            await run_stages(fetch_and_script(), synthesize(), mix(pool), encode())
+        else:
+            with ProcessPoolExecutor(max_workers=mix_workers) as pool:
+                await run_stages(fetch_and_script(), synthesize(), mix(pool), encode())
+
+    if not result['half_innings']:
+        return None
+    result['wall_s'] = time.perf_counter() - start
+    result['duration_s'] = result.pop('frames') / mixer.format.frame_rate
+    result['stage_busy_s'] = clock.busy
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a mixed broadcast with overlapping pipeline stages")
+    parser.add_argument('--game-id', type=int, help="Game to broadcast (defaults to the latest final game)")
+    parser.add_argument('--output', default=None, help="Output file (.mp3 needs ffmpeg, .wav does not)")
+    parser.add_argument('--mode', choices=['insert', 'overlay'], default='insert')
+    parser.add_argument('--tts-workers', type=int, default=4)
+    parser.add_argument('--mix-workers', type=int, default=2)
+    parser.add_argument('--no-crowd', action='store_true')
+    parser.add_argument('--trace', help="Write instrumentation spans to this JSON lines file")
+    args = parser.parse_args()
+    if args.trace:
+        enable_tracing(args.trace)
+
+    print("🎙️  Pipelined Broadcast Generator")
+    print("=" * 60)
+
+    game_id = args.game_id
+    away_team = home_team = None
+    if game_id is None:
+        recent_games = get_recent_games(days_back=7)
+        if not recent_games:
+            print("No recent games found")
+            return
+        game = recent_games[0]
+        game_id, away_team, home_team = game['game_id'], game['away_name'], game['home_name']
+        print(f"Game: {away_team} @ {home_team}")
+
+    output_file = args.output or f"broadcast_{game_id}.mp3"
+    with span('broadcast', game=game_id, output=output_file):
+        result = asyncio.run(run_pipeline(
+            output_file, game_id=game_id, away_team=away_team, home_team=home_team,
+            tts_workers=args.tts_workers, mix_workers=args.mix_workers,
+            mode=args.mode, enable_background_crowd=not args.no_crowd
+        ))
+    if tracing_enabled():
+        print_summary()
+    if result is None:
+        print("❌ Nothing was produced (no pitch data or no TTS backend)")
+        return
+
+    busy = result['stage_busy_s']
+    print(f"\n✅ {output_file}: {result['half_innings']} half-innings, "
+          f"{result['duration_s']:.0f}s of audio")
+    print(f"⏱️  Wall time {result['wall_s']:.2f}s (first audio after {result['first_audio_s']:.2f}s); "
+          f"stages add up to {sum(busy.values()):.2f}s")
+    for stage, seconds in busy.items():
+        print(f"   {stage:>7}: {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
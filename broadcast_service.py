@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+"""
+On-demand broadcast service
+Serves GET /games/{gamePk}/broadcast.mp3?voice=onyx&crowd=1 over HTTP: the game
+feed, per-unit TTS audio and finished broadcasts are cached, concurrent requests
+for the same broadcast share one render, renders run on a bounded worker pool,
+and clients start receiving audio while later half-innings are still rendering.
+With --tts local --feed standin it runs (and load-tests) with no network at all
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from audio_mixer import BaseballAudioMixer
+from broadcast_pipeline import run_pipeline
+from build_manifest import digest
+from fetch_game_data import get_play_by_play, parse_play_by_play, scoring_innings
+from generate_broadcast import TEMPLATE_VERSION
+from instrumentation import count, enable_tracing, finished_spans, print_summary, span, summarize, tracing_enabled
+from single_flight import flight, flight_stats
+from synthetic_games import synthetic_play_by_play
+from tts_backends import get_tts_backend
+from tts_server import CONTENT_TYPES
+
+BROADCAST_ROUTE = re.compile(r'^/games/(\d+)/broadcast\.(mp3|wav)$')
+MODES = ('insert', 'overlay')
+STREAM_CHUNK = 64 * 1024
+POLL_S = 0.05           # How often a streaming response checks for more audio
+
+
+class LRUCache:
+    """Thread-safe in-memory cache that keeps the most recently used entries"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class CachingTTSBackend:
+    """
+    TTS backend wrapper that reuses audio for text it has already spoken
+
+    Scripts are seeded per game, so every request for a game speaks the same
+    units - a broadcast with the crowd toggled, or in another format, only
+    re-mixes. One cache is shared by the wrappers for every voice.
+
+    Cache hits cost nothing, so the wrapper is not billable itself: each miss
+    counts its characters as billed when the wrapped backend is.
+    """
+
+    billable = False
+
+    def __init__(self, backend, cache, voice=None):
+        self.backend = backend
+        self.cache = cache
+        self.name = backend.name
+        self.model = backend.model
+        self.voice = backend.voice if voice is None else voice
+        self.speed = backend.speed
+
+    def synthesize(self, text, voice=None, speed=None, response_format="mp3"):
+        voice = self.voice if voice is None else voice
+        speed = self.speed if speed is None else speed
+        key = (self.name, self.model, voice, speed, response_format, text)
+        audio = self.cache.get(key)
+        if audio is None:
+            count('cache_misses')
+            audio = self.backend.synthesize(text, voice=voice, speed=speed, response_format=response_format)
+            if self.backend.billable:
+                count('characters_billed', len(text))
+            self.cache.put(key, audio)
+        else:
+            count('cache_hits')
+        return audio
+
+
+# === GAME FEEDS ===
+
+def statsapi_feed(game_pk):
+    """Pitch data, key innings and team names for a game, from the MLB StatsAPI"""
+    import statsapi
+
+    playbyplay = get_play_by_play(game_pk)
+    games, _ = flight('feed').do(('schedule', game_pk), statsapi.schedule, game_id=game_pk)
+    game = games[0] if games else {}
+    return {
+        'pitch_data': parse_play_by_play(playbyplay),
+        'key_innings': scoring_innings(playbyplay),
+        'away_team': game.get('away_name'),
+        'home_team': game.get('home_name'),
+    }
+
+
+def standin_feed(game_pk):
+    """Like statsapi_feed, for a made-up game (see synthetic_games.synthetic_play_by_play)"""
+    playbyplay = synthetic_play_by_play(game_pk)
+    return {
+        'pitch_data': parse_play_by_play(playbyplay),
+        'key_innings': scoring_innings(playbyplay),
+        'away_team': f"Visitors {game_pk}",
+        'home_team': f"Hosts {game_pk}",
+    }
+
+
+FEEDS = {'statsapi': statsapi_feed, 'standin': standin_feed}
+
+
+# === SERVICE ===
+
+class ServiceBusy(Exception):
+    """Every worker is busy and the wait queue is full"""
+
+
+class RenderJob:
+    """One broadcast being rendered; every request for it reads the same growing file"""
+
+    def __init__(self, game_pk, options, output_file):
+        self.game_pk = game_pk
+        self.options = options
+        self.output_file = output_file
+        stem, extension = os.path.splitext(output_file)
+        self.partial_file = stem + ".partial" + extension
+        self.done = threading.Event()
+        self.error = None
+
+    def open_output(self):
+        """
+        Open the broadcast for reading as soon as its first bytes are written
+
+        The partial file stays readable through the rename when the render
+        finishes, so readers that opened it early keep streaming.
+
+        Returns:
+            Binary file object, or None if the render failed before writing
+        """
+        while True:
+            try:
+                return open(self.partial_file, 'rb')
+            except FileNotFoundError:
+                if self.done.is_set():
+                    return None if self.error else open(self.output_file, 'rb')
+            self.done.wait(POLL_S)
+
+
+class BroadcastService:
+    """
+    Renders broadcasts on demand and caches them
+
+    Caches, from cheapest to most expensive stage: game feeds (in memory),
+    synthesized units (in memory, shared across mixes of a game) and finished
+    broadcasts (on disk, least recently used removed beyond max_artifacts).
+    """
+
+    def __init__(self, backend, feed=statsapi_feed, cache_dir=".broadcast_cache", workers=2, max_queue=8,
+                 render_processes=2, tts_workers=4, max_pitches=40, feed_cache_size=64,
+                 tts_cache_size=4096, max_artifacts=32):
+        """
+        Args:
+            backend: TTSBackend to synthesize with
+            feed: Callable(game_pk) -> dict like statsapi_feed returns
+            cache_dir: Where finished broadcasts are kept
+            workers: Broadcasts rendered at the same time
+            max_queue: Broadcasts allowed to wait for a worker before requests get 503
+            render_processes: Processes mixing half-innings, shared by all renders
+            tts_workers: Concurrent TTS requests per broadcast
+            max_pitches: Pitch limit for games without scoring plays
+            feed_cache_size: Game feeds kept in memory
+            tts_cache_size: Synthesized units kept in memory
+            max_artifacts: Finished broadcasts kept on disk
+        """
+        self.backend = backend
+        self.feed = feed
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.max_queue = max_queue
+        self.tts_workers = tts_workers
+        self.max_pitches = max_pitches
+        self.max_artifacts = max_artifacts
+        self.feeds = LRUCache(feed_cache_size)
+        self.tts_cache = LRUCache(tts_cache_size)
+        self.mixer = BaseballAudioMixer()  # Crowd on or off is chosen per render
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Start the render processes now, before any request threads exist
+        self.render_pool = ProcessPoolExecutor(max_workers=max(1, render_processes))
+        for future in [self.render_pool.submit(time.sleep, 0) for _ in range(max(1, render_processes))]:
+            future.result()
+        self.job_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            'requests': 0,
+            'cache_hits': 0,
+            'renders': 0,
+            'coalesced': 0,
+            'busy': 0,
+            'not_found': 0,
+            'failed': 0,
+            'disconnects': 0,
+            'bytes_sent': 0,
+        }
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def resolve_options(self, options):
+        """options with the backend's defaults filled in, so one broadcast always gets one name"""
+        if options.get('voice') is None:
+            options = dict(options, voice=self.backend.voice)
+        return options
+
+    def artifact_path(self, game_pk, options):
+        """Cache file for a broadcast: named by everything that shapes its audio"""
+        settings = dict(self.resolve_options(options), backend=self.backend.name, model=self.backend.model, speed=self.backend.speed,
+                        template=TEMPLATE_VERSION, max_pitches=self.max_pitches)
+        return os.path.join(self.cache_dir, f"{game_pk}-{digest(settings)}.{options['format']}")
+
+    def broadcast(self, game_pk, options):
+        """
+        Find or start the broadcast for a request
+
+        Args:
+            game_pk: Game to broadcast
+            options: dict with 'format', 'voice', 'crowd' and 'mode'
+
+        Returns:
+            (source, artifact): ("cache", the finished broadcast opened for reading -
+            the caller closes it), or ("render" / "joined", RenderJob producing it)
+            for a new or shared render
+
+        Raises:
+            ServiceBusy: If it would have to wait behind max_queue other renders
+        """
+        self.count('requests')
+        options = self.resolve_options(options)
+        output_file = self.artifact_path(game_pk, options)
+        with self._lock:
+            job = self._jobs.get(output_file)
+            if job is not None:
+                self.counters['coalesced'] += 1
+                return "joined", job
+
+            if os.path.exists(output_file):
+                # Opened under the lock, so _prune can't remove it first (an open file stays readable)
+                artifact = open(output_file, 'rb')
+                self.counters['cache_hits'] += 1
+                os.utime(output_file)  # Mark as recently used
+                return "cache", artifact
+
+            if len(self._jobs) >= self.workers + self.max_queue:
+                self.counters['busy'] += 1
+                raise ServiceBusy()
+
+            job = RenderJob(game_pk, options, output_file)
+            if os.path.exists(job.partial_file):
+                os.remove(job.partial_file)  # Left over from an interrupted render
+            self._jobs[output_file] = job
+            self.counters['renders'] += 1
+
+        self.job_pool.submit(self._render, job)
+        return "render", job
+
+    def game(self, game_pk):
+        """Cached game feed (renders of one game that start together share the fetch)"""
+        feed = self.feeds.get(game_pk)
+        if feed is None:
+            count('cache_misses')
+            feed, _ = flight('game').do(game_pk, self.feed, game_pk)
+            self.feeds.put(game_pk, feed)
+        else:
+            count('cache_hits')
+        return feed
+
+    def _render(self, job):
+        options = job.options
+        with span('broadcast', game=job.game_pk, **options):
+            try:
+                feed = self.game(job.game_pk)
+                if not feed['pitch_data']:
+                    raise LookupError(f"No pitch data for game {job.game_pk}")
+
+                result = asyncio.run(run_pipeline(
+                    job.partial_file,
+                    pitch_data=feed['pitch_data'],
+                    key_innings=feed['key_innings'],
+                    away_team=feed['away_team'],
+                    home_team=feed['home_team'],
+                    backend=CachingTTSBackend(self.backend, self.tts_cache, options['voice']),
+                    mixer=self.mixer,
+                    tts_workers=self.tts_workers,
+                    mode=options['mode'],
+                    enable_background_crowd=options['crowd'],
+                    max_pitches=self.max_pitches,
+                    seed=job.game_pk,
+                    pool=self.render_pool
+                ))
+                if result is None:
+                    raise LookupError(f"Nothing to broadcast for game {job.game_pk}")
+                os.replace(job.partial_file, job.output_file)
+            except Exception as e:
+                job.error = e
+                self.count('not_found' if isinstance(e, LookupError) else 'failed')
+                print(f"❌ Game {job.game_pk}: {e}")
+                if os.path.exists(job.partial_file):
+                    os.remove(job.partial_file)
+            finally:
+                with self._lock:
+                    del self._jobs[job.output_file]
+                job.done.set()
+        if job.error is None:
+            self._prune()
+
+    def _prune(self):
+        with self._lock:  # Cache hits open their file under the same lock
+            finished = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                        if ".partial." not in name]
+            finished.sort(key=os.path.getmtime, reverse=True)
+            for stale in finished[self.max_artifacts:]:
+                try:
+                    os.remove(stale)  # Readers that already opened it keep their copy
+                except OSError:
+                    pass  # Still open where open files can't be removed (Windows) - pruned next time
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, rendering=len(self._jobs))
+        stats['feed_cache'] = self.feeds.stats()
+        stats['tts_cache'] = self.tts_cache.stats()
+        stats['single_flight'] = flight_stats()
+        if tracing_enabled():
+            stats['spans'] = summarize(finished_spans())['stages']
+        return stats
+
+    def close(self):
+        self.job_pool.shutdown(wait=True)
+        self.render_pool.shutdown(wait=True)
+
+
+# === HTTP ===
+
+def parse_options(fmt, query):
+    """
+    Broadcast options from a request's query string
+
+    Raises:
+        ValueError: For options that are not understood
+    """
+    def value(name, default):
+        return query.get(name, [default])[-1]
+
+    voice = value('voice', None)
+    if voice is not None and not re.fullmatch(r'[a-z]+', voice):
+        raise ValueError(f"Invalid voice {voice!r}")
+    crowd = value('crowd', '1')
+    if crowd not in ('0', '1'):
+        raise ValueError("crowd must be 0 or 1")
+    mode = value('mode', 'insert')
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    return {'format': fmt, 'voice': voice, 'crowd': crowd == '1', 'mode': mode}
+
+
+class BroadcastServer(ThreadingHTTPServer):
+    """HTTP front end for a BroadcastService"""
+
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, BroadcastRequestHandler)
+        self.service = service
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_background(self):
+        """Serve from a daemon thread and return the thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class BroadcastRequestHandler(BaseHTTPRequestHandler):
+    """Handles /games/{gamePk}/broadcast.{mp3,wav} plus a /stats page"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep load-test output readable
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, headers=None):
+        self._send_json(status, {'error': message}, headers)
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') == '/stats':
+            self._send_json(200, service.stats())
+            return
+
+        match = BROADCAST_ROUTE.match(url.path)
+        if not match:
+            self._send_error(404, f"Unknown route {url.path}")
+            return
+
+        game_pk, fmt = int(match.group(1)), match.group(2)
+        try:
+            options = parse_options(fmt, parse_qs(url.query))
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+
+        try:
+            source, artifact = service.broadcast(game_pk, options)
+        except ServiceBusy:
+            self._send_error(503, "All broadcast workers are busy", {'Retry-After': '5'})
+            return
+
+        try:
+            if source == "cache":
+                self._send_file(artifact, fmt)
+            else:
+                self._stream_job(artifact, fmt, source)
+        except (BrokenPipeError, ConnectionResetError):
+            service.count('disconnects')  # The render carries on and is cached for the next request
+
+    def _send_file(self, f, fmt):
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPES[fmt])
+            self.send_header('Content-Length', str(size))
+            self.send_header('X-Broadcast-Source', 'cache')
+            self.end_headers()
+            while data := f.read(STREAM_CHUNK):
+                self.wfile.write(data)
+        self.server.service.count('bytes_sent', size)
+
+    def _stream_job(self, job, fmt, source):
+        """
+        Send a broadcast while it renders, as chunked transfer encoding
+
+        A .wav header is written before the length is known, so streamed WAVs
+        declare an empty data chunk; players that stream (and cache hits, which
+        get the finished file) are unaffected.
+        """
+        audio = job.open_output()
+        if audio is None:
+            status = 404 if isinstance(job.error, LookupError) else 500
+            self._send_error(status, str(job.error))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES[fmt])
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('X-Broadcast-Source', source)
+        self.end_headers()
+
+        sent = 0
+        with audio:
+            while True:
+                finished = job.done.is_set()
+                data = audio.read(STREAM_CHUNK)
+                if data:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    sent += len(data)
+                elif finished:
+                    break
+                else:
+                    job.done.wait(POLL_S)
+        self.server.service.count('bytes_sent', sent)
+
+        if job.error is not None:
+            self.close_connection = True  # Ending without the last chunk marks the body incomplete
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+
+# === LOAD TEST ===
+
+def load_test(base_url, game_pks, total, concurrency, fmt="wav", query="crowd=1"):
+    """
+    Fire requests at a running service and report latency
+
+    Returns:
+        List of result dicts (one per request)
+    """
+    def fetch(index):
+        game_pk = game_pks[index % len(game_pks)]
+        url = f"{base_url}/games/{game_pk}/broadcast.{fmt}?{query}"
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=600) as response:
+                first = response.read(1)
+                first_byte_s = time.perf_counter() - start
+                size = len(first) + len(response.read())
+                return {'game_pk': game_pk, 'status': response.status, 'first_byte_s': first_byte_s,
+                        'total_s': time.perf_counter() - start, 'bytes': size,
+                        'source': response.headers.get('X-Broadcast-Source')}
+        except urllib.error.HTTPError as e:
+            return {'game_pk': game_pk, 'status': e.code, 'first_byte_s': None,
+                    'total_s': time.perf_counter() - start, 'bytes': 0, 'source': None}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, range(total)))
+    wall_s = time.perf_counter() - start
+
+    def percentile(values, pct):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+    ok = [r for r in results if r['status'] == 200]
+    print("\n" + "=" * 72)
+    print(f"{total} requests for {len(game_pks)} games, {concurrency} at a time, in {wall_s:.2f}s")
+    for source in ('render', 'joined', 'cache'):
+        rows = [r for r in ok if r['source'] == source]
+        if rows:
+            print(f"   {source:>6}: {len(rows):>4}  first byte p50 {percentile([r['first_byte_s'] for r in rows], 50):.3f}s "
+                  f"p99 {percentile([r['first_byte_s'] for r in rows], 99):.3f}s  "
+                  f"complete p50 {percentile([r['total_s'] for r in rows], 50):.3f}s")
+    errors = {}
+    for r in results:
+        if r['status'] != 200:
+            errors[r['status']] = errors.get(r['status'], 0) + 1
+    if errors:
+        print(f"   errors: {errors}")
+    print("=" * 72)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve baseball broadcasts over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8780)
+    parser.add_argument('--tts', choices=['openai', 'local'], default=None,
+                        help="TTS backend (defaults to the TTS_BACKEND environment variable)")
+    parser.add_argument('--feed', choices=sorted(FEEDS), default='statsapi',
+                        help="Where game data comes from ('standin' makes up games offline)")
+    parser.add_argument('--cache-dir', default=".broadcast_cache")
+    parser.add_argument('--workers', type=int, default=2, help="Broadcasts rendered at the same time")
+    parser.add_argument('--max-queue', type=int, default=8, help="Renders allowed to wait before answering 503")
+    parser.add_argument('--render-processes', type=int, default=2)
+    parser.add_argument('--tts-workers', type=int, default=4)
+    parser.add_argument('--load-test', type=int, metavar='REQUESTS',
+                        help="Start the service, send this many requests, report and exit")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--games', default="1,2,3", help="Load test gamePks (comma separated)")
+    parser.add_argument('--trace', help="Write instrumentation spans to this JSON lines file")
+    args = parser.parse_args()
+    if args.trace:
+        enable_tracing(args.trace)
+
+    backend = get_tts_backend(args.tts)
+    if backend is None:
+        return
+
+    service = BroadcastService(backend, FEEDS[args.feed], args.cache_dir, args.workers, args.max_queue,
+                               args.render_processes, args.tts_workers)
+    server = BroadcastServer((args.host, args.port), service)
+    print(f"⚾ Broadcast service listening on {server.url}")
+    print(f"   Try: {server.url}/games/<gamePk>/broadcast.mp3?voice=onyx&crowd=1")
+    print(f"   Stats: {server.url}/stats")
+
+    try:
+        if args.load_test:
+            server.start_in_background()
+            game_pks = [int(pk) for pk in args.games.split(',') if pk.strip()]
+            load_test(server.url, game_pks, args.load_test, args.concurrency)
+            print(json.dumps(service.stats(), indent=1))
+        else:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping service")
+    finally:
+        server.server_close()
+        service.close()
+        if tracing_enabled():
+            print_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Incremental broadcast builds
+Builds a game's broadcast as four stages - feed, script, narration, mix - and
+records in a manifest the hash of every stage's inputs (the previous stage's
+output plus its own settings: pitch selection, template version, seed, voice,
+mix settings). Re-running skips every stage whose inputs are unchanged and
+rebuilds only what is stale; each stage's artifact is named by its input hash,
+so builds with different settings never overwrite each other
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+from fetch_game_data import get_game_pitch_data, get_key_innings_from_scoring, get_recent_games
+from generate_broadcast import TEMPLATE_VERSION, generate_broadcast_units, seeded_rng, select_broadcast_pitches
+from instrumentation import count, enable_tracing, print_summary, span, tracing_enabled
+from tts_backends import get_tts_backend
+from unit_timing import apply_timing, load_timing, synthesize_units
+
+MANIFEST_VERSION = 1
+STAGES = ('feed', 'script', 'narration', 'mix')
+
+
+def digest(value):
+    """Short stable hash of a JSON-serializable value"""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def file_digest(path):
+    """Short hash of a file's contents"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()[:16]
+
+
+def outputs_digest(outputs):
+    """Hash of a stage's output files (dict of output name -> path)"""
+    return digest({name: file_digest(path) for name, path in outputs.items()})
+
+
+class BuildManifest:
+    """
+    Record of what was built for each game, from which inputs
+
+    manifest.json in the build directory holds, per game id:
+        'stages': stage -> input hash -> {'outputs', 'output_hash', 'built_at', 'seconds'}
+        'configs': config hash -> {'settings', stage -> input hash, 'built_at'}
+    A stage is up to date when a record exists for its input hash and its
+    output files are still there, unchanged.
+    """
+
+    def __init__(self, build_dir="builds"):
+        self.build_dir = build_dir
+        self.path = os.path.join(build_dir, "manifest.json")
+        try:
+            with open(self.path) as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+        if self.data.get('version') != MANIFEST_VERSION:
+            self.data = {'version': MANIFEST_VERSION, 'games': {}}
+
+    def game(self, game_id):
+        return self.data['games'].setdefault(str(game_id), {'stages': {}, 'configs': {}})
+
+    def lookup(self, game_id, stage, inputs_hash):
+        """
+        Record of an up-to-date build of a stage
+
+        Returns:
+            Record dict, or None if the stage has to be (re)built
+        """
+        record = self.game(game_id)['stages'].get(stage, {}).get(inputs_hash)
+        if record is None:
+            return None
+        if not all(os.path.exists(path) for path in record['outputs'].values()):
+            return None
+        if record['output_hash'] != outputs_digest(record['outputs']):
+            return None  # Edited or half-written since it was recorded
+        return record
+
+    def record(self, game_id, stage, inputs_hash, outputs, seconds):
+        record = {
+            'outputs': outputs,
+            'output_hash': outputs_digest(outputs),
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+            'seconds': round(seconds, 3),
+        }
+        self.game(game_id)['stages'].setdefault(stage, {})[inputs_hash] = record
+        self.save()
+        return record
+
+    def record_config(self, game_id, config, settings, stage_inputs):
+        entry = dict(stage_inputs, settings=settings, built_at=datetime.now().isoformat(timespec='seconds'))
+        self.game(game_id)['configs'][config] = entry
+        self.save()
+
+    def save(self):
+        """Write the manifest (after every stage, so an interrupted build keeps its progress)"""
+        os.makedirs(self.build_dir, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.data, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+def pitch_events_for(pitches):
+    """Mixer events (timestamps still unset) for the broadcast's selected pitches"""
+    return [{
+        'timestamp_ms': 0,
+        'pitch_type': pitch['pitch_type'],
+        'speed': pitch['speed'],
+        'result': pitch['result'],
+        'at_bat_event': pitch.get('at_bat_event'),
+        'inning': pitch['inning'],
+        'half_inning': pitch['half_inning'],
+    } for pitch in pitches]
+
+
+class GameBuild:
+    """One game's build: runs each stage, or reuses it when its inputs are unchanged"""
+
+    def __init__(self, manifest, game_id):
+        self.manifest = manifest
+        self.game_id = game_id
+        self.game_dir = os.path.join(manifest.build_dir, str(game_id))
+        self.stage_inputs = {}
+        self.actions = {}
+
+    def stage(self, name, inputs, outputs, build, force=False):
+        """
+        Bring a stage up to date
+
+        Args:
+            name: Stage name
+            inputs: JSON-serializable inputs (upstream output hashes and settings)
+            outputs: dict of output name -> file extension
+            build: Callable(paths) that writes every output path
+            force: Rebuild even when a record for these inputs exists
+
+        Returns:
+            (dict of output name -> path, output hash)
+        """
+        inputs_hash = digest([name, inputs])
+        self.stage_inputs[name] = inputs_hash
+        paths = {key: os.path.join(self.game_dir, f"{name}-{inputs_hash}{extension}")
+                 for key, extension in outputs.items()}
+
+        record = None if force else self.manifest.lookup(self.game_id, name, inputs_hash)
+        if record is not None:
+            print(f"   ✔ {name:<9} up to date ({inputs_hash})")
+            self.actions[name] = "cached"
+            count('cache_hits')
+            return record['outputs'], record['output_hash']
+
+        print(f"   ⚙️  {name:<9} building ({inputs_hash})...")
+        os.makedirs(self.game_dir, exist_ok=True)
+        began = time.perf_counter()
+        with span(f'stage.{name}', inputs=inputs_hash) as stage:
+            stage.add('cache_misses')
+            build(paths)
+        record = self.manifest.record(self.game_id, name, inputs_hash, paths, time.perf_counter() - began)
+        self.actions[name] = "built"
+        return record['outputs'], record['output_hash']
+
+
+def build_settings(backend, max_pitches=40, seed=0, mode="insert", enable_background_crowd=True,
+                   away_team=None, home_team=None):
+    """Every setting that shapes a broadcast, grouped by the stage it feeds"""
+    return {
+        'selection': {'max_pitches': max_pitches, 'away_team': away_team, 'home_team': home_team},
+        'template': TEMPLATE_VERSION,
+        'seed': seed,
+        'voice': {'backend': backend.name, 'model': backend.model, 'voice': backend.voice, 'speed': backend.speed},
+        'mix': {'mode': mode, 'crowd': enable_background_crowd},
+    }
+
+
+def build_game(game_id, settings, manifest=None, backend=None, mixer=None, refresh_feed=False):
+    """
+    Bring one game's broadcast up to date, rebuilding only stale stages
+
+    Args:
+        game_id: Game to broadcast
+        settings: dict from build_settings
+        manifest: BuildManifest (defaults to one in builds/)
+        backend: TTSBackend (defaults to get_tts_backend(); only used if narration is stale)
+        mixer: BaseballAudioMixer (defaults to one on sound_effects/)
+        refresh_feed: Fetch the feed again; later stages still reuse their
+            artifacts if the feed came back unchanged
+
+    Returns:
+        dict with 'output' (mixed broadcast), 'config' and 'actions'
+        (stage -> "built" or "cached"), or None if the build failed
+    """
+    manifest = manifest or BuildManifest()
+    build = GameBuild(manifest, game_id)
+    seed = settings['seed']
+
+    def fetch_feed(paths):
+        pitch_data = get_game_pitch_data(game_id)
+        if not pitch_data:
+            raise RuntimeError("no pitch data for this game")
+        with open(paths['feed'], 'w') as f:
+            json.dump({'pitch_data': pitch_data, 'key_innings': get_key_innings_from_scoring(game_id)}, f)
+
+    def load_feed(paths):
+        with open(paths['feed']) as f:
+            return json.load(f)
+
+    def write_script(paths):
+        feed = load_feed(feed_paths)
+        selection = settings['selection']
+        units = generate_broadcast_units(feed['pitch_data'], selection['max_pitches'], feed['key_innings'],
+                                         selection['away_team'], selection['home_team'], seed=seed)
+        with open(paths['units'], 'w') as f:
+            json.dump(units, f, indent=1)
+        with open(paths['script'], 'w') as f:
+            f.write("".join(unit['text'] for unit in units))
+
+    def synthesize(paths):
+        tts = backend or get_tts_backend()
+        if tts is None:
+            raise RuntimeError("no TTS backend available")
+        with open(script_paths['units']) as f:
+            units = json.load(f)
+        synthesize_units(units, paths['audio'], tts)
+
+    def mix(paths):
+        from pydub import AudioSegment
+
+        feed = load_feed(feed_paths)
+        selection = settings['selection']
+        pitches = select_broadcast_pitches(feed['pitch_data'], selection['max_pitches'], feed['key_innings'])
+        pitch_events = pitch_events_for(pitches)
+        apply_timing(pitch_events, load_timing(narration_paths['audio']))
+        narration = AudioSegment.from_file(narration_paths['audio'])
+        # Seeded so the random bat sounds are the same on every rebuild
+        mixer.mix_broadcast_with_effects(narration, pitch_events, paths['audio'],
+                                         enable_background_crowd=settings['mix']['crowd'],
+                                         mode=settings['mix']['mode'], rng=seeded_rng(seed))
+
+    print(f"🔨 Game {game_id}")
+    with span('game', game=game_id, seed=seed) as game_span:
+        try:
+            feed_paths, feed_hash = build.stage('feed', {'game_id': game_id}, {'feed': '.json'}, fetch_feed,
+                                                force=refresh_feed)
+            script_paths, script_hash = build.stage('script', {
+                'feed': feed_hash,
+                'selection': settings['selection'],
+                'template': settings['template'],
+                'seed': seed,
+            }, {'units': '.json', 'script': '.txt'}, write_script)
+            narration_paths, narration_hash = build.stage('narration', {
+                'script': script_hash,
+                'voice': settings['voice'],
+            }, {'audio': '.mp3', 'timing': '.timing.json'}, synthesize)
+
+            if mixer is None:
+                from audio_mixer import BaseballAudioMixer
+                mixer = BaseballAudioMixer()
+            mix_paths, _ = build.stage('mix', {
+                'narration': narration_hash,
+                'feed': feed_hash,
+                'selection': settings['selection'],
+                'seed': seed,
+                'mix': settings['mix'],
+                'sounds': {key: [os.path.getsize(path), os.path.getmtime(path)]
+                           for key, path in sorted(mixer._sound_files.items())},
+            }, {'audio': '.mp3'}, mix)
+            game_span.set(actions=build.actions)
+        except Exception as e:
+            print(f"❌ Build failed for game {game_id}: {e}")
+            return None
+
+    config = digest(settings)
+    manifest.record_config(game_id, config, settings, build.stage_inputs)
+    return {'output': mix_paths['audio'], 'config': config, 'actions': build.actions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build broadcasts incrementally, skipping unchanged stages")
+    parser.add_argument('--game-id', type=int, help="Game to build (defaults to the latest final game)")
+    parser.add_argument('--build-dir', default="builds")
+    parser.add_argument('--max-pitches', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0, help="Seed for script phrasing and bat sounds")
+    parser.add_argument('--mode', choices=['insert', 'overlay'], default='insert')
+    parser.add_argument('--no-crowd', action='store_true')
+    parser.add_argument('--refresh-feed', action='store_true', help="Fetch the game feed again")
+    parser.add_argument('--trace', help="Write instrumentation spans to this JSON lines file")
+    args = parser.parse_args()
+    if args.trace:
+        enable_tracing(args.trace)
+
+    print("🎙️  Incremental Broadcast Build")
+    print("=" * 60)
+
+    game_id = args.game_id
+    away_team = home_team = None
+    if game_id is None:
+        recent_games = get_recent_games(days_back=7)
+        if not recent_games:
+            print("No recent games found")
+            return
+        game = recent_games[0]
+        game_id, away_team, home_team = game['game_id'], game['away_name'], game['home_name']
+        print(f"Game: {away_team} @ {home_team}")
+
+    backend = get_tts_backend()
+    if backend is None:
+        return
+
+    settings = build_settings(backend, args.max_pitches, args.seed, args.mode, not args.no_crowd,
+                              away_team, home_team)
+    result = build_game(game_id, settings, BuildManifest(args.build_dir), backend, refresh_feed=args.refresh_feed)
+    if tracing_enabled():
+        print_summary()
+    if result is None:
+        return
+
+    built = [stage for stage in STAGES if result['actions'].get(stage) == "built"]
+    print(f"\n✅ {result['output']} (config {result['config']})")
+    print(f"   Rebuilt: {', '.join(built) if built else 'nothing - everything was up to date'}")
+
+
+if __name__ == "__main__":
+    main()
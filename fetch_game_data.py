@@ -4,23 +4,42 @@ Data fetching module for MLB games
 Provides functions to retrieve game schedules and pitch-by-pitch data
 """
 
-import statsapi
 import json
 from datetime import datetime, timedelta
-
+from instrumentation import annotate, span, traced, tracing_enabled
+from single_flight import flight
+
+# MLB teams, fetched once per process
+_teams = None
+
+def get_teams():
+    """All MLB teams (StatsAPI 'teams' records), fetched on first use and kept for the process"""
+    global _teams
+    import statsapi  # Imported on first fetch: it pulls in requests, which text-only runs never need
+
+    if _teams is None:
+        with span('fetch.teams'):
+            _teams, _ = flight('feed').do(('teams',), lambda: statsapi.get('teams', {'sportId': 1})['teams'])
+    return _teams
+
+def get_team_id(team_name):
+    """ID of the first team whose name contains team_name (case-insensitive), or None"""
+    for team in get_teams():
+        if team_name.lower() in team['name'].lower():
+            return team['id']
+    return None
+
+@traced('fetch.schedule')
 def get_recent_games(team_name=None, days_back=3):
     """Get recent completed games"""
+    import statsapi
+
     end_date = datetime.now().strftime('%m/%d/%Y')
     start_date = (datetime.now() - timedelta(days=days_back)).strftime('%m/%d/%Y')
     
     if team_name:
         # Get team ID first
-        teams = statsapi.get('teams', {'sportId': 1})['teams']
-        team_id = None
-        for team in teams:
-            if team_name.lower() in team['name'].lower():
-                team_id = team['id']
-                break
+        team_id = get_team_id(team_name)
         
         if team_id:
             schedule = statsapi.schedule(start_date=start_date, end_date=end_date, team=team_id)
@@ -32,11 +51,16 @@ def get_recent_games(team_name=None, days_back=3):
     
     return [game for game in schedule if game['status'] == 'Final']
 
+@traced('fetch.scoring_plays')
 def get_key_innings_from_scoring(game_id):
     """Get innings where runs were scored using StatsAPI scoring plays"""
+    import statsapi
+
     try:
         # Get scoring plays data
-        scoring_text = statsapi.game_scoring_plays(game_id)
+        scoring_text, shared = flight('feed').do(('game_scoring_plays', game_id),
+                                                 statsapi.game_scoring_plays, game_id)
+        annotate(game_id=game_id, shared=shared)
 
         # Parse the scoring plays to extract innings
         key_innings = set()
@@ -64,66 +88,97 @@ def get_key_innings_from_scoring(game_id):
         print(f"Error fetching scoring plays: {e}")
         return []
 
+def get_play_by_play(game_id):
+    """Raw game_playByPlay response; concurrent requests for one game share a single fetch"""
+    import statsapi
+
+    with span('fetch.play_by_play', game=game_id) as fetch:
+        playbyplay, shared = flight('feed').do(('game_playByPlay', game_id),
+                                               statsapi.get, 'game_playByPlay', {'gamePk': game_id})
+        fetch.set(shared=shared)
+        if tracing_enabled() and not shared:
+            fetch.add('bytes_in', len(json.dumps(playbyplay)))  # Size of the decoded response, re-encoded
+    return playbyplay
+
 def get_game_pitch_data(game_id):
     """Get detailed pitch-by-pitch data for a specific game"""
     try:
         # Get play-by-play data
-        playbyplay = statsapi.get('game_playByPlay', {'gamePk': game_id})
-
-        pitch_data = []
-
-        for play in playbyplay.get('allPlays', []):
-            inning = play.get('about', {}).get('inning', 0)
-            half_inning = play.get('about', {}).get('halfInning', '')
-            batter = play.get('matchup', {}).get('batter', {}).get('fullName', 'Unknown')
-            pitcher = play.get('matchup', {}).get('pitcher', {}).get('fullName', 'Unknown')
-
-            # Get the at-bat result (what happened after all pitches)
-            play_result = play.get('result', {})
-            at_bat_event = play_result.get('event', '')  # "Strikeout", "Home Run", "Single", etc.
-            at_bat_description = play_result.get('description', '')
-            rbi = play_result.get('rbi', 0)
-            away_score = play_result.get('awayScore', 0)
-            home_score = play_result.get('homeScore', 0)
-
-            pitch_events = play.get('playEvents', [])
-            num_pitches = len([e for e in pitch_events if e.get('isPitch')])
-
-            for pitch_index, pitch_event in enumerate(pitch_events):
-                if pitch_event.get('isPitch'):
-                    pitch_details = pitch_event.get('pitchData', {})
-                    coordinates = pitch_details.get('coordinates', {})
-
-                    # Check if this is the last pitch of the at-bat
-                    is_last_pitch = (pitch_index == len(pitch_events) - 1)
-
-                    pitch_info = {
-                        'inning': inning,
-                        'half_inning': half_inning,
-                        'batter': batter,
-                        'pitcher': pitcher,
-                        'pitch_type': pitch_event.get('details', {}).get('type', {}).get('description', 'Unknown'),
-                        'speed': pitch_details.get('startSpeed', 0),
-                        'result': pitch_event.get('details', {}).get('description', 'Unknown'),
-                        'balls': pitch_event.get('count', {}).get('balls', 0),
-                        'strikes': pitch_event.get('count', {}).get('strikes', 0),
-                        'zone': pitch_details.get('zone', None),
-                        'pX': coordinates.get('pX', None),  # Horizontal location
-                        'pZ': coordinates.get('pZ', None),  # Vertical location
-                        'at_bat_event': at_bat_event if is_last_pitch else None,  # Add outcome on last pitch
-                        'at_bat_description': at_bat_description if is_last_pitch else None,
-                        'rbi': rbi if is_last_pitch else 0,
-                        'away_score': away_score,
-                        'home_score': home_score
-                    }
-                    pitch_data.append(pitch_info)
-
-        return pitch_data
+        playbyplay = get_play_by_play(game_id)
+        return parse_play_by_play(playbyplay)
 
     except Exception as e:
         print(f"Error fetching game data: {e}")
         return []
 
+@traced('parse')
+def parse_play_by_play(playbyplay):
+    """Extract pitch-by-pitch data from a game_playByPlay response
+
+    Args:
+        playbyplay: Parsed JSON from the StatsAPI game_playByPlay endpoint
+
+    Returns:
+        List of pitch dictionaries in game order
+    """
+    pitch_data = []
+
+    for play in playbyplay.get('allPlays', []):
+        inning = play.get('about', {}).get('inning', 0)
+        half_inning = play.get('about', {}).get('halfInning', '')
+        batter = play.get('matchup', {}).get('batter', {}).get('fullName', 'Unknown')
+        pitcher = play.get('matchup', {}).get('pitcher', {}).get('fullName', 'Unknown')
+
+        # Get the at-bat result (what happened after all pitches)
+        play_result = play.get('result', {})
+        at_bat_event = play_result.get('event', '')  # "Strikeout", "Home Run", "Single", etc.
+        at_bat_description = play_result.get('description', '')
+        rbi = play_result.get('rbi', 0)
+        away_score = play_result.get('awayScore', 0)
+        home_score = play_result.get('homeScore', 0)
+
+        pitch_events = play.get('playEvents', [])
+        num_pitches = len([e for e in pitch_events if e.get('isPitch')])
+
+        for pitch_index, pitch_event in enumerate(pitch_events):
+            if pitch_event.get('isPitch'):
+                pitch_details = pitch_event.get('pitchData', {})
+                coordinates = pitch_details.get('coordinates', {})
+
+                # Check if this is the last pitch of the at-bat
+                is_last_pitch = (pitch_index == len(pitch_events) - 1)
+
+                pitch_info = {
+                    'inning': inning,
+                    'half_inning': half_inning,
+                    'batter': batter,
+                    'pitcher': pitcher,
+                    'pitch_type': pitch_event.get('details', {}).get('type', {}).get('description', 'Unknown'),
+                    'speed': pitch_details.get('startSpeed', 0),
+                    'result': pitch_event.get('details', {}).get('description', 'Unknown'),
+                    'balls': pitch_event.get('count', {}).get('balls', 0),
+                    'strikes': pitch_event.get('count', {}).get('strikes', 0),
+                    'zone': pitch_details.get('zone', None),
+                    'pX': coordinates.get('pX', None),  # Horizontal location
+                    'pZ': coordinates.get('pZ', None),  # Vertical location
+                    'at_bat_event': at_bat_event if is_last_pitch else None,  # Add outcome on last pitch
+                    'at_bat_description': at_bat_description if is_last_pitch else None,
+                    'rbi': rbi if is_last_pitch else 0,
+                    'away_score': away_score,
+                    'home_score': home_score
+                }
+                pitch_data.append(pitch_info)
+
+    annotate(plays=len(playbyplay.get('allPlays', [])), pitches=len(pitch_data))
+    return pitch_data
+
+def scoring_innings(playbyplay):
+    """Innings with a scoring play, from a game_playByPlay response (same as get_key_innings_from_scoring)"""
+    plays = playbyplay.get('allPlays', [])
+    innings = {plays[index].get('about', {}).get('inning', 0)
+               for index in playbyplay.get('scoringPlays', []) if index < len(plays)}
+    return sorted(innings)
+
 def main():
     # Test with a recent game
     print("Fetching recent games...")
@@ -5,6 +5,16 @@ Converts pitch data into natural language broadcast commentary
 """
 import random
 
+from instrumentation import annotate, traced
+
+# Bump whenever the wording or structure of generated scripts changes, so
+# cached scripts (build_manifest.py) are rebuilt
+TEMPLATE_VERSION = 1
+
+def seeded_rng(seed):
+    """Random source for a seed: its own random.Random, or the shared random module for None"""
+    return random if seed is None else random.Random(seed)
+
 def format_pitch_type(pitch_type):
     """Clean up pitch type names"""
     if not pitch_type or pitch_type == "Unknown":
@@ -98,14 +108,17 @@ def format_at_bat_outcome(at_bat_event):
         # Default: just use the event name
         return f"{at_bat_event}."
 
-def generate_pitch_description(pitch, mention_batter=True, mention_pitcher=True):
+def generate_pitch_description(pitch, mention_batter=True, mention_pitcher=True, include_outcome=True, rng=None):
     """Convert pitch data to broadcast text with varied, natural broadcaster style
 
     Args:
         pitch: Pitch data dictionary
         mention_batter: Whether to mention the batter's name (False for continuation pitches)
         mention_pitcher: Whether to mention the pitcher's name (False after introduction)
+        include_outcome: Whether to append the at-bat outcome (see generate_at_bat_text)
+        rng: random.Random for the phrasing choices (defaults to the random module)
     """
+    rng = rng or random
     pitcher = pitch['pitcher'].split()[-1]  # Use last name only
     batter = pitch['batter'].split()[-1]    # Use last name only
 
@@ -120,11 +133,11 @@ def generate_pitch_description(pitch, mention_batter=True, mention_pitcher=True)
 
     # Action verbs for variety (instead of always "delivers")
     pitch_verbs = ["fires", "deals", "throws", "comes with"]
-    verb = random.choice(pitch_verbs)
+    verb = rng.choice(pitch_verbs)
 
     # Transitional phrases for natural flow (used occasionally)
     transitions = ["Working quickly, ", "Takes his time, ", "Sets and ", ""]
-    transition = random.choice(transitions) if mention_pitcher and random.random() < 0.3 else ""
+    transition = rng.choice(transitions) if mention_pitcher and rng.random() < 0.3 else ""
 
     # Build pitch speed and type description
     speed_int = int(round(speed)) if speed > 0 else None
@@ -158,7 +171,7 @@ def generate_pitch_description(pitch, mention_batter=True, mention_pitcher=True)
         count_context = "3-0 count... "
 
     # Choose sentence pattern randomly for variety
-    pattern = random.randint(1, 4)
+    pattern = rng.randint(1, 4)
 
     # Pattern 1: Direct with action verb (with transitional phrases)
     if pattern == 1:
@@ -218,21 +231,29 @@ def generate_pitch_description(pitch, mention_batter=True, mention_pitcher=True)
             pitch_text = f"{count_context}The {pitch_type}. {outcome.capitalize()}."
 
     # Add at-bat outcome if this is the last pitch
+    if include_outcome:
+        pitch_text += generate_at_bat_text(pitch)
+
+    return pitch_text
+
+def generate_at_bat_text(pitch):
+    """At-bat outcome and runs batted in, spoken after the last pitch of an at-bat ("" otherwise)"""
+    text = ""
     at_bat_event = pitch.get('at_bat_event')
     if at_bat_event:
         at_bat_outcome = format_at_bat_outcome(at_bat_event)
         if at_bat_outcome:
-            pitch_text += f" {at_bat_outcome}"
+            text += f" {at_bat_outcome}"
 
         # Add RBI and score if runs were scored
         rbi = pitch.get('rbi', 0)
         if rbi > 0:
             if rbi == 1:
-                pitch_text += f" That brings in a run."
+                text += f" That brings in a run."
             else:
-                pitch_text += f" That brings in {rbi} runs."
+                text += f" That brings in {rbi} runs."
 
-    return pitch_text
+    return text
 
 def generate_inning_intro(inning, half_inning, prev_inning=None, prev_half=None):
     """Generate inning transitions"""
@@ -274,7 +295,24 @@ def select_pitches_from_key_innings(pitch_data, key_innings):
 
     return selected_pitches
 
-def generate_broadcast_script(pitch_data, max_pitches=50, key_innings=None, away_team=None, home_team=None):
+def select_broadcast_pitches(pitch_data, max_pitches=50, key_innings=None):
+    """Pitches the broadcast covers, in order (pitch_index in broadcast units refers to this list)"""
+    # Select pitches based on key innings if provided
+    if key_innings:
+        selected_pitches = select_pitches_from_key_innings(pitch_data, key_innings)
+        print(f"Selected {len(selected_pitches)} pitches from innings: {key_innings}")
+    elif len(pitch_data) > max_pitches:
+        # Fallback: Take key moments: first few innings, middle, and end
+        selected_pitches = (
+            pitch_data[:15] +  # First 15 pitches
+            pitch_data[len(pitch_data)//2:len(pitch_data)//2+10] +  # 10 from middle
+            pitch_data[-25:]   # Last 25 pitches
+        )
+    else:
+        selected_pitches = pitch_data
+    return selected_pitches
+
+def generate_broadcast_script(pitch_data, max_pitches=50, key_innings=None, away_team=None, home_team=None, seed=None):
     """Convert pitch data into a natural broadcast script
 
     Args:
@@ -283,27 +321,42 @@ def generate_broadcast_script(pitch_data, max_pitches=50, key_innings=None, away
         key_innings: List of specific innings to include (e.g., [1, 3, 7, 9])
         away_team: Away team name (for score summaries)
         home_team: Home team name (for score summaries)
+        seed: Seed for the phrasing choices (None for a different script each run)
     """
     if not pitch_data:
         return "No game data available."
 
-    script_lines = []
+    units = generate_broadcast_units(pitch_data, max_pitches, key_innings, away_team, home_team, seed)
+    return "".join(unit['text'] for unit in units)
+
+@traced('script')
+def generate_broadcast_units(pitch_data, max_pitches=50, key_innings=None, away_team=None, home_team=None, seed=None):
+    """Build the broadcast script as a list of speakable units
+
+    Joining the units' text gives exactly the script generate_broadcast_script returns.
+    Synthesizing units separately lets the audio pipeline time each one.
+
+    Args:
+        Same as generate_broadcast_script
+
+    Returns:
+        List of dicts with 'kind' ('intro', 'pitch', 'outcome', 'summary' or 'break'
+        for whitespace), 'text' and 'pitch_index' (position of the pitch among the
+        broadcast's selected pitches, None for units not tied to a pitch)
+    """
+    rng = seeded_rng(seed)
+    units = []
+
+    def add(kind, text, pitch_index=None):
+        units.append({'kind': kind, 'text': text, 'pitch_index': pitch_index})
+
+    if not pitch_data:
+        return units
+
     prev_inning = None
     prev_half = None
 
-    # Select pitches based on key innings if provided
-    if key_innings:
-        selected_pitches = select_pitches_from_key_innings(pitch_data, key_innings)
-        print(f"Selected {len(selected_pitches)} pitches from innings: {key_innings}")
-    elif len(pitch_data) > max_pitches:
-        # Fallback: Take key moments: first few innings, middle, and end
-        selected_pitches = (
-            pitch_data[:15] +  # First 15 pitches
-            pitch_data[len(pitch_data)//2:len(pitch_data)//2+10] +  # 10 from middle
-            pitch_data[-25:]   # Last 25 pitches
-        )
-    else:
-        selected_pitches = pitch_data
+    selected_pitches = select_broadcast_pitches(pitch_data, max_pitches, key_innings)
     
     prev_batter = None
     prev_pitcher = None
@@ -318,10 +371,10 @@ def generate_broadcast_script(pitch_data, max_pitches=50, key_innings=None, away
         # Check if inning half ended (before starting new half)
         if prev_inning is not None and (prev_inning != current_inning or prev_half != current_half):
             # Add score summary at end of previous half inning
-            script_lines.append("\n")
+            add('break', "\n")
             score_summary = generate_inning_summary(prev_away_score, prev_home_score, away_team, home_team)
-            script_lines.append(score_summary)
-            script_lines.append("\n")
+            add('summary', score_summary)
+            add('break', "\n")
 
         # Add inning introduction if needed
         inning_intro = generate_inning_intro(
@@ -333,10 +386,10 @@ def generate_broadcast_script(pitch_data, max_pitches=50, key_innings=None, away
 
         if inning_intro:
             # Add extra line break before new inning
-            if script_lines:
-                script_lines.append("\n")
-            script_lines.append(inning_intro)
-            script_lines.append("\n")
+            if units:
+                add('break', "\n")
+            add('intro', inning_intro)
+            add('break', "\n")
             # Reset tracking for new inning
             prev_batter = None
             prev_pitcher_in_inning = None
@@ -359,9 +412,13 @@ def generate_broadcast_script(pitch_data, max_pitches=50, key_innings=None, away
         mention_batter = (current_batter != prev_batter)
 
         # Add pitch description
-        pitch_desc = generate_pitch_description(pitch, mention_batter=mention_batter, mention_pitcher=mention_pitcher)
-        script_lines.append(pitch_desc)
-        script_lines.append(" ")
+        pitch_desc = generate_pitch_description(pitch, mention_batter=mention_batter, mention_pitcher=mention_pitcher,
+                                                include_outcome=False, rng=rng)
+        add('pitch', pitch_desc, i)
+        at_bat_text = generate_at_bat_text(pitch)
+        if at_bat_text:
+            add('outcome', at_bat_text, i)
+        add('break', " ")
 
         # Check if at-bat ended (ball in play means batter's turn is likely over)
         result = pitch['result'].lower()
@@ -380,7 +437,7 @@ def generate_broadcast_script(pitch_data, max_pitches=50, key_innings=None, away
 
         # Add paragraph break after at-bat ends for natural breathing room
         if at_bat_ended:
-            script_lines.append("\n\n")
+            add('break', "\n\n")
 
         prev_inning = pitch['inning']
         prev_half = pitch['half_inning']
@@ -388,12 +445,13 @@ def generate_broadcast_script(pitch_data, max_pitches=50, key_innings=None, away
     # Add final score summary at end of game
     if selected_pitches:
         final_pitch = selected_pitches[-1]
-        script_lines.append("\n\n")
+        add('break', "\n\n")
         final_score_summary = generate_inning_summary(final_pitch['away_score'], final_pitch['home_score'], away_team, home_team)
-        script_lines.append(final_score_summary)
-        script_lines.append("\n")
+        add('summary', final_score_summary)
+        add('break', "\n")
 
-    return "".join(script_lines)
+    annotate(units=len(units), characters=sum(len(unit['text']) for unit in units))
+    return units
 
 def main():
     # Test with sample pitch data
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Broadcast instrumentation
+Nested spans per game - fetches, parsing, script rendering, each TTS request,
+mixing and export - recording wall time, bytes in/out, characters billed, cache
+hits and misses and how far each span raised the process memory high-water mark. Off (and close to free)
+until enable_tracing() or BROADCAST_TRACE=<file.jsonl>; finished spans are
+written as JSON lines, and the summary table shows where each broadcast's time
+and money went. Run this module on a trace file to summarize it later
+"""
+
+import argparse
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage; spans then record no memory
+    resource = None
+
+TTS_COST_PER_1K_CHARS = 0.015   # OpenAI tts-1 pricing, for the summary's cost estimate
+MAX_KEPT_SPANS = 100000         # Finished spans kept in memory for the summary (a service runs for days)
+
+_current = contextvars.ContextVar('broadcast_span', default=None)
+_span_ids = itertools.count(1)
+_tracer = None
+
+
+def rss_peak_mb():
+    """Process memory high-water mark (peak resident set) in MB, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1e6 if sys.platform == 'darwin' else 1e3), 1)  # Bytes on macOS, KB on Linux
+
+
+class Span:
+    """One timed piece of work, nested under the span that was current when it started"""
+
+    def __init__(self, tracer, name, parent, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.id = next(_span_ids)
+        self.game = attributes.pop('game', None) or (parent.game if parent else None)
+        self.attributes = attributes
+        self.counters = {}      # Counted in this span
+        self.totals = {}        # Counted in this span and everything under it
+        self.started = time.time()
+        self._began = time.perf_counter()
+        self._rss_before = rss_peak_mb()
+        self._lock = threading.Lock()
+
+    def add(self, counter, amount=1):
+        """Add to one of this span's counters (e.g. 'bytes_out', 'cache_hits')"""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+            self.totals[counter] = self.totals.get(counter, 0) + amount
+
+    def set(self, **attributes):
+        """Attach attributes (voice, chunk count, action...) to the span; game= sets its game"""
+        if 'game' in attributes:
+            self.game = attributes.pop('game')  # Spans started after this inherit it
+        self.attributes.update(attributes)
+
+    def _add_child_totals(self, totals):
+        with self._lock:
+            for counter, amount in totals.items():
+                self.totals[counter] = self.totals.get(counter, 0) + amount
+
+    def finish(self):
+        # ru_maxrss only ever rises, so a span owns just the part of the peak it added
+        # (zero for every span after the peak); concurrent spans share their growth
+        rss_peak = rss_peak_mb()
+        record = {
+            'id': self.id,
+            'parent': self.parent.id if self.parent else None,
+            'game': self.game,
+            'name': self.name,
+            'start': round(self.started, 6),
+            'wall_ms': round((time.perf_counter() - self._began) * 1000, 3),
+            'thread': threading.current_thread().name,
+            'process_rss_peak_mb': rss_peak,
+            'rss_growth_mb': round(rss_peak - self._rss_before, 1) if rss_peak is not None else None,
+            'attributes': self.attributes,
+            'counters': self.counters,
+            'totals': self.totals,
+        }
+        if self.parent is not None:
+            self.parent._add_child_totals(self.totals)
+        self.tracer.record(record)
+
+
+class _NullSpan:
+    """Stands in for a Span while tracing is off"""
+
+    def add(self, counter, amount=1):
+        pass
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects finished spans and appends each one to a JSON lines file"""
+
+    def __init__(self, output_file=None, max_spans=MAX_KEPT_SPANS):
+        self.output_file = output_file
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._file = open(output_file, 'a') if output_file else None
+
+    def record(self, span):
+        line = json.dumps(span, default=str)
+        with self._lock:
+            self.spans.append(span)
+            if self._file is not None:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def enable_tracing(output_file=None):
+    """
+    Start recording spans
+
+    Args:
+        output_file: JSON lines file to append every finished span to (None keeps them in memory only)
+
+    Returns:
+        The Tracer
+    """
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = Tracer(output_file)
+    return _tracer
+
+
+def disable_tracing():
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = None
+
+
+def tracing_enabled():
+    return _tracer is not None
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """
+    Time the enclosed work as a span under the current one
+
+    Args:
+        name: What the work is ('fetch.play_by_play', 'tts.request', 'mix'...)
+        **attributes: Recorded with the span; game=<gamePk> starts a game's
+            span tree (children inherit it)
+
+    Yields:
+        The Span (a no-op stand-in while tracing is off)
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield _NULL_SPAN
+        return
+
+    current = Span(tracer, name, _current.get(), attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        current.finish()
+
+
+def count(counter, amount=1):
+    """Add to a counter of the current span, if any (for code deep inside a span)"""
+    current = _current.get()
+    if current is not None:
+        current.add(counter, amount)
+
+
+def annotate(**attributes):
+    """Attach attributes to the current span, if any"""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def traced(name):
+    """Decorator: run every call of the function as a span called name"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(fn):
+    """
+    fn, run under the current span even from another thread
+
+    Thread pools do not inherit the caller's context, so wrap work submitted to
+    one (pool.map(bind(fn), items)) to keep its spans in the right tree.
+    """
+    parent = _current.get()
+    if parent is None:
+        return fn
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+# === SUMMARY ===
+
+def finished_spans():
+    """Spans recorded so far in this process (most recent MAX_KEPT_SPANS)"""
+    if _tracer is None:
+        return []
+    with _tracer._lock:
+        return list(_tracer.spans)
+
+
+def load_spans(trace_file):
+    """Spans from a JSON lines trace file"""
+    with open(trace_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(spans):
+    """
+    Aggregate spans by name, and per game
+
+    Returns:
+        dict with 'stages' (name -> count, total/max ms and summed counters),
+        'games' (game -> wall ms of its top spans, counter totals and how far they
+        raised the memory high-water mark) and 'process_rss_peak_mb' (the highest
+        process-wide peak any span saw)
+    """
+    stages, games = {}, {}
+    process_peak = None
+    for record in spans:
+        stage = stages.setdefault(record['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'counters': {}})
+        stage['count'] += 1
+        stage['total_ms'] += record['wall_ms']
+        stage['max_ms'] = max(stage['max_ms'], record['wall_ms'])
+        for counter, amount in record['counters'].items():
+            stage['counters'][counter] = stage['counters'].get(counter, 0) + amount
+        if record.get('process_rss_peak_mb') is not None:  # Absent from older trace files
+            process_peak = max(process_peak or 0.0, record['process_rss_peak_mb'])
+
+        if record['parent'] is None and record['game'] is not None:
+            game = games.setdefault(record['game'], {'spans': 0, 'wall_ms': 0.0, 'totals': {}, 'rss_growth_mb': None})
+            game['spans'] += 1
+            game['wall_ms'] += record['wall_ms']
+            if record.get('rss_growth_mb') is not None:
+                game['rss_growth_mb'] = round((game['rss_growth_mb'] or 0.0) + record['rss_growth_mb'], 1)
+            for counter, amount in record['totals'].items():
+                game['totals'][counter] = game['totals'].get(counter, 0) + amount
+
+    for stage in stages.values():
+        stage['total_ms'] = round(stage['total_ms'], 3)
+    for game in games.values():
+        game['wall_ms'] = round(game['wall_ms'], 3)
+    return {'stages': stages, 'games': games, 'process_rss_peak_mb': process_peak}
+
+
+def print_summary(spans=None):
+    """Print time, bytes, characters and cache use per stage, then per game"""
+    summary = summarize(finished_spans() if spans is None else spans)
+    if not summary['stages']:
+        return
+
+    print("\n" + "=" * 100)
+    print(f"{'span':<24} {'count':>6} {'total s':>9} {'mean ms':>9} {'max ms':>9} "
+          f"{'in MB':>8} {'out MB':>8} {'chars':>9} {'hit/miss':>11}")
+    print("-" * 100)
+    for name, stage in sorted(summary['stages'].items(), key=lambda item: -item[1]['total_ms']):
+        counters = stage['counters']
+        cache = f"{counters.get('cache_hits', 0)}/{counters.get('cache_misses', 0)}"
+        print(f"{name:<24} {stage['count']:>6} {stage['total_ms'] / 1000:>9.2f} "
+              f"{stage['total_ms'] / stage['count']:>9.1f} {stage['max_ms']:>9.1f} "
+              f"{counters.get('bytes_in', 0) / 1e6:>8.2f} {counters.get('bytes_out', 0) / 1e6:>8.2f} "
+              f"{counters.get('characters_billed', 0):>9,} {cache:>11}")
+
+    if summary['games']:
+        print("-" * 100)
+        for game, totals in sorted(summary['games'].items(), key=lambda item: str(item[0])):
+            counters = totals['totals']
+            characters = counters.get('characters_billed', 0)
+            growth = f", raised peak RSS {totals['rss_growth_mb']:.0f} MB" if totals['rss_growth_mb'] else ""
+            print(f"⚾ Game {game}: {totals['wall_ms'] / 1000:.2f}s, {characters:,} characters billed "
+                  f"(~${characters / 1000 * TTS_COST_PER_1K_CHARS:.4f}), "
+                  f"cache {counters.get('cache_hits', 0)} hits / {counters.get('cache_misses', 0)} misses, "
+                  f"{counters.get('bytes_in', 0) / 1e6:.1f} MB in / {counters.get('bytes_out', 0) / 1e6:.1f} MB out{growth}")
+    if summary['process_rss_peak_mb'] is not None:
+        print(f"🧠 Process peak RSS: {summary['process_rss_peak_mb']:.0f} MB (whole process, every game)")
+    print("=" * 100)
+
+
+# Tracing for any entry point, without a flag: BROADCAST_TRACE=trace.jsonl python ...
+if os.environ.get('BROADCAST_TRACE'):
+    enable_tracing(os.environ['BROADCAST_TRACE'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a broadcast trace (JSON lines of spans)")
+    parser.add_argument('trace_file')
+    parser.add_argument('--game', help="Only this game's spans")
+    args = parser.parse_args()
+
+    spans = load_spans(args.trace_file)
+    if args.game:
+        spans = [record for record in spans if str(record['game']) == args.game]
+    if not spans:
+        print(f"No spans in {args.trace_file}")
+        return
+    print_summary(spans)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Frame-level MP3 tools
+Parses MPEG audio frames and stitches MP3 chunks together without decoding or
+re-encoding, writing a Xing/Info header so players see the correct duration
+"""
+
+import struct
+
+# Bitrates in kbps, indexed by [MPEG-1?][layer][bitrate index]
+_BITRATES = {
+    True: {
+        1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+        3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    },
+    False: {
+        1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+
+# Sample rates indexed by version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+
+_LAYERS = {3: 1, 2: 2, 1: 3}  # Layer bits -> layer number
+
+_header_cache = {}
+
+
+class FrameHeader:
+    """Decoded 4-byte MPEG audio frame header"""
+
+    __slots__ = ('raw', 'version_bits', 'layer', 'bitrate_kbps', 'sample_rate',
+                 'padding', 'channel_mode', 'frame_length', 'samples_per_frame')
+
+    @property
+    def mpeg1(self):
+        return self.version_bits == 3
+
+    @property
+    def channels(self):
+        return 1 if self.channel_mode == 3 else 2
+
+    @property
+    def side_info_length(self):
+        """Layer III side information size, which precedes a Xing/Info tag"""
+        if self.mpeg1:
+            return 17 if self.channels == 1 else 32
+        return 9 if self.channels == 1 else 17
+
+
+def parse_header(raw):
+    """
+    Decode a frame header from its 32-bit big-endian value
+
+    Returns:
+        FrameHeader, or None if the value is not a valid header
+    """
+    header = _header_cache.get(raw)
+    if header is not None or raw in _header_cache:
+        return header
+
+    header = None
+    version_bits = (raw >> 19) & 0b11
+    layer_bits = (raw >> 17) & 0b11
+    bitrate_index = (raw >> 12) & 0b1111
+    sample_rate_index = (raw >> 10) & 0b11
+
+    if ((raw >> 21) & 0x7FF) == 0x7FF and version_bits != 1 and layer_bits != 0 \
+            and bitrate_index not in (0, 15) and sample_rate_index != 3:
+        header = FrameHeader()
+        header.raw = raw
+        header.version_bits = version_bits
+        header.layer = _LAYERS[layer_bits]
+        header.bitrate_kbps = _BITRATES[version_bits == 3][header.layer][bitrate_index]
+        header.sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+        header.padding = (raw >> 9) & 1
+        header.channel_mode = (raw >> 6) & 0b11
+
+        bitrate = header.bitrate_kbps * 1000
+        if header.layer == 1:
+            header.frame_length = (12 * bitrate // header.sample_rate + header.padding) * 4
+            header.samples_per_frame = 384
+        elif header.layer == 2 or header.mpeg1:
+            header.frame_length = 144 * bitrate // header.sample_rate + header.padding
+            header.samples_per_frame = 1152
+        else:
+            header.frame_length = 72 * bitrate // header.sample_rate + header.padding
+            header.samples_per_frame = 576
+
+    _header_cache[raw] = header
+    return header
+
+
+def _skip_id3v2(data):
+    """Offset of the first byte after a leading ID3v2 tag"""
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _is_info_frame(data, offset, header):
+    """True for a Xing/Info/VBRI metadata frame, which carries no audio"""
+    if header.layer != 3:
+        return False
+    tag_offset = offset + 4 + header.side_info_length
+    if bytes(data[tag_offset:tag_offset + 4]) in (b'Xing', b'Info'):
+        return True
+    return bytes(data[offset + 36:offset + 40]) == b'VBRI'
+
+
+def iter_frames(data):
+    """
+    Yield (offset, FrameHeader) for every audio frame in an MP3 buffer
+
+    Skips ID3v2/ID3v1 tags and Xing/Info/VBRI metadata frames, and resyncs past junk.
+    """
+    data = memoryview(data)
+    end = len(data)
+    if end >= 128 and bytes(data[end - 128:end - 125]) == b'TAG':
+        end -= 128  # ID3v1 tag at the very end
+
+    offset = _skip_id3v2(data)
+    first = True
+    while offset + 4 <= end:
+        header = parse_header(struct.unpack_from('>I', data, offset)[0])
+        if header is None or offset + header.frame_length > end:
+            offset += 1  # Lost sync - scan for the next frame
+            continue
+        if not (first and _is_info_frame(data, offset, header)):
+            yield offset, header
+        first = False
+        offset += header.frame_length
+
+
+def stream_audio_frames(pieces):
+    """
+    Pass an MP3 byte stream through as its audio frames, as they arrive
+
+    The streaming counterpart of iter_frames: ID3 tags and the leading Xing/Info/VBRI
+    frame are dropped, so MP3 responses can be appended one after another to a
+    growing file without per-response metadata landing in the middle of the audio.
+
+    Args:
+        pieces: Iterable of bytes making up one MP3 stream
+
+    Yields:
+        bytes holding one or more whole audio frames
+    """
+    buffer = bytearray()
+    offset = None   # Unknown until the leading ID3v2 tag (if any) has been seen
+    first = True
+    for piece in pieces:
+        buffer += piece
+        if offset is None:
+            skip = _skip_id3v2(buffer)
+            if len(buffer) < 10 or len(buffer) < skip:
+                continue
+            offset = skip
+
+        frames = []
+        while offset + 4 <= len(buffer):
+            header = parse_header(struct.unpack_from('>I', buffer, offset)[0])
+            if header is None:
+                offset += 1  # Lost sync (or a trailing ID3v1 tag) - scan for the next frame
+                continue
+            if offset + header.frame_length > len(buffer):
+                break  # Wait for the rest of the frame
+            if not (first and _is_info_frame(buffer, offset, header)):
+                frames.append(bytes(buffer[offset:offset + header.frame_length]))
+            first = False
+            offset += header.frame_length
+        del buffer[:offset]
+        offset = 0
+        if frames:
+            yield b''.join(frames)
+
+
+def mp3_duration_seconds(data):
+    """Playing time of an MP3 buffer, counted frame by frame"""
+    samples = 0
+    sample_rate = None
+    for _, header in iter_frames(data):
+        samples += header.samples_per_frame
+        sample_rate = header.sample_rate
+    return samples / sample_rate if sample_rate else 0.0
+
+
+def _info_frame(template, frame_count, byte_count, frame_offsets, vbr):
+    """
+    Build a silent Layer III frame carrying a Xing (VBR) or Info (CBR) tag
+
+    Args:
+        template: FrameHeader of the audio frames (version, rate and channels are copied)
+        frame_count: Number of audio frames that follow
+        byte_count: Total file size including this frame
+        frame_offsets: File offset of each audio frame, for the seek table
+        vbr: True when the audio frames use more than one bitrate
+    """
+    tag_offset = 4 + template.side_info_length
+    needed = tag_offset + 4 + 4 + 4 + 4 + 100
+
+    bitrates = _BITRATES[template.mpeg1][3]
+    for bitrate_index in range(1, len(bitrates)):
+        raw = (template.raw & ~(0b1111 << 12) & ~(1 << 9) & ~(1 << 16)) | (bitrate_index << 12) | (1 << 16)
+        header = parse_header(raw)
+        if header is not None and header.frame_length >= needed:
+            break
+    else:
+        raise ValueError("No bitrate leaves room for a Xing header")
+
+    # Seek table: byte position (as 1/256ths of the file) at each percent of playing time
+    toc = bytearray(100)
+    if frame_count:
+        for percent in range(100):
+            position = frame_offsets[min(frame_count - 1, percent * frame_count // 100)]
+            toc[percent] = min(255, position * 256 // byte_count)
+
+    frame = bytearray(header.frame_length)
+    struct.pack_into('>I', frame, 0, header.raw)
+    frame[tag_offset:tag_offset + 4] = b'Xing' if vbr else b'Info'
+    struct.pack_into('>III', frame, tag_offset + 4, 0x7, frame_count, byte_count)  # Frames, bytes, TOC
+    frame[tag_offset + 16:tag_offset + 116] = toc
+    return bytes(frame)
+
+
+def stitch_mp3(chunks):
+    """
+    Concatenate MP3 chunks at the frame level, without decoding or re-encoding
+
+    Tags and per-chunk Xing/Info frames are dropped, audio frames are copied as-is,
+    and a single Xing/Info header with the total frame count, byte count and seek
+    table is written first so players report the correct duration.
+
+    Args:
+        chunks: Iterable of MP3 byte strings in playback order
+
+    Returns:
+        bytes of the combined MP3
+    """
+    spans = []          # (chunk, start, stop) byte ranges of contiguous frames
+    frame_lengths = []
+    template = None
+    bitrates = set()
+
+    for chunk in chunks:
+        span_start = span_stop = None
+        for offset, header in iter_frames(chunk):
+            if template is None:
+                template = header
+            elif (header.sample_rate, header.channels, header.layer) != \
+                    (template.sample_rate, template.channels, template.layer):
+                raise ValueError(
+                    f"Can't stitch {header.sample_rate} Hz/{header.channels} ch frames onto "
+                    f"{template.sample_rate} Hz/{template.channels} ch audio"
+                )
+            if offset != span_stop:
+                if span_start is not None:
+                    spans.append((chunk, span_start, span_stop))
+                span_start = offset
+            span_stop = offset + header.frame_length
+            frame_lengths.append(header.frame_length)
+            bitrates.add(header.bitrate_kbps)
+        if span_start is not None:
+            spans.append((chunk, span_start, span_stop))
+
+    if template is None:
+        return b''
+
+    audio_bytes = sum(frame_lengths)
+    parts = [bytes(memoryview(chunk)[start:stop]) for chunk, start, stop in spans]
+
+    if template.layer != 3:
+        return b''.join(parts)  # Xing headers are a Layer III convention
+
+    # The info frame's size depends only on the stream format, so build it twice:
+    # once to learn its length, then with the final offsets
+    info_length = len(_info_frame(template, 0, 1, [], False))
+    offsets = []
+    position = info_length
+    for length in frame_lengths:
+        offsets.append(position)
+        position += length
+    info = _info_frame(template, len(frame_lengths), info_length + audio_bytes, offsets, len(bitrates) > 1)
+    return b''.join([info] + parts)
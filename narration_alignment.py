@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Narration alignment
+Finds where each pitch is actually spoken by measuring the narration itself: a
+short-time RMS envelope locates the pauses between sentences, and the script's
+pitch boundaries are snapped onto them - so sound effects land in the gaps
+instead of drifting with a words-per-minute guess
+"""
+
+import numpy as np
+
+from audio_mixer import segment_samples
+from tts_backends import SCRIPT_TOKEN_RE, LocalTTSBackend, count_syllables
+
+WINDOW_MS = 10          # RMS analysis window
+MIN_PAUSE_MS = 150      # Shorter quiet stretches are gaps between words
+SILENCE_RANGE_DB = 35   # Quieter than this below the loud parts counts as a pause
+MAX_SHIFT_MS = 2500     # Furthest a boundary may be snapped from its estimate
+
+# Default speaking time of script tokens, in syllables, for estimating where text
+# falls: the local engine's broadcaster pacing. Pass weights measured from a real
+# voice to speech_timeline / align_pitch_events to model it instead
+WORD_GAP_WEIGHT = LocalTTSBackend.WORD_GAP_MS / LocalTTSBackend.SYLLABLE_MS
+PAUSE_WEIGHTS = {token: ms / LocalTTSBackend.SYLLABLE_MS for token, ms in LocalTTSBackend.PAUSE_MS.items()}
+
+
+def rms_envelope(samples, frame_rate, window_ms=WINDOW_MS):
+    """
+    Short-time RMS level of a signal, one value per window
+
+    Args:
+        samples: (frames, channels) or (frames,) integer samples
+        frame_rate: Sample rate
+        window_ms: Window length in milliseconds
+
+    Returns:
+        (levels in dBFS as a float array, window length in frames)
+    """
+    samples = np.asarray(samples)
+    limit = float(np.iinfo(samples.dtype).max) if samples.dtype.kind == 'i' else 1.0
+    if samples.ndim == 2:
+        samples = samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+
+    hop = max(1, int(frame_rate * window_ms / 1000))
+    windows = len(samples) // hop
+    if not windows:
+        return np.zeros(0), hop
+
+    framed = samples[:windows * hop].reshape(windows, hop).astype(np.float32)
+    power = np.einsum('ij,ij->i', framed, framed) / hop
+    levels = 10 * np.log10(np.maximum(power, 1e-12) / (limit * limit))
+    return levels, hop
+
+
+def detect_pauses(samples, frame_rate, window_ms=WINDOW_MS, min_pause_ms=MIN_PAUSE_MS,
+                  silence_range_db=SILENCE_RANGE_DB):
+    """
+    Quiet stretches long enough to be pauses between phrases
+
+    The silence threshold is relative to the narration's loud parts (95th
+    percentile level), so it works at any recording level.
+
+    Returns:
+        (N, 2) int array of [start_ms, end_ms) pauses in time order
+    """
+    levels, hop = rms_envelope(samples, frame_rate, window_ms)
+    if not len(levels):
+        return np.zeros((0, 2), dtype=np.int64)
+
+    threshold = np.percentile(levels, 95) - silence_range_db
+    quiet = np.concatenate(([0], (levels < threshold).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(quiet))
+    starts, ends = edges[0::2], edges[1::2]
+
+    long_enough = (ends - starts) * window_ms >= min_pause_ms
+    window_to_ms = hop * 1000.0 / frame_rate
+    return np.stack([starts[long_enough] * window_to_ms, ends[long_enough] * window_to_ms], axis=1).astype(np.int64)
+
+
+def speech_timeline(script, pause_weights=None, word_gap_weight=WORD_GAP_WEIGHT):
+    """
+    Estimated relative speaking time at each token boundary of a script
+
+    Words count their syllables, punctuation counts as a pause. The weights are
+    only relative - alignment scales them to the narration's real length.
+
+    Args:
+        script: Script text
+        pause_weights: dict of punctuation token -> pause length in syllables
+            (defaults to PAUSE_WEIGHTS)
+        word_gap_weight: Gap after each word, in syllables
+
+    Returns:
+        (character offsets, cumulative weight at each offset) as float arrays
+    """
+    pause_weights = pause_weights or PAUSE_WEIGHTS
+    offsets = [0]
+    weights = [0.0]
+    total = 0.0
+    for match in SCRIPT_TOKEN_RE.finditer(script):
+        token = match.group()
+        if token in pause_weights:
+            total += pause_weights[token]
+        else:
+            total += count_syllables(token) + word_gap_weight
+        offsets.append(match.end())
+        weights.append(total)
+    return np.array(offsets, dtype=np.float64), np.array(weights)
+
+
+def text_offsets(script, texts):
+    """
+    Character span of each text in the script, searched in order
+
+    Returns:
+        List of (start, end) offsets, or None for texts not found
+    """
+    spans = []
+    position = 0
+    for text in texts:
+        start = script.find(text, position)
+        if start < 0:
+            spans.append(None)
+            continue
+        spans.append((start, start + len(text)))
+        position = start + len(text)
+    return spans
+
+
+def snap_to_pauses(estimates_ms, pauses, max_shift_ms=MAX_SHIFT_MS):
+    """
+    Move each estimated boundary to the middle of the nearest pause
+
+    Boundaries are snapped in order and never move backwards. The error of each
+    snap is carried forward, so pacing drift doesn't accumulate over the broadcast.
+
+    Args:
+        estimates_ms: Estimated boundary times, in order
+        pauses: (N, 2) array from detect_pauses
+        max_shift_ms: Boundaries with no pause this close keep their estimate
+
+    Returns:
+        (times in ms, how many were snapped)
+    """
+    middles = pauses.mean(axis=1) if len(pauses) else np.zeros(0)
+    times = []
+    snapped = 0
+    drift = 0.0
+    earliest = 0
+
+    for estimate in estimates_ms:
+        target = estimate + drift
+        index = np.searchsorted(middles, target)
+        best = None
+        for candidate in (index - 1, index):
+            if earliest <= candidate < len(middles) and abs(middles[candidate] - target) <= max_shift_ms:
+                if best is None or abs(middles[candidate] - target) < abs(middles[best] - target):
+                    best = candidate
+
+        if best is None:
+            times.append(int(max(target, times[-1] if times else 0)))
+            continue
+
+        times.append(int(middles[best]))
+        drift = middles[best] - estimate
+        earliest = best + 1
+        snapped += 1
+
+    return times, snapped
+
+
+def align_pitch_events(narration_audio, script, pitch_texts, pitch_events, anchor="end", pause_weights=None,
+                       word_gap_weight=WORD_GAP_WEIGHT, **kwargs):
+    """
+    Give each pitch event a timestamp measured from the narration audio
+
+    Each pitch's boundary is first estimated from its position in the script's
+    speaking-time model, then snapped to the nearest detected pause.
+
+    Args:
+        narration_audio: AudioSegment of the spoken script
+        script: Text the narration was synthesized from
+        pitch_texts: Text spoken for each pitch, in script order
+        pitch_events: Event dicts (one per pitch text); updated in place
+        anchor: "end" puts the event in the pause after the pitch's text,
+            "start" in the pause before it
+        pause_weights: Speaking-time model for the voice (see speech_timeline)
+        word_gap_weight: Gap after each word, in syllables
+        **kwargs: Passed to detect_pauses
+
+    Returns:
+        Number of events snapped to a detected pause (the rest keep estimates)
+    """
+    if not pitch_events:
+        return 0
+
+    duration_ms = len(narration_audio)
+    pauses = detect_pauses(segment_samples(narration_audio), narration_audio.frame_rate, **kwargs)
+
+    pause_weights = pause_weights or PAUSE_WEIGHTS
+    offsets, weights = speech_timeline(script, pause_weights, word_gap_weight)
+    ms_per_weight = duration_ms / max(weights[-1], 1e-9)
+
+    spans = text_offsets(script, pitch_texts)
+    estimates = []
+    last = 0
+    for span in spans:
+        if span is not None:
+            last = span[1] if anchor == "end" else span[0]
+        # The pause after a pitch's final punctuation is half-way through it
+        weight = np.interp(last, offsets, weights)
+        if anchor == "end":
+            weight -= pause_weights['.'] / 2
+        estimates.append(weight * ms_per_weight)
+
+    times, snapped = snap_to_pauses(estimates, pauses)
+    for event, timestamp_ms in zip(pitch_events, times):
+        event['timestamp_ms'] = timestamp_ms
+    return snapped
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark
+Runs every pipeline stage - feed parsing, pitch selection, script rendering,
+chunking, mixing, crowd ambiance and encoding - over recorded game feeds in
+benchmarks/fixtures/, reporting the median time and peak memory of each stage.
+Mixing uses generated sound effects, so every machine mixes the same sounds.
+Results are saved as JSON per commit, and --compare flags stages that got
+slower or hungrier than a previous run
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from fetch_game_data import parse_play_by_play, scoring_innings
+from generate_broadcast import generate_broadcast_script, generate_broadcast_units, select_broadcast_pitches, seeded_rng
+from tts_backends import MAX_CHARS, split_text_into_chunks
+
+FIXTURES_DIR = os.path.join("benchmarks", "fixtures")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+RESULTS_VERSION = 2    # Version 1 mixed without sound effects wherever none were installed
+MAX_PITCHES = 40
+
+# Generated stand-ins for the sound effects tree: (folder, file, seconds, decay per second, level).
+# Catches and bat cracks are sharp noise bursts, the hit reaction a slow swell, the crowd a steady loop
+SYNTHETIC_SOUNDS = [
+    ("catching ball", "fastball.mp3", 0.25, 30.0, 0.8),
+    ("catching ball", "slowball.mp3", 0.25, 25.0, 0.6),
+    ("hitting ball", "bat1.mp3", 0.4, 18.0, 0.9),
+    ("hitting ball", "bat2.mp3", 0.4, 20.0, 0.85),
+    ("hitting ball", "bat3.mp3", 0.4, 22.0, 0.8),
+    ("hitting ball", "bunt.mp3", 0.3, 28.0, 0.5),
+    ("reaction", "any hit or homerun.mp3", 3.0, 0.8, 0.5),
+    ("reaction", "normal croud sound.mp3", 6.0, 0.0, 0.2),
+]
+
+STAGES = ('feed_parse', 'selection', 'script', 'chunking', 'mix', 'crowd', 'encode_wav', 'encode_mp3')
+
+# A stage is a regression when it is this much slower (or bigger) and the change is not just noise
+DEFAULT_THRESHOLD = 0.2
+MIN_DELTA_MS = 5.0
+MIN_DELTA_MB = 0.5
+
+
+class StageSkipped(Exception):
+    """A stage that cannot run on this machine (e.g. no MP3 encoder)"""
+
+
+# === FIXTURES ===
+
+def record_fixture(game_pk, fixtures_dir=FIXTURES_DIR, standin=False, innings=None):
+    """
+    Save a game's raw play-by-play feed as a benchmark fixture
+
+    Args:
+        game_pk: Game to record
+        fixtures_dir: Where fixtures are kept
+        standin: Record a made-up game (synthetic_games.synthetic_play_by_play)
+            instead of fetching one from the StatsAPI
+        innings: Innings in a made-up game (defaults to a regular 9)
+
+    Returns:
+        Path of the fixture, or None if the game could not be fetched
+    """
+    if standin:
+        from synthetic_games import REAL_GAME_INNINGS, synthetic_play_by_play
+
+        innings = innings or REAL_GAME_INNINGS
+        source, playbyplay = "standin", synthetic_play_by_play(game_pk, innings)
+        away_team, home_team = f"Visitors {game_pk}", f"Hosts {game_pk}"
+    else:
+        import statsapi
+        from fetch_game_data import get_play_by_play
+
+        try:
+            source, playbyplay = "statsapi", get_play_by_play(game_pk)
+            games = statsapi.schedule(game_id=game_pk)
+        except Exception as e:
+            print(f"❌ Could not record game {game_pk}: {e}")
+            return None
+        game = games[0] if games else {}
+        away_team, home_team = game.get('away_name'), game.get('home_name')
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    name = f"{source}-{game_pk}" if not standin or innings == REAL_GAME_INNINGS else f"{source}-{game_pk}-{innings}inn"
+    path = os.path.join(fixtures_dir, f"{name}.json")
+    with open(path, 'w') as f:
+        json.dump({
+            'game_pk': game_pk,
+            'source': source,
+            'away_team': away_team,
+            'home_team': home_team,
+            'recorded': datetime.now().strftime('%Y-%m-%d'),
+            'playbyplay': playbyplay,
+        }, f, separators=(',', ':'))
+    print(f"📼 Recorded {len(playbyplay.get('allPlays', []))} plays of game {game_pk} to {path}")
+    return path
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    """dict of fixture name -> recorded game, in name order"""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.json"))):
+        with open(path) as f:
+            fixtures[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    return fixtures
+
+
+# === STAGES ===
+
+def synthetic_sound_effects(sound_effects_dir, frame_rate=24000):
+    """
+    Fill a sound effects tree with deterministic noise bursts and a crowd loop
+
+    Every file the mixer looks for is generated from a fixed seed and put straight
+    into the decoded PCM cache (SoundEffectCache.store), so the mix and crowd
+    stages do real work, identically on every machine, with no decoder. The files
+    hold WAV data, which ffmpeg still decodes if the cache is cleared.
+    """
+    import numpy as np
+
+    from sfx_cache import SoundEffectCache
+    from tts_backends import pcm_to_wav
+
+    cache = SoundEffectCache(sound_effects_dir, frame_rate=frame_rate)
+    rng = np.random.default_rng(0)
+    for folder, filename, seconds, decay, level in SYNTHETIC_SOUNDS:
+        frames = int(seconds * frame_rate)
+        envelope = np.exp(-decay * np.arange(frames) / frame_rate) * level * 8000
+        samples = np.clip(rng.standard_normal(frames) * envelope, -32768, 32767).astype(np.int16).reshape(-1, 1)
+        path = os.path.join(sound_effects_dir, folder, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(pcm_to_wav(samples.tobytes(), frame_rate))
+        cache.store(path, samples)
+
+
+def local_narration(units, backend):
+    """
+    Narration audio and timing map for broadcast units, from the local TTS stand-in
+
+    Speech synthesis is a network call and is not benchmarked; this gives the
+    mixer realistic input without one.
+
+    Returns:
+        (AudioSegment, timing map like unit_timing.synthesize_units writes)
+    """
+    from tts_backends import PCM_SAMPLE_WIDTH, audio_segment_from_bytes
+
+    pcm, pitches = [], {}
+    position_ms = 0.0
+    for unit in units:
+        if not unit['text'].strip():
+            continue
+        audio = backend.render_pcm(unit['text'].strip())
+        duration_ms = len(audio) / PCM_SAMPLE_WIDTH / backend.sample_rate * 1000
+        if unit['pitch_index'] is not None:
+            span = pitches.setdefault(str(unit['pitch_index']), {'start_ms': position_ms})
+            span['end_ms'] = position_ms + duration_ms
+        pcm.append(audio)
+        position_ms += duration_ms
+    return audio_segment_from_bytes(b''.join(pcm), "pcm", backend.sample_rate), {'pitches': pitches}
+
+
+def encode(segment, suffix):
+    """Encode a mixed broadcast the way the streaming pipeline does, returning the file size"""
+    from audio_mixer import segment_samples
+    from streaming_mixer import EncoderSink
+
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    os.close(handle)
+    try:
+        try:
+            sink = EncoderSink(path, segment.frame_rate, segment.channels, segment.sample_width)
+        except RuntimeError as e:
+            raise StageSkipped(str(e))
+        with sink:
+            sink.write(segment_samples(segment))
+        return os.path.getsize(path)
+    finally:
+        os.remove(path)
+
+
+def stage_functions(fixture, mixer, backend):
+    """
+    The benchmark's stages for one fixture, each taking the previous stages' outputs
+
+    Returns:
+        List of (name, function(state) -> output); outputs are stored in state under the name
+    """
+    seed = fixture['game_pk']
+    away, home = fixture['away_team'], fixture['home_team']
+
+    def feed_parse(state):
+        playbyplay = fixture['playbyplay']
+        return {'pitch_data': parse_play_by_play(playbyplay), 'key_innings': scoring_innings(playbyplay)}
+
+    def selection(state):
+        feed = state['feed_parse']
+        return select_broadcast_pitches(feed['pitch_data'], MAX_PITCHES, feed['key_innings'])
+
+    def script(state):
+        feed = state['feed_parse']
+        return generate_broadcast_script(feed['pitch_data'], MAX_PITCHES, feed['key_innings'], away, home, seed=seed)
+
+    def chunking(state):
+        return split_text_into_chunks(state['script'], MAX_CHARS)
+
+    def mix(state):
+        # The mixing half of mix_broadcast_with_effects (which always exports MP3); encoding is timed below
+        narration, events = state['narration'], [dict(event) for event in state['pitch_events']]
+        plan = mixer.build_plan(narration, events, "insert", seeded_rng(seed))
+        return plan.to_segment(mixer._render(plan, events))
+
+    def crowd(state):
+        return mixer._add_background_crowd(state['mix'])
+
+    def encode_wav(state):
+        return encode(state['crowd'], ".wav")
+
+    def encode_mp3(state):
+        return encode(state['crowd'], ".mp3")
+
+    return [('feed_parse', feed_parse), ('selection', selection), ('script', script), ('chunking', chunking),
+            ('mix', mix), ('crowd', crowd), ('encode_wav', encode_wav), ('encode_mp3', encode_mp3)]
+
+
+def prepare_mix_input(state, fixture, backend):
+    """Unbenchmarked setup between script and mix: narration audio and timed pitch events"""
+    from build_manifest import pitch_events_for
+    from unit_timing import apply_timing
+
+    feed = state['feed_parse']
+    units = generate_broadcast_units(feed['pitch_data'], MAX_PITCHES, feed['key_innings'],
+                                     fixture['away_team'], fixture['home_team'], seed=fixture['game_pk'])
+    state['narration'], timing = local_narration(units, backend)
+    state['pitch_events'] = pitch_events_for(state['selection'])
+    apply_timing(state['pitch_events'], timing)
+
+
+def measure(function, state, repeat):
+    """
+    Median and best time of function(state) over repeat runs, then its peak memory in one traced run
+
+    Returns:
+        (output, result dict with 'median_ms', 'min_ms', 'peak_mb')
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):  # Stages narrate their progress; keep the report readable
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = function(state)
+            times.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            function(state)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+
+    return output, {
+        'median_ms': round(statistics.median(times), 3),
+        'min_ms': round(min(times), 3),
+        'peak_mb': round(peak / 1e6, 3),
+    }
+
+
+def benchmark_fixture(fixture, mixer, backend, repeat=5, stages=STAGES):
+    """
+    Benchmark every stage on one recorded game
+
+    Returns:
+        dict with 'pitches' and 'stages' (stage -> timing result, or {'skipped': reason})
+    """
+    state, results = {}, {}
+    last = max(STAGES.index(stage) for stage in stages)
+    for name, function in stage_functions(fixture, mixer, backend)[:last + 1]:
+        if name == 'mix':
+            with contextlib.redirect_stdout(io.StringIO()):
+                prepare_mix_input(state, fixture, backend)
+        try:
+            if name in stages:
+                state[name], results[name] = measure(function, state, repeat)
+            else:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    state[name] = function(state)  # Later stages still need its output
+        except StageSkipped as e:
+            if name in stages:
+                results[name] = {'skipped': str(e)}
+    return {'pitches': len(state['feed_parse']['pitch_data']), 'stages': results}
+
+
+def git_commit():
+    """(short commit hash, working tree has changes), or ('unknown', False) outside a git checkout"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def run_benchmark(fixtures, repeat=5, stages=STAGES):
+    """
+    Benchmark every fixture
+
+    Returns:
+        Results dict (what gets saved as JSON)
+    """
+    from audio_mixer import BaseballAudioMixer
+    from tts_backends import LocalTTSBackend
+
+    backend = LocalTTSBackend()
+    commit, dirty = git_commit()
+
+    results = {
+        'version': RESULTS_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'fixtures': {},
+    }
+    with tempfile.TemporaryDirectory() as sound_effects_dir:
+        synthetic_sound_effects(sound_effects_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            mixer = BaseballAudioMixer(sound_effects_dir)
+        mixer.preload_sounds()  # Loading the sound effects is startup cost, not mixing
+        for name, fixture in fixtures.items():
+            print(f"⏱️  {name}...")
+            results['fixtures'][name] = benchmark_fixture(fixture, mixer, backend, repeat, stages)
+    return results
+
+
+# === REPORTING ===
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Stages that got slower or use more memory than in a baseline run
+
+    Returns:
+        List of (fixture, stage, description) regressions
+    """
+    regressions = []
+    for fixture, current in results['fixtures'].items():
+        previous = baseline['fixtures'].get(fixture)
+        if previous is None:
+            continue
+        for stage, now in current['stages'].items():
+            before = previous['stages'].get(stage)
+            if not before or 'skipped' in now or 'skipped' in before:
+                continue
+            if (now['median_ms'] > before['median_ms'] * (1 + threshold)
+                    and now['median_ms'] - before['median_ms'] > MIN_DELTA_MS):
+                regressions.append((fixture, stage, f"{before['median_ms']:.1f} -> {now['median_ms']:.1f} ms"))
+            if (now['peak_mb'] > before['peak_mb'] * (1 + threshold)
+                    and now['peak_mb'] - before['peak_mb'] > MIN_DELTA_MB):
+                regressions.append((fixture, stage, f"{before['peak_mb']:.1f} -> {now['peak_mb']:.1f} MB peak"))
+    return regressions
+
+
+def print_report(results, baseline=None):
+    print("\n" + "=" * 78)
+    print(f"Commit {results['commit']}{' (modified)' if results['dirty'] else ''}, "
+          f"median of {results['repeat']} runs")
+    for fixture, result in results['fixtures'].items():
+        print("-" * 78)
+        print(f"{fixture} ({result['pitches']} pitches)")
+        previous = baseline['fixtures'].get(fixture, {}).get('stages', {}) if baseline else {}
+        for stage, now in result['stages'].items():
+            if 'skipped' in now:
+                print(f"   {stage:<12} skipped: {now['skipped']}")
+                continue
+            change = ""
+            before = previous.get(stage)
+            if before and 'skipped' not in before and before['median_ms']:
+                change = f"  ({(now['median_ms'] / before['median_ms'] - 1) * 100:+.0f}% vs {baseline['commit']})"
+            print(f"   {stage:<12} {now['median_ms']:>10.2f} ms {now['peak_mb']:>9.2f} MB peak{change}")
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each pipeline stage on recorded games")
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="Directory of recorded games")
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help="Benchmark every fixture (the default)")
+    run_parser.add_argument('--repeat', type=int, default=5, help="Timed runs per stage (the median is reported)")
+    run_parser.add_argument('--stages', default=",".join(STAGES), help="Stages to time (comma separated)")
+    run_parser.add_argument('--json', help=f"Results file (defaults to {RESULTS_DIR}/<commit>.json)")
+    run_parser.add_argument('--compare', help="Earlier results file to compare against")
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help="Slowdown (0.2 = 20%%) that counts as a regression")
+
+    record_parser = commands.add_parser('record', help="Record games as fixtures")
+    record_parser.add_argument('game_pks', type=int, nargs='+')
+    record_parser.add_argument('--standin', action='store_true', help="Record made-up games (no network)")
+    record_parser.add_argument('--innings', type=int, help="Innings per made-up game (e.g. 25 for a marathon)")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        for game_pk in args.game_pks:
+            record_fixture(game_pk, args.fixtures, args.standin, args.innings)
+        return
+
+    if args.command is None:
+        args = run_parser.parse_args([], namespace=args)
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = sorted(set(stages) - set(STAGES))
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No recorded games in {args.fixtures}. Record some with: "
+              f"pipeline_benchmark.py record <gamePk> (or --standin 1 2 offline)")
+        sys.exit(1)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('version') != RESULTS_VERSION:
+            print(f"⚠️  {args.compare} is from benchmark version {baseline.get('version')} "
+                  f"(now {RESULTS_VERSION}); its stages aren't comparable, so it is not compared")
+            baseline = None
+
+    results = run_benchmark(fixtures, args.repeat, stages)
+    print_report(results, baseline)
+
+    output_file = args.json or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"📊 Results saved to {output_file}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for fixture, stage, description in regressions:
+            print(f"❌ {fixture} {stage}: {description}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions against {baseline['commit']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Decoded sound-effect cache
+Converts the sound_effects/ tree once into raw PCM (.npy) already in the mixer's
+sample rate and channel layout, then memory-maps it lazily on first use - so the
+mixer starts in milliseconds instead of decoding every MP3 through ffmpeg
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+
+import numpy as np
+
+from instrumentation import count
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.flac', '.m4a')
+SAMPLE_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SoundEffectCache:
+    """
+    On-disk cache of decoded, format-normalized sound effects
+
+    Each source file maps to <cache_dir>/<relative path>.<rate>hz<channels>ch<width>b.npy
+    plus a .json sidecar recording the source's mtime, size and SHA-256. A changed
+    mtime/size triggers a hash check, and only a changed hash triggers re-decoding.
+    """
+
+    def __init__(self, sound_effects_dir, cache_dir=None, frame_rate=24000, channels=1, sample_width=2):
+        """
+        Args:
+            sound_effects_dir: Root of the sound effect tree
+            cache_dir: Where decoded PCM is kept (defaults to <sound_effects_dir>/.pcm_cache)
+            frame_rate: Sample rate to convert to
+            channels: Channel count to convert to
+            sample_width: Bytes per sample to convert to
+        """
+        self.sound_effects_dir = sound_effects_dir
+        self.cache_dir = cache_dir or os.path.join(sound_effects_dir, ".pcm_cache")
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.decoded = 0    # Files decoded this session (cache misses)
+
+    def _cache_paths(self, source_path):
+        relative = os.path.relpath(source_path, self.sound_effects_dir)
+        stem = os.path.join(self.cache_dir, relative)
+        suffix = f".{self.frame_rate}hz{self.channels}ch{self.sample_width}b"
+        return stem + suffix + ".npy", stem + suffix + ".json"
+
+    def _is_fresh(self, source_path, meta_path):
+        """True if the cached PCM was built from this exact source file"""
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        stat = os.stat(source_path)
+        if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+            return True
+
+        # Touched or copied but maybe unchanged - fall back to the content hash
+        if meta.get('sha256') == _file_sha256(source_path):
+            meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+            return True
+        return False
+
+    def _convert(self, source_path):
+        """Decode a source file, normalize its format and write it to the cache"""
+        from pydub import AudioSegment
+
+        segment = AudioSegment.from_file(source_path)
+        source_format = [segment.frame_rate, segment.channels, segment.sample_width]
+        segment = (segment.set_channels(self.channels)
+                   .set_frame_rate(self.frame_rate)
+                   .set_sample_width(self.sample_width))
+        samples = np.frombuffer(segment.raw_data, dtype=SAMPLE_DTYPES[self.sample_width])
+        self.store(source_path, samples.reshape(-1, self.channels), source_format)
+        self.decoded += 1
+
+    def store(self, source_path, samples, source_format=None):
+        """
+        Cache already-decoded samples for a source file, as if it had been decoded
+
+        For sounds generated in-process (pipeline_benchmark.py's synthetic tree),
+        so using them needs no decoder.
+
+        Args:
+            source_path: Source file under the sound effects directory (must exist)
+            samples: (frames, channels) samples in the cache's format
+            source_format: [frame_rate, channels, sample_width] the source is in
+                (defaults to the cache's format)
+        """
+        npy_path, meta_path = self._cache_paths(source_path)
+        source_format = source_format or [self.frame_rate, self.channels, self.sample_width]
+        os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+        temp_path = npy_path + ".tmp.npy"
+        np.save(temp_path, samples)
+        os.replace(temp_path, npy_path)  # Readers never see a half-written file
+
+        stat = os.stat(source_path)
+        with open(meta_path, 'w') as f:
+            json.dump({
+                'source': os.path.relpath(source_path, self.sound_effects_dir),
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha256': _file_sha256(source_path),
+                'source_format': source_format,
+            }, f)
+
+    def load(self, source_path):
+        """
+        Memory-mapped (frames, channels) samples for a source file, converting if stale
+
+        Returns:
+            Read-only numpy array backed by the cache file
+        """
+        npy_path, meta_path = self._cache_paths(source_path)
+        if not (os.path.exists(npy_path) and self._is_fresh(source_path, meta_path)):
+            count('cache_misses')
+            self._convert(source_path)
+        else:
+            count('cache_hits')
+        return np.load(npy_path, mmap_mode='r')
+
+    def source_format(self, source_path):
+        """
+        (frame_rate, channels, sample_width) the source file was decoded from
+
+        Returns:
+            tuple, or None if the file hasn't been cached yet
+        """
+        try:
+            with open(self._cache_paths(source_path)[1]) as f:
+                source_format = json.load(f).get('source_format')
+        except (OSError, ValueError):
+            return None
+        return tuple(source_format) if source_format else None
+
+    def convert_tree(self):
+        """Convert every audio file under the sound effects directory, returning how many were stale"""
+        before = self.decoded
+        for root, dirs, files in os.walk(self.sound_effects_dir):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.cache_dir]
+            for filename in sorted(files):
+                if filename.lower().endswith(AUDIO_EXTENSIONS):
+                    self.load(os.path.join(root, filename))
+        return self.decoded - before
+
+
+class SoundBank(Mapping):
+    """
+    Lazily loaded sound effects, keyed like BaseballAudioMixer.sounds
+
+    Only file existence is checked up front. A sound is read from the cache
+    (or decoded into it) the first time it is used, and sounds the run never
+    plays are never touched. The mixer renders straight from the memory-mapped
+    samples; an AudioSegment is only built (once) for callers that ask for one.
+    """
+
+    def __init__(self, cache, files):
+        """
+        Args:
+            cache: SoundEffectCache to load through
+            files: dict of key -> source path (only existing files should be given)
+        """
+        self.cache = cache
+        self.files = dict(files)
+        self._samples = {}
+        self._segments = {}
+        self._failed = set()
+
+    def samples(self, key):
+        """Memory-mapped (frames, channels) samples for a sound, in the cache's format"""
+        if key not in self._samples:
+            self._samples[key] = self.cache.load(self.files[key])
+        return self._samples[key]
+
+    def __getitem__(self, key):
+        if key not in self._segments:
+            from pydub import AudioSegment
+
+            self._segments[key] = AudioSegment(
+                data=self.samples(key).tobytes(),
+                sample_width=self.cache.sample_width,
+                frame_rate=self.cache.frame_rate,
+                channels=self.cache.channels
+            )
+        return self._segments[key]
+
+    def _get(self, key, load, default):
+        if key not in self.files or key in self._failed:
+            return default
+        try:
+            return load(key)
+        except Exception as e:
+            print(f"   ⚠️  Failed to load {os.path.basename(self.files[key])}: {e}")
+            self._failed.add(key)
+            return default
+
+    def get(self, key, default=None):
+        return self._get(key, self.__getitem__, default)
+
+    def get_samples(self, key, default=None):
+        """Like get, but the memory-mapped samples instead of an AudioSegment"""
+        return self._get(key, self.samples, default)
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+
+def main():
+    """Convert the sound effect tree into the PCM cache ahead of time"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-decode sound effects into the PCM cache")
+    parser.add_argument('sound_effects_dir', nargs='?', default="sound_effects")
+    parser.add_argument('--frame-rate', type=int, default=24000)
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--sample-width', type=int, default=2)
+    args = parser.parse_args()
+
+    cache = SoundEffectCache(args.sound_effects_dir, frame_rate=args.frame_rate,
+                             channels=args.channels, sample_width=args.sample_width)
+    print(f"🔊 Converting {args.sound_effects_dir} -> {cache.cache_dir}")
+    converted = cache.convert_tree()
+    print(f"✅ {converted} file(s) decoded, everything else was already cached")
+
+
+if __name__ == "__main__":
+    main()
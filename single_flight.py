@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Single-flight call coalescing
+While a call for a key is running, identical calls from other threads wait for
+its result instead of repeating the work - so concurrent jobs for the same game
+(other voices, other formats, the same game twice) make one feed request and one
+TTS request per chunk. Counters show how much duplicate work was avoided
+"""
+
+import threading
+
+
+class _Call:
+    """One in-flight call and, once finished, its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time
+
+    Nothing is cached: once a call finishes, the next call for its key runs
+    again. Errors are shared like results, so one failing request is not
+    retried by every waiter at once.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.executed = 0   # Calls that did the work
+        self.shared = 0     # Calls answered by another call's work
+        self.failed = 0     # Executed calls that raised
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs), or wait for the identical call already running
+
+        Args:
+            key: Hashable identity of the work (equal keys must mean equal results)
+            fn: Function doing the work
+
+        Returns:
+            (result, shared) - shared is True when another caller did the work
+
+        Raises:
+            Whatever fn raised, in the caller that ran it and in every waiter
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {'executed': self.executed, 'shared': self.shared, 'failed': self.failed,
+                    'in_flight': len(self._calls)}
+
+
+# Process-wide groups, so every job in the process coalesces with every other
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def flight(name):
+    """The process-wide SingleFlight group called name, created on first use"""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def flight_stats():
+    """dict of group name -> counters, for every group used so far"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
+
+
+def print_flight_stats():
+    """Print how many calls each group avoided (nothing if no calls were shared)"""
+    for name, stats in flight_stats().items():
+        if stats['shared']:
+            total = stats['executed'] + stats['shared']
+            print(f"🔁 {name}: {stats['shared']} of {total} calls shared an in-flight result "
+                  f"({stats['executed']} made)")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark
+Times a fresh interpreter importing each entry-point module (median of several
+runs, over a bare `python -c pass`), lists which heavy dependencies each one
+pulls in, and fails when a text-only entry point goes over budget or imports
+audio/network libraries it should only load when synthesizing or mixing
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Dependencies that only synthesis, mixing or fetching should load
+HEAVY_MODULES = ('numpy', 'pydub', 'openai', 'statsapi', 'requests')
+
+# Entry points that must start fast: script generation and text-only CLIs
+TEXT_ONLY = ('generate_broadcast', 'fetch_game_data', 'baseball_broadcast_ai', 'build_manifest', 'tts_backends')
+
+# Audio entry points, timed for reference
+AUDIO = ('audio_mixer', 'broadcast_pipeline', 'batch_runner', 'broadcast_service')
+
+DEFAULT_BUDGET_MS = 100
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'import_ms': (time.perf_counter() - start) * 1000,
+                   'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def time_process(args):
+    """Run a Python process, returning (wall ms, stdout)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) * 1000, result.stdout
+
+
+def measure(module, runs):
+    """
+    Median startup cost of importing a module in a fresh interpreter
+
+    Returns:
+        dict with 'module', 'import_ms', 'process_ms' and 'heavy' (heavy modules loaded)
+    """
+    imports, processes, heavy = [], [], []
+    for _ in range(runs):
+        process_ms, output = time_process(['-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)])
+        probe = json.loads(output.strip().splitlines()[-1])
+        imports.append(probe['import_ms'])
+        processes.append(process_ms)
+        heavy = probe['heavy']
+    return {
+        'module': module,
+        'import_ms': statistics.median(imports),
+        'process_ms': statistics.median(processes),
+        'heavy': heavy,
+    }
+
+
+def run_benchmark(runs=5, budget_ms=DEFAULT_BUDGET_MS):
+    """
+    Time every entry point
+
+    Returns:
+        (rows, baseline_ms, failures) - failures lists text-only modules over
+        budget or loading heavy dependencies
+    """
+    time_process(['-c', 'pass'])  # Warm the filesystem cache before timing anything
+    baseline_ms = statistics.median(time_process(['-c', 'pass'])[0] for _ in range(runs))
+    rows = [dict(measure(module, runs), text_only=module in TEXT_ONLY) for module in TEXT_ONLY + AUDIO]
+
+    failures = []
+    for row in rows:
+        row['startup_ms'] = max(0.0, row['process_ms'] - baseline_ms)
+        if not row['text_only']:
+            continue
+        if row['startup_ms'] > budget_ms:
+            failures.append(f"{row['module']} takes {row['startup_ms']:.0f} ms to start (budget {budget_ms} ms)")
+        if row['heavy']:
+            failures.append(f"{row['module']} imports {', '.join(row['heavy'])} at load time")
+    return rows, baseline_ms, failures
+
+
+def print_report(rows, baseline_ms, failures, budget_ms):
+    print("\n" + "=" * 86)
+    print(f"{'module':<24} {'kind':<6} {'import ms':>10} {'startup ms':>11}  heavy modules loaded")
+    print("-" * 86)
+    for row in rows:
+        kind = "text" if row['text_only'] else "audio"
+        print(f"{row['module']:<24} {kind:<6} {row['import_ms']:>10.1f} {row['startup_ms']:>11.1f}  "
+              f"{', '.join(row['heavy']) or '-'}")
+    print("=" * 86)
+    print(f"Startup is wall time over a bare interpreter ({baseline_ms:.0f} ms); text-only budget {budget_ms} ms")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+    else:
+        print("✅ Every text-only entry point is within budget and loads no heavy dependencies")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark interpreter startup for each entry point")
+    parser.add_argument('--runs', type=int, default=5, help="Runs per module (the median is reported)")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    rows, baseline_ms, failures = run_benchmark(args.runs, args.budget_ms)
+    print_report(rows, baseline_ms, failures, args.budget_ms)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'baseline_ms': baseline_ms, 'budget_ms': args.budget_ms, 'modules': rows,
+                       'failures': failures}, f, indent=1)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Cached mix stems
+Keeps the rendered narration and sound-effect tracks of a mix on disk, keyed by
+everything that went into them, so changing levels or toggling the crowd only
+re-sums the stems instead of re-assembling the whole broadcast
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from instrumentation import count
+
+STEM_NAMES = ('narration', 'sfx')
+
+
+class StemCache:
+    """
+    On-disk cache of rendered stems
+
+    Each entry is <cache_dir>/<key>/ holding one .npy per stem plus meta.json.
+    The key hashes the narration samples, the pitch events, the mix settings and
+    the identity of every sound effect file, so any input change is a miss. Only
+    the most recently used max_entries entries are kept.
+    """
+
+    def __init__(self, cache_dir=".stem_cache", max_entries=8):
+        """
+        Args:
+            cache_dir: Where stems are kept
+            max_entries: Entries kept before the least recently used are removed
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, narration_samples, pitch_events, settings, sound_files):
+        """
+        Cache key for a mix
+
+        Args:
+            narration_samples: Narration sample array (already in the output format)
+            pitch_events: List of pitch event dicts
+            settings: JSON-serializable dict of everything else that shapes the stems
+            sound_files: dict of sound key -> source path
+        """
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(narration_samples).data)
+
+        sounds = {}
+        for key, path in sorted(sound_files.items()):
+            stat = os.stat(path)
+            sounds[key] = [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+        digest.update(json.dumps({
+            'events': pitch_events,
+            'settings': settings,
+            'sounds': sounds,
+        }, sort_keys=True, default=str).encode())
+        return digest.hexdigest()[:32]
+
+    def load(self, key):
+        """
+        Memory-mapped stems for a key
+
+        Returns:
+            dict of stem name -> read-only (frames, channels) array, or None on a miss
+        """
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            stems = {name: np.load(os.path.join(entry, name + ".npy"), mmap_mode='r') for name in STEM_NAMES}
+        except (OSError, ValueError):
+            self.misses += 1
+            count('cache_misses')
+            return None
+        os.utime(entry)  # Mark as recently used
+        self.hits += 1
+        count('cache_hits')
+        return stems
+
+    def save(self, key, stems, meta=None):
+        """Store stems under a key, then drop the least recently used entries"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = os.path.join(self.cache_dir, key)
+        temp_entry = entry + ".tmp"
+        shutil.rmtree(temp_entry, ignore_errors=True)
+        os.makedirs(temp_entry)
+
+        for name in STEM_NAMES:
+            np.save(os.path.join(temp_entry, name + ".npy"), stems[name])
+        with open(os.path.join(temp_entry, "meta.json"), 'w') as f:
+            json.dump(meta or {}, f)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(temp_entry, entry)  # Readers never see a half-written entry
+        self._prune()
+
+    def _prune(self):
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                   if not name.endswith(".tmp")]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for stale in entries[self.max_entries:]:
+            shutil.rmtree(stale, ignore_errors=True)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory streaming mixer
+Pulls narration PCM and pitch events in time order, mixes fixed-size blocks and feeds
+them straight to an encoder process - so memory stays constant however long the
+broadcast is, and encoding overlaps with mixing
+"""
+
+import os
+import shutil
+import subprocess
+import time
+import wave
+
+import numpy as np
+
+from sfx_cache import SAMPLE_DTYPES
+
+PCM_FORMATS = {1: 's8', 2: 's16le', 4: 's32le'}  # ffmpeg raw sample formats
+
+
+class PCMReader:
+    """Sequential reader of raw PCM from a file-like object or an iterable of byte chunks"""
+
+    def __init__(self, source, channels, sample_width, read_size=65536):
+        if hasattr(source, 'read'):
+            self._chunks = iter(lambda: source.read(read_size), b'')
+        else:
+            self._chunks = iter(source)
+        self.channels = channels
+        self.dtype = SAMPLE_DTYPES[sample_width]
+        self.frame_width = channels * sample_width
+        self.position = 0   # Frames handed out so far
+        self.eof = False
+        self._buffer = bytearray()
+
+    def read(self, frames):
+        """Up to `frames` frames as a (frames, channels) array; shorter only at end of stream"""
+        wanted = frames * self.frame_width
+        while len(self._buffer) < wanted and not self.eof:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                self.eof = True
+        take = min(wanted, len(self._buffer) - len(self._buffer) % self.frame_width)
+        data = bytes(self._buffer[:take])
+        del self._buffer[:take]
+        self.position += take // self.frame_width
+        return np.frombuffer(data, dtype=self.dtype).reshape(-1, self.channels)
+
+
+def decode_to_pcm(path, frame_rate, channels, sample_width):
+    """Start an ffmpeg process decoding an audio file to raw PCM on its stdout"""
+    return subprocess.Popen(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', path,
+         '-f', PCM_FORMATS[sample_width], '-ar', str(frame_rate), '-ac', str(channels), 'pipe:1'],
+        stdout=subprocess.PIPE
+    )
+
+
+class EncoderSink:
+    """
+    Destination for mixed blocks
+
+    WAV files are written directly; anything else is piped to an ffmpeg encoder
+    process, which encodes in parallel with the mixing.
+    """
+
+    def __init__(self, output_file, frame_rate, channels, sample_width, bitrate="128k"):
+        self.output_file = output_file
+        self._wav = None
+        self._process = None
+
+        if output_file.lower().endswith('.wav'):
+            self._wav = wave.open(output_file, 'wb')
+            self._wav.setnchannels(channels)
+            self._wav.setsampwidth(sample_width)
+            self._wav.setframerate(frame_rate)
+        else:
+            if shutil.which('ffmpeg') is None:
+                raise RuntimeError("ffmpeg is required to encode streaming mixes (or write a .wav)")
+            self._process = subprocess.Popen(
+                ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                 '-f', PCM_FORMATS[sample_width], '-ar', str(frame_rate), '-ac', str(channels),
+                 '-i', 'pipe:0', '-b:a', bitrate, output_file],
+                stdin=subprocess.PIPE
+            )
+
+    def write(self, samples):
+        data = samples.tobytes()
+        if self._wav is not None:
+            self._wav.writeframesraw(data)
+        else:
+            self._process.stdin.write(data)
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+        else:
+            self._process.stdin.close()
+            if self._process.wait() != 0:
+                raise RuntimeError(f"Encoder failed writing {self.output_file}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._process is not None:
+            self._process.kill()
+        elif self._wav is not None:
+            self._wav.close()
+
+
+class BlockMixer:
+    """Accumulates timeline audio into fixed-size blocks and flushes each one to the sink"""
+
+    def __init__(self, sink, block_frames, channels, dtype, crowd=None):
+        self.sink = sink
+        self.crowd = crowd
+        self.limits = np.iinfo(dtype)
+        self.dtype = dtype
+        self.block = np.zeros((block_frames, channels), dtype=np.int64)
+        self.filled = 0
+        self.position = 0    # Timeline frame of block[0]
+        self.blocks_written = 0
+
+    def append(self, samples):
+        """Add samples at the current end of the timeline"""
+        written = 0
+        while written < len(samples):
+            count = min(len(self.block) - self.filled, len(samples) - written)
+            self.block[self.filled:self.filled + count] += samples[written:written + count]
+            self.filled += count
+            written += count
+            if self.filled == len(self.block):
+                self.flush()
+
+    def advance(self, frames):
+        """Add silence at the current end of the timeline"""
+        while frames > 0:
+            count = min(len(self.block) - self.filled, frames)
+            self.filled += count
+            frames -= count
+            if self.filled == len(self.block):
+                self.flush()
+
+    def flush(self):
+        if not self.filled:
+            return
+        block = self.block[:self.filled]
+        if self.crowd is not None:
+            self.crowd.add_to(block, self.position)
+        np.clip(block, self.limits.min, self.limits.max, out=block)
+        self.sink.write(block.astype(self.dtype))
+        self.position += self.filled
+        self.blocks_written += 1
+        self.block.fill(0)
+        self.filled = 0
+
+
+def stream_mix_broadcast(mixer, narration, pitch_events, output_file, enable_background_crowd=True,
+                         block_ms=1000, bitrate="128k", rng=None):
+    """
+    Mix narration with sound effects in one streaming pass
+
+    Narration is pulled sequentially (never fully loaded), events are processed in
+    time order, and each finished block is handed to the encoder right away. Memory
+    is one block plus the sound effects, regardless of broadcast length. The
+    timeline matches mix_broadcast_with_effects: narration up to each event, the
+    event's sound effect(s), a 200 ms pause.
+
+    Args:
+        mixer: BaseballAudioMixer providing sound effects and output format
+        narration: Path to an audio file (decoded by ffmpeg), or raw PCM in the
+            mixer's output format as a file-like object or iterable of byte chunks
+            (e.g. streaming_tts.iter_broadcast_audio(..., response_format="pcm"))
+        pitch_events: Pitch event dicts with non-decreasing 'timestamp_ms'
+        output_file: Output filename (.wav written directly, anything else via ffmpeg)
+        enable_background_crowd: Whether to mix in continuous crowd ambiance
+        block_ms: Block size in milliseconds
+        bitrate: Encoder bitrate
+        rng: random.Random for the bat sound choices (defaults to the random module)
+
+    Returns:
+        dict with 'frames', 'duration_s', 'blocks' and 'seconds' (wall time)
+    """
+    frame_rate, channels, sample_width = mixer.format
+    start_time = time.perf_counter()
+
+    decoder = None
+    if isinstance(narration, (str, os.PathLike)):
+        decoder = decode_to_pcm(narration, frame_rate, channels, sample_width)
+        narration = decoder.stdout
+    reader = PCMReader(narration, channels, sample_width)
+
+    event_sounds = mixer.choose_event_sounds(pitch_events, rng)
+    clip_samples = {key: mixer.sound_samples(key) for sounds in event_sounds for key in sounds}
+    pause_frames = int(mixer.create_silence(200).frame_count())
+
+    crowd = None
+    if enable_background_crowd:
+        crowd = mixer._crowd_bed(None)
+
+    block_frames = max(1, int(frame_rate * block_ms / 1000))
+
+    def copy_narration(until_frame):
+        """Stream narration up to a timeline frame (None = to the end)"""
+        while not reader.eof and (until_frame is None or reader.position < until_frame):
+            wanted = block_frames if until_frame is None else min(block_frames, until_frame - reader.position)
+            piece = reader.read(wanted)
+            if not len(piece):
+                break
+            blocks.append(piece)
+
+    try:
+        with EncoderSink(output_file, frame_rate, channels, sample_width, bitrate) as sink:
+            blocks = BlockMixer(sink, block_frames, channels, SAMPLE_DTYPES[sample_width], crowd)
+
+            for event, sounds in zip(pitch_events, event_sounds):
+                # Narration up to this event
+                copy_narration(int(event.get('timestamp_ms', 0) * (frame_rate / 1000.0)))
+
+                # Catching/hitting sound, then crowd reaction
+                for key in sounds:
+                    blocks.append(clip_samples[key])
+
+                # Brief pause after sound effects before next narration
+                blocks.advance(pause_frames)
+
+            # Remaining narration
+            copy_narration(None)
+            blocks.flush()
+    finally:
+        if decoder is not None:
+            decoder.stdout.close()
+            decoder.wait()
+
+    mixer.print_conversion_report()
+    print(f"✅ Streamed mix saved to {output_file}")
+    return {
+        'frames': blocks.position,
+        'duration_s': blocks.position / frame_rate,
+        'blocks': blocks.blocks_written,
+        'seconds': time.perf_counter() - start_time,
+    }
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Progressive streaming speech synthesis
+Appends synthesized audio to the output as it arrives, chunk by chunk and in script order,
+so listeners or the next pipeline stage can start within seconds instead of waiting for
+the whole broadcast to render
+"""
+
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import bind, count
+from mp3_frames import stream_audio_frames
+from single_flight import flight
+from tts_backends import (MAX_CHARS, get_tts_backend, is_retryable_error, record_response, request_span,
+                          retry_delay, split_text_into_chunks, synthesis_key)
+
+_CHUNK_DONE = object()
+
+
+def iter_broadcast_audio(text, backend, max_workers=4, max_retries=3, max_chars=MAX_CHARS,
+                         backoff_s=0.5, stats=None, response_format="mp3", voice=None, speed=None):
+    """
+    Yield the broadcast's audio bytes in script order as soon as they arrive
+
+    Chunks are synthesized concurrently. Bytes of the chunk at the head of the script are
+    passed through as the backend streams them; later chunks are buffered until their turn.
+    A chunk is only retried if it failed before producing any audio, so output never repeats.
+    A chunk that another job in the process is already synthesizing with the same
+    voice, speed and format is not requested twice: it arrives whole, from that
+    request, once it finishes.
+    MP3 chunks are passed through as bare audio frames: each response's ID3 tag and
+    Xing/Info frame would otherwise land mid-file (and the first would cap the
+    duration players show at the first chunk's).
+
+    Args:
+        text: Broadcast script
+        backend: TTSBackend to stream from
+        max_workers: Concurrent TTS requests
+        max_retries: Retries per chunk on rate limits and server errors
+        max_chars: Maximum characters per request
+        backoff_s: First backoff delay
+        stats: Optional tts_backends.SynthesisStats to record into
+        response_format: Audio format to request ("mp3" and "pcm" can be appended)
+        voice: Voice override
+        speed: Speed override
+
+    Yields:
+        bytes of encoded audio
+    """
+    chunks = split_text_into_chunks(text, max_chars)
+    pending = [queue.Queue() for _ in chunks]
+
+    def stream_chunk(chunk, output):
+        """Stream one chunk's response into its queue, retrying until audio flows, returning all of its audio"""
+        attempt = 0
+        start = time.perf_counter()
+        with request_span(backend, chunk, voice) as request:
+            while True:
+                sent = []
+                try:
+                    audio = backend.iter_audio(chunk, voice=voice, speed=speed, response_format=response_format)
+                    if response_format == "mp3":
+                        audio = stream_audio_frames(audio)
+                    for data in audio:
+                        sent.append(data)
+                        output.put(data)
+                    if stats is not None:
+                        stats.record_success((time.perf_counter() - start) * 1000, len(chunk))
+                    audio = b''.join(sent)
+                    record_response(request, backend, chunk, len(audio), attempt)
+                    return audio
+                except Exception as e:
+                    if sent or attempt >= max_retries or not is_retryable_error(e):
+                        if stats is not None:
+                            stats.record_failure()
+                        raise
+                    attempt += 1
+                    if stats is not None:
+                        stats.record_retry()
+                    time.sleep(retry_delay(e, attempt, backoff_s))
+
+    def produce(index):
+        output = pending[index]
+        chunk = chunks[index]
+        start = time.perf_counter()
+        try:
+            # A chunk another job is already synthesizing arrives whole once that request finishes
+            audio, shared = flight('tts').do(synthesis_key(backend, chunk, voice, speed, response_format),
+                                             stream_chunk, chunk, output)
+        except Exception as e:
+            output.put(e)
+            return
+        if shared:
+            count('shared')
+            if stats is not None:
+                stats.record_success((time.perf_counter() - start) * 1000, len(chunk))
+            if response_format == "mp3":
+                audio = b''.join(stream_audio_frames([audio]))  # The leader may not have streamed it
+            output.put(audio)
+        output.put(_CHUNK_DONE)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        for index in range(len(chunks)):
+            pool.submit(bind(produce), index)  # Requests are traced under the caller's span
+
+        for output in pending:
+            while True:
+                item = output.get()
+                if item is _CHUNK_DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def stream_text_to_speech(text, output_file, backend=None, **kwargs):
+    """
+    Write the broadcast to a growing MP3 file as audio arrives
+
+    Each piece is flushed immediately, so a player or the next stage can open the
+    file and start consuming it while the rest is still being synthesized. The
+    audio grows in <output>.partial.mp3 and is renamed to output_file once
+    complete, so a failed synthesis never leaves a truncated broadcast behind.
+
+    Args:
+        text: Broadcast script
+        output_file: MP3 file to write
+        backend: TTSBackend to use (defaults to get_tts_backend())
+        **kwargs: Passed to iter_broadcast_audio (max_workers, max_retries, stats, ...)
+
+    Returns:
+        dict with 'time_to_first_audio_s', 'total_s' and 'bytes', or None on failure
+
+    Raises:
+        Whatever synthesis raised, after removing the partial file
+    """
+    backend = backend or get_tts_backend()
+    if backend is None:
+        return None
+
+    start = time.perf_counter()
+    time_to_first_audio = None
+    written = 0
+    stem, extension = os.path.splitext(output_file)
+    partial_file = stem + ".partial" + extension
+
+    try:
+        with open(partial_file, 'wb') as f:
+            for data in iter_broadcast_audio(text, backend, **kwargs):
+                f.write(data)
+                f.flush()
+                written += len(data)
+                if time_to_first_audio is None:
+                    time_to_first_audio = time.perf_counter() - start
+                    print(f"▶️  First audio after {time_to_first_audio:.2f}s - {partial_file} is playable now")
+        os.replace(partial_file, output_file)  # Players that opened it early keep reading
+    except BaseException:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+        raise
+
+    return {
+        'time_to_first_audio_s': time_to_first_audio,
+        'total_s': time.perf_counter() - start,
+        'bytes': written,
+    }
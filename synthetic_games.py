@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Synthetic games and seasons
+Made-up but well-formed game_playByPlay documents - the shape
+get_game_pitch_data consumes - with configurable innings, at-bat length,
+scoring and rosters, up to 25-inning marathons and whole seasons. Everything is
+seeded, so selection, rendering, mixing and ingest can be tested at 10x and
+100x real game sizes with no network access
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+# (pitch type, low mph, high mph)
+PITCH_MIX = [('Four-Seam Fastball', 92, 99), ('Sinker', 90, 96), ('Slider', 82, 89),
+             ('Changeup', 81, 88), ('Curveball', 74, 81)]
+
+# (at-bat event, weight, runs scored)
+OUTCOMES = [('Groundout', 0.3, 0), ('Flyout', 0.25, 0), ('Lineout', 0.1, 0), ('Single', 0.18, 0),
+            ('Double', 0.08, 1), ('Home Run', 0.09, 1)]
+
+FIRST_NAMES = ['Alex', 'Ben', 'Carlos', 'Dylan', 'Eli', 'Felix', 'Gabe', 'Hector', 'Isaac', 'Jose',
+               'Kyle', 'Luis', 'Marcus', 'Nate', 'Omar', 'Pablo', 'Ryan', 'Sam', 'Trey', 'Victor']
+LAST_NAMES = ['Alvarez', 'Brooks', 'Castillo', 'Diaz', 'Ellis', 'Fuentes', 'Garcia', 'Hayes', 'Ito',
+              'Jensen', 'Kim', 'Lopez', 'Mendoza', 'Nolan', 'Ortiz', 'Perez', 'Reyes', 'Soto',
+              'Turner', 'Walker']
+
+REAL_GAME_INNINGS = 9   # Innings in a real game; --scale multiplies this
+
+
+def player_pool(seed, size):
+    """size distinct made-up player names, the same for every call with a seed (int or str)"""
+    names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    return random.Random(seed).sample(names, size)
+
+
+def roster(seed, batters=9, starters=5, relievers=7):
+    """
+    A team's made-up players
+
+    Returns:
+        dict with 'lineup' (batting order), 'starters' (rotation) and 'relievers'
+    """
+    players = player_pool(seed, batters + starters + relievers)
+    return {
+        'lineup': players[:batters],
+        'starters': players[batters:batters + starters],
+        'relievers': players[batters + starters:],
+    }
+
+
+def synthetic_play_by_play(seed, innings=REAL_GAME_INNINGS, in_play_rate=0.2, scoring=1.0,
+                           lineups=None, pitchers=None, starter_innings=None):
+    """
+    Made-up but well-formed game_playByPlay response, the same for every call with a seed
+
+    Args:
+        seed: Seed for everything random in the game (a gamePk works)
+        innings: Innings played, extra innings included (25 for a marathon)
+        in_play_rate: Chance a pitch is put in play; lower means longer at-bats
+            and more pitches per game
+        scoring: Multiplier on the chance of run-scoring hits (0 for a shutout)
+        lineups: dict of 'top' / 'bottom' -> batting order (defaults to
+            placeholder names like "Top Batter 1")
+        pitchers: dict of 'top' / 'bottom' -> pitchers facing that half, starter
+            first (defaults to one placeholder starter per side)
+        starter_innings: Innings the starter pitches before the remaining
+            pitchers take an inning each, in turn (None: the starter goes all game)
+
+    Returns:
+        dict with 'allPlays' and 'scoringPlays', like statsapi.get('game_playByPlay')
+    """
+    rng = random.Random(seed)
+    lineups = lineups or {half: [f"{half.capitalize()} Batter {n}" for n in range(1, 10)]
+                          for half in ('top', 'bottom')}
+    pitchers = pitchers or {'top': ["Home Starter"], 'bottom': ["Away Starter"]}
+    weights = [weight * (scoring if runs else 1) for _, weight, runs in OUTCOMES]
+    next_batter = {'top': 0, 'bottom': 0}
+    score = {'top': 0, 'bottom': 0}
+    plays, scoring_plays = [], []
+
+    def pitcher_for(half, inning):
+        staff = pitchers[half]
+        if starter_innings is None or inning <= starter_innings or len(staff) == 1:
+            return staff[0]
+        return staff[1 + (inning - starter_innings - 1) % (len(staff) - 1)]
+
+    for inning in range(1, innings + 1):
+        for half in ('top', 'bottom'):
+            outs = 0
+            pitcher = pitcher_for(half, inning)
+            while outs < 3:
+                batter = lineups[half][next_batter[half] % len(lineups[half])]
+                next_batter[half] += 1
+                events, balls, strikes = [], 0, 0
+                while True:
+                    pitch_type, low, high = rng.choice(PITCH_MIX)
+                    roll = rng.random()
+                    in_play = roll > 1 - in_play_rate
+                    if in_play:
+                        description = "In play, out(s)"
+                    elif roll < 0.38:
+                        description, balls = "Ball", balls + 1
+                    elif roll < 0.6:
+                        description, strikes = "Called Strike", strikes + 1
+                    elif roll < 0.72 or strikes < 2:
+                        description, strikes = "Foul", min(2, strikes + 1)
+                    else:
+                        description, strikes = "Swinging Strike", strikes + 1
+                    events.append({
+                        'isPitch': True,
+                        'details': {'description': description, 'type': {'description': pitch_type}},
+                        'count': {'balls': balls, 'strikes': strikes},
+                        'pitchData': {
+                            'startSpeed': round(rng.uniform(low, high), 1),
+                            'zone': rng.randint(1, 14),
+                            'coordinates': {'pX': round(rng.uniform(-1.4, 1.4), 2),
+                                            'pZ': round(rng.uniform(1.2, 4.0), 2)},
+                        },
+                    })
+                    if in_play or balls == 4 or strikes == 3:
+                        break
+
+                if balls == 4:
+                    event, runs = "Walk", 0
+                elif strikes == 3:
+                    event, runs, outs = "Strikeout", 0, outs + 1
+                else:
+                    event, _, runs = rng.choices(OUTCOMES, weights=weights)[0]
+                    if event in ('Groundout', 'Flyout', 'Lineout'):
+                        outs += 1
+                    else:
+                        events[-1]['details']['description'] = "In play, run(s)" if runs else "In play, no out"
+                score[half] += runs
+                if runs:
+                    scoring_plays.append(len(plays))
+
+                plays.append({
+                    'about': {'inning': inning, 'halfInning': half},
+                    'matchup': {'batter': {'fullName': batter}, 'pitcher': {'fullName': pitcher}},
+                    'result': {'event': event, 'description': f"{batter} {event.lower()}.", 'rbi': runs,
+                               'awayScore': score['top'], 'homeScore': score['bottom']},
+                    'playEvents': events,
+                })
+
+    return {'allPlays': plays, 'scoringPlays': scoring_plays}
+
+
+def synthetic_season(seed, games=2430, teams=30, first_game_pk=900001, **options):
+    """
+    Made-up season: games between made-up teams with fixed rosters and rotations
+
+    Games are generated one at a time as they are iterated, so a full season
+    never has to fit in memory.
+
+    Args:
+        seed: Seed for the schedule, rosters and every game
+        games: Games in the season (2430 is a full MLB season)
+        teams: Teams in the league
+        first_game_pk: gamePk of the first game (the rest follow in order)
+        **options: Passed to synthetic_play_by_play (innings, in_play_rate, scoring)
+
+    Yields:
+        dict with 'game_pk', 'away_team', 'home_team' and 'playbyplay'
+    """
+    rng = random.Random(seed)
+    names = [f"Team {n:02d}" for n in range(1, teams + 1)]
+    rosters = {name: roster(f"{seed}-{name}") for name in names}
+    starts = {name: 0 for name in names}
+
+    for index in range(games):
+        away, home = rng.sample(names, 2)
+        staffs = {}
+        for name in (away, home):
+            team = rosters[name]
+            staffs[name] = [team['starters'][starts[name] % len(team['starters'])]] + team['relievers']
+            starts[name] += 1
+        yield {
+            'game_pk': first_game_pk + index,
+            'away_team': away,
+            'home_team': home,
+            'playbyplay': synthetic_play_by_play(
+                rng.getrandbits(32),
+                lineups={'top': rosters[away]['lineup'], 'bottom': rosters[home]['lineup']},
+                pitchers={'top': staffs[home], 'bottom': staffs[away]},
+                starter_innings=6,
+                **options
+            ),
+        }
+
+
+def describe(playbyplay):
+    """Plays, pitches and final score of a play-by-play document"""
+    plays = playbyplay['allPlays']
+    final = plays[-1]['result'] if plays else {'awayScore': 0, 'homeScore': 0}
+    return {
+        'plays': len(plays),
+        'pitches': sum(1 for play in plays for event in play['playEvents'] if event.get('isPitch')),
+        'innings': max((play['about']['inning'] for play in plays), default=0),
+        'away_score': final['awayScore'],
+        'home_score': final['homeScore'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic MLB play-by-play for scale testing")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    game_parser = commands.add_parser('game', help="Generate one game")
+    game_parser.add_argument('seed', type=int)
+    game_parser.add_argument('--innings', type=int, default=REAL_GAME_INNINGS)
+    game_parser.add_argument('--scale', type=float, help="Size relative to a real game (sets --innings)")
+    game_parser.add_argument('--in-play-rate', type=float, default=0.2)
+    game_parser.add_argument('--scoring', type=float, default=1.0)
+    game_parser.add_argument('--players', action='store_true', help="Use made-up player names and a bullpen")
+    game_parser.add_argument('-o', '--output', help="Write the play-by-play JSON here")
+
+    season_parser = commands.add_parser('season', help="Generate a season and time parsing it")
+    season_parser.add_argument('seed', type=int)
+    season_parser.add_argument('--games', type=int, default=2430)
+    season_parser.add_argument('--teams', type=int, default=30)
+    season_parser.add_argument('--innings', type=int, default=REAL_GAME_INNINGS)
+    season_parser.add_argument('--out-dir', help="Write each game here as <gamePk>.json")
+    args = parser.parse_args()
+
+    if args.command == 'game':
+        innings = max(1, round(REAL_GAME_INNINGS * args.scale)) if args.scale else args.innings
+        options = {}
+        if args.players:
+            away, home = roster(f"{args.seed}-away"), roster(f"{args.seed}-home")
+            options = {
+                'lineups': {'top': away['lineup'], 'bottom': home['lineup']},
+                'pitchers': {'top': home['starters'][:1] + home['relievers'],
+                             'bottom': away['starters'][:1] + away['relievers']},
+                'starter_innings': 6,
+            }
+        playbyplay = synthetic_play_by_play(args.seed, innings, args.in_play_rate, args.scoring, **options)
+        summary = describe(playbyplay)
+        print(f"⚾ Game {args.seed}: {summary['innings']} innings, {summary['plays']} plays, "
+              f"{summary['pitches']} pitches, final {summary['away_score']}-{summary['home_score']}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(playbyplay, f, separators=(',', ':'))
+            print(f"💾 Saved to {args.output}")
+        return
+
+    from fetch_game_data import parse_play_by_play
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    generate_s = parse_s = 0.0
+    pitches = 0
+    start = time.perf_counter()
+    for game in synthetic_season(args.seed, args.games, args.teams, innings=args.innings):
+        generated = time.perf_counter()
+        generate_s += generated - start
+        pitches += len(parse_play_by_play(game['playbyplay']))
+        start = time.perf_counter()
+        parse_s += start - generated
+        if args.out_dir:
+            with open(os.path.join(args.out_dir, f"{game['game_pk']}.json"), 'w') as f:
+                json.dump(game, f, separators=(',', ':'))
+            start = time.perf_counter()
+
+    print(f"📅 Season {args.seed}: {args.games} games, {pitches:,} pitches")
+    print(f"   generated in {generate_s:.1f}s, parsed in {parse_s:.1f}s "
+          f"({pitches / parse_s if parse_s else 0:,.0f} pitches/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Render plan, ducking and stem remix tests
+Uses generated tones instead of the sound effect files, so it runs anywhere
+numpy and pydub are installed. Run with: python -m pytest test_audio_mixer.py
+"""
+
+import random
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from audio_mixer import STEM_DTYPES, BaseballAudioMixer, CrowdBed, RenderPlan, ducking_envelope, mix_stems, render_plan
+from stem_cache import STEM_NAMES
+
+FRAME_RATE = 24000
+
+
+def tone(seconds, hz, amplitude):
+    t = np.arange(int(seconds * FRAME_RATE)) / FRAME_RATE
+    return (amplitude * np.sin(2 * np.pi * hz * t)).astype(np.int16).reshape(-1, 1)
+
+
+def insert_plan():
+    """Narration cut around an inserted effect and a pause, like insert mode"""
+    plan = RenderPlan(FRAME_RATE, 1, 2)
+    plan.add_source('narration', tone(3, 220, 12000))
+    plan.add_source('crack', tone(0.5, 1200, 20000))
+    plan.append('narration', 0, FRAME_RATE, 'narration')
+    plan.append('crack', 0, FRAME_RATE // 2, 'sfx')
+    plan.append_silence(FRAME_RATE // 5)
+    plan.append('narration', FRAME_RATE, FRAME_RATE * 2, 'narration')
+    return plan
+
+
+def loud_plan():
+    """Narration with two overlapping near-full-scale effects on top, ducked under them"""
+    plan = RenderPlan(FRAME_RATE, 1, 2)
+    plan.add_source('narration', tone(3, 220, 30000))
+    plan.add_source('crack', tone(0.5, 1200, 28000))
+    plan.add_source('cheer', tone(1.2, 450, 25000))
+    plan.append('narration', 0, FRAME_RATE * 3, 'narration')
+    plan.place(FRAME_RATE, 'crack', 0, FRAME_RATE // 2, 'sfx')
+    plan.place(FRAME_RATE + FRAME_RATE // 4, 'cheer', 0, int(1.2 * FRAME_RATE), 'sfx')
+    plan.ops.sort(key=lambda op: op.offset)
+    plan.envelopes['narration'] = ducking_envelope(
+        [(FRAME_RATE, FRAME_RATE * 3 // 2), (FRAME_RATE * 5 // 4, int(2.45 * FRAME_RATE))],
+        attack_frames=240, release_frames=480)
+    return plan
+
+
+def render_stems(plan):
+    dtype = STEM_DTYPES[plan.sample_width]
+    return {track: render_plan(plan, np.zeros((plan.total_frames, plan.channels), dtype=dtype), tracks={track})
+            for track in STEM_NAMES}
+
+
+def test_render_lays_the_timeline_end_to_end():
+    plan = insert_plan()
+    narration, crack = plan.sources['narration'], plan.sources['crack']
+    expected = np.concatenate([narration[:FRAME_RATE], crack, np.zeros((FRAME_RATE // 5, 1), np.int16),
+                               narration[FRAME_RATE:]])
+    samples = render_plan(plan)
+    assert samples.dtype == np.int16
+    assert samples.tobytes() == expected.tobytes()
+
+
+def test_windows_render_like_the_whole_plan():
+    plan = insert_plan()
+    whole = render_plan(plan)
+    out = np.zeros_like(whole)
+    for start in range(0, plan.total_frames, 10007):
+        frames = min(10007, plan.total_frames - start)
+        render_plan(plan, out=out[start:start + frames], start=start, frames=frames, block_frames=4096)
+    assert out.tobytes() == whole.tobytes()
+
+
+def test_ducking_envelope_ramps_around_a_span():
+    envelope = ducking_envelope([(1000, 2000)], gain_db=-6, attack_frames=100, release_frames=200)
+    gain = 10 ** (-6 / 20)
+    gains = envelope.evaluate(0, 3000)
+    assert gains[0] == 1.0 and gains[899] == 1.0
+    assert gains[950] == pytest.approx((1 + gain) / 2)
+    assert gains[1000] == pytest.approx(gain) and gains[1999] == pytest.approx(gain)
+    assert gains[2100] == pytest.approx((1 + gain) / 2)
+    assert gains[2200] == 1.0
+
+
+def test_ducking_envelope_is_flat_away_from_spans():
+    envelope = ducking_envelope([(1000, 2000)], attack_frames=100, release_frames=200)
+    assert envelope.evaluate(0, 800) is None
+    assert envelope.evaluate(2300, 5000) is None
+    assert ducking_envelope([]).evaluate(0, 100) is None
+
+
+def test_close_spans_merge_into_one_dip():
+    envelope = ducking_envelope([(3000, 4000), (1000, 2000)], attack_frames=600, release_frames=600)
+    assert list(envelope.frames) == [400, 1000, 4000, 4600]
+    assert envelope.evaluate(2000, 3000).max() < 1.0  # Stays ducked between the effects
+
+
+def test_far_spans_stay_separate():
+    envelope = ducking_envelope([(1000, 2000), (5000, 6000)], attack_frames=100, release_frames=100)
+    assert len(envelope.frames) == 8
+    assert envelope.evaluate(3000, 4000) is None
+
+
+def test_render_clips_overlapping_sounds():
+    samples = render_plan(loud_plan())
+    limits = np.iinfo(np.int16)
+    assert samples.dtype == np.int16
+    assert (samples == limits.max).any() and (samples == limits.min).any()
+
+
+def test_unity_remix_of_stems_matches_one_pass_render():
+    plan = loud_plan()
+    crowd = CrowdBed(tone(0.7, 90, 20000), gain_db=-6)
+    stems = render_stems(plan)
+    assert mix_stems(stems, crowd=crowd, dtype=plan.dtype).tobytes() == render_plan(plan, crowd=crowd).tobytes()
+
+
+def test_stems_keep_the_unclipped_sums():
+    plan = loud_plan()
+    sfx = render_stems(plan)['sfx']
+    assert np.abs(sfx).max() > np.iinfo(np.int16).max
+
+
+def test_remix_gains_and_muting():
+    plan = loud_plan()
+    stems = render_stems(plan)
+    muted = mix_stems(stems, {'sfx': None}, dtype=plan.dtype)
+    assert muted.tobytes() == render_plan(plan, tracks={'narration'}).tobytes()
+    quieter = mix_stems(stems, {'narration': -20.0, 'sfx': -20.0}, dtype=plan.dtype).astype(np.int64)
+    assert np.abs(quieter).max() < np.abs(render_plan(plan).astype(np.int64)).max()
+
+
+def test_seeded_stems_are_cached_per_rng_state(tmp_path):
+    mixer = BaseballAudioMixer(sound_effects_dir=str(tmp_path / "none"), stem_cache_dir=str(tmp_path / "stems"))
+    mixer.sounds = {name: AudioSegment(tone(0.3, hz, 9000).tobytes(), sample_width=2, frame_rate=FRAME_RATE,
+                                       channels=1)
+                    for name, hz in [('bat1', 700), ('bat2', 900), ('bat3', 1100), ('hit_reaction', 300)]}
+    narration = AudioSegment(tone(4, 220, 8000).tobytes(), sample_width=2, frame_rate=FRAME_RATE, channels=1)
+    events = [{'timestamp_ms': 500 * n, 'result': "In play, no out", 'at_bat_event': "Single"} for n in range(1, 7)]
+
+    def sfx_stem(rng):
+        return mixer.render_stems(narration, events, rng=rng)['sfx'].tobytes()
+
+    first, second = sfx_stem(random.Random(1)), sfx_stem(random.Random(2))
+    assert first != second
+    rng = random.Random(1)
+    assert sfx_stem(rng) == first and sfx_stem(random.Random(2)) == second
+    assert (mixer.stem_cache.hits, mixer.stem_cache.misses) == (2, 2)
+    fresh = random.Random(1)
+    mixer.choose_event_sounds(events, fresh)
+    assert rng.getstate() == fresh.getstate()  # A cache hit draws the same bat sounds a render would
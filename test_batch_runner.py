@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Nightly batch planning tests
+Deadlines from subscriber bedtimes and which games plan_jobs runs or skips,
+with made-up schedule entries (no network). Run with: python -m pytest test_batch_runner.py
+"""
+
+from datetime import datetime
+
+from batch_runner import config_hash, next_deadline, plan_jobs
+
+NOW = datetime(2026, 7, 4, 21, 30)
+SETTINGS = {'format': 'mp3', 'mode': 'insert', 'crowd': True}
+
+
+def game(game_id, away="Toronto Blue Jays", home="Los Angeles Dodgers"):
+    return {'game_id': game_id, 'away_name': away, 'home_name': home}
+
+
+def test_deadline_later_today():
+    assert next_deadline("22:00", NOW) == datetime(2026, 7, 4, 22, 0)
+
+
+def test_deadline_already_passed_rolls_to_tomorrow():
+    assert next_deadline("21:00", NOW) == datetime(2026, 7, 5, 21, 0)
+
+
+def test_deadline_right_now_is_today():
+    assert next_deadline("21:30", NOW) == NOW
+
+
+def test_deadline_is_the_earliest_bedtime_of_either_team(tmp_path):
+    bedtimes = {"Toronto Blue Jays": "23:00", "Los Angeles Dodgers": "22:15"}
+    jobs, _ = plan_jobs([game(1)], SETTINGS, str(tmp_path), bedtimes, now=NOW)
+    assert jobs[0].deadline == datetime(2026, 7, 4, 22, 15)
+
+
+def test_teams_without_bedtimes_use_the_default(tmp_path):
+    jobs, _ = plan_jobs([game(1, "A", "B")], SETTINGS, str(tmp_path), {"C": "20:00"}, "23:45", now=NOW)
+    assert jobs[0].deadline == datetime(2026, 7, 4, 23, 45)
+
+
+def test_games_listed_twice_are_planned_once(tmp_path):
+    jobs, skipped = plan_jobs([game(1), game(2), game(1)], SETTINGS, str(tmp_path), now=NOW)
+    assert [job.game['game_id'] for job in jobs] == [1, 2]
+    assert skipped == []
+
+
+def test_existing_artifacts_are_skipped(tmp_path):
+    done = tmp_path / f"2_{config_hash(SETTINGS)}.mp3"
+    done.write_bytes(b'')
+    jobs, skipped = plan_jobs([game(1), game(2)], SETTINGS, str(tmp_path), now=NOW)
+    assert [job.game['game_id'] for job in jobs] == [1]
+    assert [job.output_file for job in skipped] == [str(done)]
+    assert skipped[0].status == "skipped"
+
+
+def test_other_settings_get_their_own_artifact(tmp_path):
+    jobs, _ = plan_jobs([game(1)], SETTINGS, str(tmp_path), now=NOW)
+    other, _ = plan_jobs([game(1)], dict(SETTINGS, format='wav'), str(tmp_path), now=NOW)
+    assert other[0].output_file != jobs[0].output_file
+    assert other[0].output_file.endswith(".wav")
+
+
+def test_jobs_sort_by_deadline(tmp_path):
+    bedtimes = {"Early": "21:45", "Late": "23:00"}
+    jobs, _ = plan_jobs([game(1, "Late", "Late"), game(2, "Early", "Late")], SETTINGS, str(tmp_path),
+                        bedtimes, now=NOW)
+    assert [job.game['game_id'] for job in sorted(jobs)] == [2, 1]
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Pipelined orchestrator tests
+Runs whole broadcasts of a synthetic game with the local TTS engine and
+generated sound effects, so nothing touches the network. A failing stage must
+fail the run, never hang it. Run with: python -m pytest test_broadcast_pipeline.py
+"""
+
+import asyncio
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from audio_mixer import BaseballAudioMixer
+from broadcast_pipeline import run_pipeline
+from broadcast_service import standin_feed
+from tts_backends import LocalTTSBackend
+
+SOUNDS = {'catch_fastball': 600, 'catch_slowball': 700, 'bat1': 900, 'bat2': 800, 'bat3': 850, 'bunt': 500,
+          'hit_reaction': 2500, 'crowd_ambient': 7000}
+
+
+class BrokenTTSBackend(LocalTTSBackend):
+    """Local engine whose every request fails"""
+
+    def synthesize(self, text, voice=None, speed=None, response_format="mp3"):
+        raise RuntimeError("TTS is down")
+
+
+@pytest.fixture(scope='module')
+def feed():
+    return standin_feed(1)
+
+
+@pytest.fixture(scope='module')
+def mixer():
+    rng = np.random.default_rng(0)
+    mixer = BaseballAudioMixer(sound_effects_dir='/nonexistent')
+    mixer.sounds = {name: AudioSegment(data=rng.integers(-8000, 8000, 24 * ms).astype(np.int16).tobytes(),
+                                       sample_width=2, frame_rate=24000, channels=1)
+                    for name, ms in SOUNDS.items()}
+    return mixer
+
+
+def broadcast(feed, mixer, output_file, backend, **options):
+    with ThreadPoolExecutor(2) as pool:
+        return asyncio.run(asyncio.wait_for(run_pipeline(
+            str(output_file), pitch_data=feed['pitch_data'], key_innings=feed['key_innings'],
+            backend=backend, mixer=mixer, seed=1, pool=pool, **options
+        ), timeout=60))
+
+
+def test_broadcast_is_written(feed, mixer, tmp_path):
+    result = broadcast(feed, mixer, tmp_path / "game.wav", LocalTTSBackend(), max_pitches=20)
+    with wave.open(str(tmp_path / "game.wav")) as f:
+        assert f.getnframes() / f.getframerate() == pytest.approx(result['duration_s'])
+    assert result['half_innings'] > 1
+
+
+@pytest.mark.parametrize('queue_size', [1, 3])
+def test_failing_tts_fails_the_run(feed, mixer, tmp_path, queue_size):
+    with pytest.raises(RuntimeError, match="TTS is down"):
+        broadcast(feed, mixer, tmp_path / "game.wav", BrokenTTSBackend(), queue_size=queue_size)
+    assert not (tmp_path / "game.wav").exists()
+
+
+def test_failing_mix_fails_the_run(feed, mixer, tmp_path, monkeypatch):
+    def build_plan(*args):
+        raise ValueError("bad plan")
+
+    monkeypatch.setattr(mixer, 'build_plan', build_plan)
+    with pytest.raises(ValueError, match="bad plan"):
+        broadcast(feed, mixer, tmp_path / "game.wav", LocalTTSBackend(), queue_size=1)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Broadcast service tests
+Artifact naming, render coalescing and the TTS cache, with the local TTS
+engine and a synthetic game feed (no network). Run with: python -m pytest test_broadcast_service.py
+"""
+
+import pytest
+
+from broadcast_service import BroadcastService, CachingTTSBackend, LRUCache, parse_options, standin_feed
+from tts_backends import LocalTTSBackend
+
+
+class RecordingBackend(LocalTTSBackend):
+    """Local engine remembering the voice and speed of every request"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def synthesize(self, text, voice=None, speed=None, response_format="mp3"):
+        self.requests.append((voice, speed))
+        return super().synthesize(text, voice=voice, speed=speed, response_format=response_format)
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = BroadcastService(LocalTTSBackend(), standin_feed, str(tmp_path), workers=1, render_processes=1)
+    yield service
+    service.close()
+
+
+def test_default_voice_names_one_artifact(service):
+    implicit = parse_options('wav', {})
+    explicit = parse_options('wav', {'voice': [service.backend.voice]})
+    assert service.artifact_path(1, implicit) == service.artifact_path(1, explicit)
+    assert service.artifact_path(1, implicit) != service.artifact_path(1, parse_options('wav', {'voice': ['nova']}))
+
+
+def test_default_voice_joins_the_explicit_render(service):
+    source, job = service.broadcast(1, parse_options('wav', {}))
+    assert source == "render"
+    assert job.options['voice'] == service.backend.voice
+    source, joined = service.broadcast(1, parse_options('wav', {'voice': [service.backend.voice]}))
+    assert source in ("joined", "cache")
+    if source == "joined":
+        assert joined is job
+    else:
+        joined.close()
+
+
+def test_tts_cache_fills_in_only_missing_arguments():
+    backend = RecordingBackend()
+    caching = CachingTTSBackend(backend, LRUCache(8), voice='nova')
+    caching.synthesize("Strike one.", response_format="pcm")
+    caching.synthesize("Strike one.", speed=1.25, response_format="pcm")
+    caching.synthesize("Strike one.", voice='onyx', response_format="pcm")
+    caching.synthesize("Strike one.", voice='nova', speed=backend.speed, response_format="pcm")
+    assert backend.requests == [('nova', backend.speed), ('nova', 1.25), ('onyx', backend.speed)]
@@ -4,36 +4,24 @@ Test broadcast generation WITH sound effects
 Demonstrates the complete audio mixing system
 """
 
-import os
-from openai import OpenAI
-from pydub import AudioSegment
 from fetch_game_data import get_recent_games, get_game_pitch_data
 from generate_broadcast import generate_broadcast_script, generate_pitch_description
 from audio_mixer import BaseballAudioMixer
+from narration_alignment import align_pitch_events
+from tts_backends import get_tts_backend, synthesize_segment
 
-def generate_tts(text, output_file="temp_narration.mp3"):
-    """Generate TTS narration (without sound effects yet)"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("Error: OPENAI_API_KEY not set")
+def generate_tts(text):
+    """Generate TTS narration in memory (without sound effects yet)"""
+    backend = get_tts_backend()
+    if backend is None:
         return None
 
     try:
-        client = OpenAI(api_key=api_key)
-
         print("🎙️  Generating TTS narration...")
-        response = client.audio.speech.create(
-            model="tts-1-hd",
-            voice="onyx",
-            speed=0.95,
-            input=text
-        )
-
-        response.stream_to_file(output_file)
-        print(f"✅ Narration saved to {output_file}")
-
-        # Load as AudioSegment
-        return AudioSegment.from_mp3(output_file)
+        # Raw PCM goes straight into the mixer - no temp file, no MP3 decode
+        narration = synthesize_segment(backend, text, response_format="pcm")
+        print(f"✅ Narration ready ({len(narration) / 1000:.1f} seconds)")
+        return narration
 
     except Exception as e:
         print(f"Error: {e}")
@@ -73,6 +61,7 @@ def main():
     # 3. Generate script
     print("\n3️⃣  Generating broadcast script...")
     script_lines = ["Top of the 3rd inning."]
+    pitch_texts = []
 
     prev_batter = None
     prev_pitcher = None
@@ -87,6 +76,7 @@ def main():
             mention_pitcher=mention_pitcher
         )
         script_lines.append(pitch_desc)
+        pitch_texts.append(pitch_desc)
 
         result = pitch['result'].lower()
         if 'in play' in result or 'hit' in result:
@@ -119,7 +109,7 @@ def main():
 
     # 4. Generate TTS narration
     print("\n4️⃣  Generating TTS narration (HD quality, speed 0.95)...")
-    narration_audio = generate_tts(script, "temp_narration.mp3")
+    narration_audio = generate_tts(script)
     if not narration_audio:
         print("❌ TTS generation failed")
         return
@@ -127,32 +117,24 @@ def main():
     # 5. Create pitch events for sound effect timing
     print("\n5️⃣  Preparing pitch events for sound effects...")
 
-    # Estimate timing: ~150 words per minute = 2.5 words per second = 400ms per word
-    # Rough timing based on script position
-    words = script.split()
     pitch_events = []
-    current_time_ms = 0
-    word_index = 0
-
     for pitch in top_3rd:
-        # Find approximate timestamp for this pitch
-        # Each pitch description is ~15-20 words, so roughly 6-8 seconds
-        pitch_desc_words = 15
-        current_time_ms += pitch_desc_words * 400  # 400ms per word
-
         pitch_events.append({
-            'timestamp_ms': current_time_ms,
+            'timestamp_ms': 0,
             'pitch_type': pitch['pitch_type'],
             'speed': pitch['speed'],
             'result': pitch['result'],
             'at_bat_event': pitch.get('at_bat_event')
         })
 
-    print(f"   Created {len(pitch_events)} pitch events")
+    # Measure where each pitch ends in the narration (the pause after its text)
+    snapped = align_pitch_events(narration_audio, script, pitch_texts, pitch_events)
+    print(f"   Created {len(pitch_events)} pitch events ({snapped} aligned to pauses in the narration)")
 
     # 6. Mix narration with sound effects
     print("\n6️⃣  Mixing audio with baseball sound effects...")
-    mixer = BaseballAudioMixer(enable_background_crowd=enable_crowd)
+    # Stems are cached, so re-running with other crowd/SFX settings only re-sums them
+    mixer = BaseballAudioMixer(enable_background_crowd=enable_crowd, stem_cache_dir=".stem_cache")
 
     output_file = "test_broadcast_with_sfx.mp3"
     final_audio = mixer.mix_broadcast_with_effects(
@@ -181,7 +163,7 @@ def main():
         print("   • Background crowd ambiance (looped at -15 dB)")
 
     print("\n💡 To disable background crowd, edit:")
-    print("   mixer = BaseballAudioMixer(enable_background_crowd=False)")
+    print("   mixer = BaseballAudioMixer(enable_background_crowd=False, stem_cache_dir=\".stem_cache\")")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Span and summary tests
+Nested spans, counter roll-up and the per-stage / per-game summary, in
+memory. Run with: python -m pytest test_instrumentation.py
+"""
+
+import threading
+
+import pytest
+
+from instrumentation import (bind, count, disable_tracing, enable_tracing, finished_spans, rss_peak_mb, span,
+                             summarize, tracing_enabled)
+
+
+@pytest.fixture
+def tracing():
+    enable_tracing()
+    yield
+    disable_tracing()
+
+
+def by_name(spans):
+    return {record['name']: record for record in spans}
+
+
+def test_nothing_is_recorded_while_tracing_is_off():
+    disable_tracing()
+    with span('broadcast', game=1) as current:
+        current.add('bytes_in', 10)
+        count('cache_hits')
+    assert not tracing_enabled()
+    assert finished_spans() == []
+
+
+def test_spans_nest_and_roll_counters_up(tracing):
+    with span('broadcast', game=717465):
+        with span('tts.request', voice='onyx') as request:
+            request.add('bytes_out', 100)
+            request.add('characters_billed', 40)
+        with span('mix'):
+            count('cache_hits', 2)
+    spans = by_name(finished_spans())
+    assert spans['tts.request']['parent'] == spans['broadcast']['id']
+    assert spans['tts.request']['game'] == 717465
+    assert spans['tts.request']['attributes'] == {'voice': 'onyx'}
+    assert spans['broadcast']['counters'] == {}
+    assert spans['broadcast']['totals'] == {'bytes_out': 100, 'characters_billed': 40, 'cache_hits': 2}
+
+
+def test_errors_are_recorded_on_the_span(tracing):
+    with pytest.raises(ValueError):
+        with span('fetch.play_by_play'):
+            raise ValueError("no such game")
+    assert finished_spans()[0]['attributes']['error'] == "ValueError: no such game"
+
+
+def test_bound_work_in_other_threads_stays_in_the_tree(tracing):
+    def request():
+        with span('tts.request') as current:
+            current.add('characters_billed', 10)
+
+    with span('broadcast', game=1):
+        threads = [threading.Thread(target=bind(request)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    summary = summarize(finished_spans())
+    assert summary['games'][1]['totals'] == {'characters_billed': 30}
+    assert summary['games'][1]['spans'] == 1
+
+
+@pytest.mark.skipif(rss_peak_mb() is None, reason="no getrusage on this platform")
+def test_spans_after_the_peak_report_no_memory_growth(tracing):
+    with span('mix'):
+        buffer = bytearray(64 * 1024 * 1024)
+        buffer[::4096] = b'x' * len(buffer[::4096])  # Touch every page so it is resident
+        del buffer
+    with span('export'):
+        pass
+    spans = by_name(finished_spans())
+    assert spans['mix']['rss_growth_mb'] >= 0
+    assert spans['export']['rss_growth_mb'] == 0
+    assert spans['export']['process_rss_peak_mb'] >= spans['mix']['process_rss_peak_mb']
+
+
+def test_summary_aggregates_stages_and_games():
+    def record(id, name, wall_ms, parent=None, game=None, counters=None, totals=None, peak=None, growth=None):
+        return {'id': id, 'parent': parent, 'game': game, 'name': name, 'wall_ms': wall_ms,
+                'process_rss_peak_mb': peak, 'rss_growth_mb': growth,
+                'counters': counters or {}, 'totals': totals or counters or {}}
+
+    spans = [
+        record(2, 'tts.request', 120.0, 1, 'A', {'characters_billed': 500}),
+        record(3, 'tts.request', 80.5, 1, 'A', {'characters_billed': 300, 'bytes_in': 9}),
+        record(1, 'broadcast', 400.0, None, 'A', totals={'characters_billed': 800, 'bytes_in': 9},
+               peak=50.0, growth=20.0),
+        record(5, 'tts.request', 10.0, 4, 'B', {'characters_billed': 100}),
+        record(4, 'broadcast', 30.0, None, 'B', totals={'characters_billed': 100}, peak=60.0, growth=10.0),
+        record(6, 'broadcast', 20.0, None, 'B', totals={'cache_hits': 1}, peak=60.0, growth=0.0),
+    ]
+    summary = summarize(spans)
+    assert summary['stages']['tts.request'] == {
+        'count': 3, 'total_ms': 210.5, 'max_ms': 120.0, 'counters': {'characters_billed': 900, 'bytes_in': 9}}
+    assert summary['stages']['broadcast']['count'] == 3
+    assert summary['process_rss_peak_mb'] == 60.0
+    assert summary['games']['A'] == {'spans': 1, 'wall_ms': 400.0, 'rss_growth_mb': 20.0,
+                                     'totals': {'characters_billed': 800, 'bytes_in': 9}}
+    assert summary['games']['B'] == {'spans': 2, 'wall_ms': 50.0, 'rss_growth_mb': 10.0,
+                                     'totals': {'characters_billed': 100, 'cache_hits': 1}}
+
+
+def test_summary_of_no_spans_is_empty():
+    assert summarize([]) == {'stages': {}, 'games': {}, 'process_rss_peak_mb': None}
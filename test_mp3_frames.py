@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Frame-level MP3 stitching and streaming tests
+Built on the local engine's silent MP3 frames, so no TTS request or ffmpeg is
+needed. Run with: python -m pytest test_mp3_frames.py
+"""
+
+import pytest
+
+from mp3_frames import iter_frames, mp3_duration_seconds, stitch_mp3, stream_audio_frames
+from tts_backends import PCM_SAMPLE_RATE, silent_mp3
+
+ID3_TAG = b'ID3\x04\x00\x00' + bytes([0, 0, 0, 20]) + b'\x00' * 20
+
+
+def chunks():
+    return [silent_mp3(PCM_SAMPLE_RATE), silent_mp3(PCM_SAMPLE_RATE // 2), silent_mp3(PCM_SAMPLE_RATE * 2)]
+
+
+def test_stitched_duration_is_the_sum_of_the_chunks():
+    parts = chunks()
+    stitched = stitch_mp3(parts)
+    assert mp3_duration_seconds(stitched) == pytest.approx(sum(mp3_duration_seconds(part) for part in parts))
+
+
+def test_stitch_writes_one_info_frame_then_the_audio_frames():
+    parts = chunks()
+    stitched = stitch_mp3([ID3_TAG + part for part in parts])
+    assert b'Info' in stitched[:200]
+    assert stitched.endswith(b''.join(parts))
+    assert len(list(iter_frames(stitched))) == sum(len(list(iter_frames(part))) for part in parts)
+
+
+def test_stitching_a_stitched_file_changes_nothing():
+    stitched = stitch_mp3(chunks())
+    assert stitch_mp3([stitched]) == stitched
+
+
+def test_stitch_rejects_mismatched_sample_rates():
+    with pytest.raises(ValueError):
+        stitch_mp3([silent_mp3(24000, 24000), silent_mp3(22050, 22050)])
+
+
+def test_stitch_of_nothing_is_empty():
+    assert stitch_mp3([]) == b''
+
+
+def test_streamed_frames_drop_tags_and_info_frame():
+    parts = chunks()
+    stream = ID3_TAG + stitch_mp3(parts)
+    pieces = [stream[i:i + 7] for i in range(0, len(stream), 7)]  # Tags and frames split mid-way
+    assert b''.join(stream_audio_frames(pieces)) == b''.join(parts)
+
+
+def test_streamed_responses_append_into_one_playable_file():
+    parts = chunks()
+    streamed = b''.join(b''.join(stream_audio_frames([ID3_TAG + stitch_mp3([part])])) for part in parts)
+    assert mp3_duration_seconds(streamed) == pytest.approx(sum(mp3_duration_seconds(part) for part in parts))
+    assert b'Info' not in streamed and b'ID3' not in streamed
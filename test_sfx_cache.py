@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Decoded sound-effect cache tests
+Generated sounds are stored straight into the PCM cache, so no decoder is
+needed. Run with: python -m pytest test_sfx_cache.py
+"""
+
+import contextlib
+import io
+import random
+
+import numpy as np
+import pytest
+
+from audio_mixer import BaseballAudioMixer, render_plan
+from pipeline_benchmark import synthetic_sound_effects
+from sfx_cache import SoundBank, SoundEffectCache
+from tts_backends import LocalTTSBackend, audio_segment_from_bytes
+
+
+@pytest.fixture
+def mixer(tmp_path):
+    synthetic_sound_effects(str(tmp_path))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return BaseballAudioMixer(sound_effects_dir=str(tmp_path))
+
+
+def test_cached_samples_are_memory_mapped(tmp_path):
+    cache = SoundEffectCache(str(tmp_path))
+    path = tmp_path / "pop.wav"
+    path.write_bytes(b'not decoded')
+    samples = np.arange(-500, 500, dtype=np.int16).reshape(-1, 1)
+    cache.store(str(path), samples)
+    bank = SoundBank(cache, {'pop': str(path), 'gone': str(tmp_path / "gone.wav")})
+    loaded = bank.get_samples('pop')
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, samples)
+    assert bank.get_samples('gone') is None and bank.get_samples('unknown') is None
+
+
+def test_audio_segments_are_built_once(mixer):
+    segment = mixer.sounds['bat1']
+    assert mixer.sounds['bat1'] is segment
+    assert segment.raw_data == mixer.sounds.samples('bat1').tobytes()
+
+
+def test_mixing_renders_from_the_memory_map(mixer):
+    narration = audio_segment_from_bytes(
+        LocalTTSBackend().synthesize("Here's the pitch. " * 20, response_format="pcm"), "pcm")
+    events = [{'timestamp_ms': 400 * n, 'pitch_type': "Slider", 'speed': 85, 'result': "In play, no out",
+               'at_bat_event': "Single"} for n in range(1, 6)]
+    for mode in ('insert', 'overlay'):
+        plan = mixer.build_plan(narration, events, mode, random.Random(1))
+        render_plan(plan, crowd=mixer._crowd_bed(plan.total_frames))
+        assert any(isinstance(samples, np.memmap) for samples in plan.sources.values())
+    assert mixer.sounds._segments == {}  # No AudioSegment copies were made
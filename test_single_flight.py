@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing tests
+Concurrent identical calls must share one execution, its result and its
+error. Run with: python -m pytest test_single_flight.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(group, key, fn, waiters=4):
+    """Start one leader call, let waiters join while it runs, then let it finish"""
+    entered, release = threading.Event(), threading.Event()
+    outcomes = []
+
+    def work():
+        entered.set()
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            outcomes.append(group.do(key, work))
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    entered.wait(5)
+    threads += [threading.Thread(target=call) for _ in range(waiters)]
+    for thread in threads[1:]:
+        thread.start()
+    wait_for(lambda: group.stats()['shared'] >= waiters)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_concurrent_calls_share_one_result():
+    group = SingleFlight('test')
+    calls = []
+    outcomes = run_concurrently(group, 'key', lambda: calls.append(1) or object())
+    assert len(calls) == 1
+    results = {id(result) for result, _ in outcomes}
+    assert len(results) == 1
+    assert sorted(shared for _, shared in outcomes) == [False, True, True, True, True]
+    assert group.stats() == {'executed': 1, 'shared': 4, 'failed': 0, 'in_flight': 0}
+
+
+def test_concurrent_calls_share_one_error():
+    group = SingleFlight('test')
+    error = RuntimeError("feed down")
+
+    def fail():
+        raise error
+
+    outcomes = run_concurrently(group, 'key', fail)
+    assert outcomes == [error] * 5
+    assert group.stats() == {'executed': 1, 'shared': 4, 'failed': 1, 'in_flight': 0}
+
+
+def test_finished_calls_are_not_cached():
+    group = SingleFlight('test')
+    assert group.do('key', lambda: 1) == (1, False)
+    assert group.do('key', lambda: 2) == (2, False)
+    assert group.stats()['executed'] == 2
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    group = SingleFlight('test')
+    release = threading.Event()
+    leader = threading.Thread(target=group.do, args=('slow', release.wait, 5))
+    leader.start()
+    try:
+        assert group.do('fast', lambda: 'done') == ('done', False)
+    finally:
+        release.set()
+        leader.join(5)
+
+
+def test_leader_sees_its_own_error():
+    group = SingleFlight('test')
+    with pytest.raises(ZeroDivisionError):
+        group.do('key', lambda: 1 / 0)
+    assert group.stats()['in_flight'] == 0
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Progressive streaming synthesis tests
+Streams with the local TTS engine (silent MP3 frames without ffmpeg), so no
+request leaves the machine. Run with: python -m pytest test_streaming_tts.py
+"""
+
+import pytest
+
+from mp3_frames import mp3_duration_seconds
+from streaming_tts import stream_text_to_speech
+from tts_backends import LocalTTSBackend
+
+SCRIPT = "\n\n".join(f"Top of the {n}th. Here's the pitch, a fastball for strike {n % 3 + 1}." for n in range(1, 9))
+
+
+class FailingTTSBackend(LocalTTSBackend):
+    """Local engine that fails on the last inning, after earlier chunks have streamed"""
+
+    def synthesize(self, text, voice=None, speed=None, response_format="mp3"):
+        if "8th" in text:
+            raise ValueError("voice not available")
+        return super().synthesize(text, voice=voice, speed=speed, response_format=response_format)
+
+
+def test_stream_publishes_the_finished_file(tmp_path):
+    output_file = tmp_path / "game.mp3"
+    result = stream_text_to_speech(SCRIPT, str(output_file), LocalTTSBackend(), max_chars=80, max_workers=2)
+    assert output_file.stat().st_size == result['bytes']
+    assert mp3_duration_seconds(output_file.read_bytes()) > 0
+    assert [path.name for path in tmp_path.iterdir()] == ["game.mp3"]
+
+
+def test_failed_stream_leaves_no_file(tmp_path):
+    output_file = tmp_path / "game.mp3"
+    with pytest.raises(ValueError):
+        stream_text_to_speech(SCRIPT, str(output_file), FailingTTSBackend(), max_chars=80, max_workers=1,
+                              max_retries=0)
+    assert list(tmp_path.iterdir()) == []
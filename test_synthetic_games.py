@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Synthetic game determinism tests
+The same seed must always give the same game and season, since seeded runs
+are compared byte for byte. Run with: python -m pytest test_synthetic_games.py
+"""
+
+import itertools
+import json
+
+from fetch_game_data import parse_play_by_play
+from synthetic_games import describe, roster, synthetic_play_by_play, synthetic_season
+
+
+def test_same_seed_same_game():
+    first = synthetic_play_by_play(717465)
+    assert json.dumps(first) == json.dumps(synthetic_play_by_play(717465))
+
+
+def test_different_seeds_differ():
+    assert synthetic_play_by_play(1)['allPlays'] != synthetic_play_by_play(2)['allPlays']
+
+
+def test_game_shape_follows_the_options():
+    summary = describe(synthetic_play_by_play(5, innings=25))
+    assert summary['innings'] == 25
+    assert summary['pitches'] >= summary['plays'] >= 25 * 2 * 3
+
+
+def test_no_scoring_is_a_shutout():
+    game = synthetic_play_by_play(9, scoring=0)
+    assert game['scoringPlays'] == []
+    assert describe(game)['away_score'] == describe(game)['home_score'] == 0
+
+
+def test_games_parse_into_pitches():
+    game = synthetic_play_by_play(3, innings=2)
+    assert len(parse_play_by_play(game)) == describe(game)['pitches']
+
+
+def test_rosters_are_seeded_and_distinct():
+    team = roster("seed-Team 01")
+    assert team == roster("seed-Team 01")
+    players = team['lineup'] + team['starters'] + team['relievers']
+    assert len(set(players)) == len(players)
+
+
+def test_same_seed_same_season():
+    first = list(itertools.islice(synthetic_season(42, games=5, innings=3), 5))
+    again = list(itertools.islice(synthetic_season(42, games=5, innings=3), 5))
+    assert json.dumps(first) == json.dumps(again)
+    assert [game['game_pk'] for game in first] == list(range(900001, 900006))
+    assert all(game['away_team'] != game['home_team'] for game in first)
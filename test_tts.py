@@ -1,31 +1,20 @@
 #!/usr/bin/env python3
 
-import os
-from openai import OpenAI
+from tts_backends import get_tts_backend
 
 def text_to_speech(text, output_file="broadcast_audio.mp3"):
-    """Convert text to speech using OpenAI TTS API"""
+    """Convert text to speech using the configured TTS backend"""
     
-    # Check for API key
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("Error: OPENAI_API_KEY environment variable not set")
-        print("Please set your OpenAI API key:")
-        print("export OPENAI_API_KEY='your-api-key-here'")
+    # Standard model at the API's default speed
+    backend = get_tts_backend(model="tts-1", speed=None)
+    if backend is None:
         return False
     
     try:
-        client = OpenAI(api_key=api_key)
-        
         print("Generating speech audio...")
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="onyx",  # Deep, calm voice good for bedtime
-            input=text
-        )
         
         # Save audio file
-        response.stream_to_file(output_file)
+        backend.stream_to_file(text, output_file)
         print(f"Audio saved to {output_file}")
         return True
         
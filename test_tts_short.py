@@ -4,103 +4,33 @@ Test OpenAI TTS with a short broadcast script (1-2 innings only)
 This limits the cost to just a few cents for testing
 """
 
-import os
-from openai import OpenAI
 from fetch_game_data import get_recent_games, get_game_pitch_data, get_key_innings_from_scoring
 from generate_broadcast import generate_broadcast_script
+from mp3_frames import stitch_mp3
+from tts_backends import MAX_CHARS, get_tts_backend, split_text_into_chunks, synthesize_chunks
 
 def text_to_speech(text, output_file="test_broadcast_short.mp3"):
-    """Convert text to speech using OpenAI TTS API (handles 4096 char limit)"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("Error: OPENAI_API_KEY environment variable not set")
-        print("Please set your OpenAI API key:")
-        print("export OPENAI_API_KEY='your-api-key-here'")
+    """Convert text to speech using the configured TTS backend (handles 4096 char limit)"""
+    backend = get_tts_backend()
+    if backend is None:
         return False
 
     try:
-        client = OpenAI(api_key=api_key)
-
         print("Generating speech audio...")
         print(f"Script length: {len(text)} characters")
         estimated_cost = (len(text) / 1000) * 0.015
         print(f"Estimated cost: ${estimated_cost:.4f}")
 
-        # OpenAI TTS limit is 4096 characters per request
-        MAX_CHARS = 4000  # Leave some buffer
-
-        # Split text into chunks if needed
-        if len(text) <= MAX_CHARS:
-            # Single request
-            print("Generating audio (single chunk)...")
-            response = client.audio.speech.create(
-                model="tts-1-hd",  # HD model for better prosody
-                voice="onyx",
-                speed=0.95,  # Slightly slower for natural, clear pacing
-                input=text
-            )
-            response.stream_to_file(output_file)
-        else:
-            # Multiple chunks needed
-            import re
-
-            # Split on double newlines (inning boundaries) to keep context
-            chunks = []
-            current_chunk = ""
-
-            paragraphs = text.split('\n\n')
-
-            for para in paragraphs:
-                if len(current_chunk) + len(para) + 2 <= MAX_CHARS:
-                    current_chunk += para + '\n\n'
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = para + '\n\n'
-
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-
-            print(f"Splitting into {len(chunks)} chunks...")
-
-            # Generate audio for each chunk
-            temp_files = []
-            for i, chunk in enumerate(chunks):
-                print(f"  Generating chunk {i+1}/{len(chunks)} ({len(chunk)} chars)...")
-                temp_file = f"temp_chunk_{i}.mp3"
-
-                response = client.audio.speech.create(
-                    model="tts-1-hd",  # HD model for better prosody
-                    voice="onyx",
-                    speed=0.95,  # Slightly slower for natural, clear pacing
-                    input=chunk
-                )
-                response.stream_to_file(temp_file)
-                temp_files.append(temp_file)
-
-            # Combine audio files using pydub
-            print("Combining audio chunks...")
-            try:
-                from pydub import AudioSegment
-
-                combined = AudioSegment.empty()
-                for temp_file in temp_files:
-                    audio = AudioSegment.from_mp3(temp_file)
-                    combined += audio
-
-                combined.export(output_file, format="mp3")
-
-                # Clean up temp files
-                import os as os_module
-                for temp_file in temp_files:
-                    os_module.remove(temp_file)
-
-            except ImportError:
-                print("\n⚠️  Warning: pydub not installed. Saving chunks separately.")
-                print("To combine, install: pip install pydub")
-                print(f"Chunk files: {', '.join(temp_files)}")
-                print(f"\nYou can play them in order, or install pydub to combine.")
-                return True
+        # Split on double newlines (inning boundaries) to keep context,
+        # within OpenAI's 4096 character limit per request
+        chunks = split_text_into_chunks(text, MAX_CHARS)
+        print(f"Generating audio ({len(chunks)} chunk{'s' if len(chunks) > 1 else ''})...")
+
+        # MP3 chunks stay in memory and are stitched frame by frame -
+        # no temp files, no decode and no re-encode
+        mp3_chunks = synthesize_chunks(backend, chunks, response_format="mp3")
+        with open(output_file, 'wb') as f:
+            f.write(stitch_mp3(mp3_chunks))
 
         print(f"✅ Audio saved to {output_file}")
         return True
@@ -3,33 +3,23 @@
 Ultra-short TTS test - just TOP of inning 3 only (30 seconds test!)
 """
 
-import os
-from openai import OpenAI
 from fetch_game_data import get_recent_games, get_game_pitch_data, get_key_innings_from_scoring
 from generate_broadcast import generate_broadcast_script
+from tts_backends import get_tts_backend
 
 def text_to_speech(text, output_file="test_broadcast_ultra_short.mp3"):
-    """Convert text to speech using OpenAI TTS API"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("Error: OPENAI_API_KEY environment variable not set")
+    """Convert text to speech using the configured TTS backend"""
+    backend = get_tts_backend()
+    if backend is None:
         return False
 
     try:
-        client = OpenAI(api_key=api_key)
-
         print("Generating speech audio...")
         print(f"Script length: {len(text)} characters")
         estimated_cost = (len(text) / 1000) * 0.015
         print(f"Estimated cost: ${estimated_cost:.4f}")
 
-        response = client.audio.speech.create(
-            model="tts-1-hd",  # HD model for better prosody and naturalness
-            voice="onyx",
-            speed=0.95,  # Slightly slower for clear, natural pacing
-            input=text
-        )
-        response.stream_to_file(output_file)
+        backend.stream_to_file(text, output_file)
         print(f"✅ Audio saved to {output_file}")
         return True
 
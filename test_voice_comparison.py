@@ -4,29 +4,19 @@ Test TTS with different voices for comparison
 Generates 3 ultra-short test files with onyx, fable, and echo voices
 """
 
-import os
-from openai import OpenAI
 from fetch_game_data import get_recent_games, get_game_pitch_data
 from generate_broadcast import generate_broadcast_script
+from tts_backends import get_tts_backend
 
-def text_to_speech_with_voice(text, voice_name, output_file):
+def text_to_speech_with_voice(text, voice_name, output_file, backend=None):
     """Convert text to speech using specified voice"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print(f"Error: OPENAI_API_KEY environment variable not set")
+    backend = backend or get_tts_backend()
+    if backend is None:
         return False
 
     try:
-        client = OpenAI(api_key=api_key)
-
         print(f"  Generating with {voice_name} voice...")
-        response = client.audio.speech.create(
-            model="tts-1-hd",  # HD model for better prosody and naturalness
-            voice=voice_name,
-            speed=0.95,  # Slightly slower for clear, natural pacing
-            input=text
-        )
-        response.stream_to_file(output_file)
+        backend.stream_to_file(text, output_file, voice=voice_name)
         print(f"  ✅ Saved to {output_file}")
         return True
 
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Text-to-speech backends for baseball broadcasts
+One interface for turning script text into audio, with an OpenAI implementation
+and a local, network-free engine for load tests and benchmarks without API keys
+"""
+
+import contextlib
+import io
+import math
+import os
+import random
+import re
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import wave
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import bind, count, span
+from single_flight import flight
+
+DEFAULT_MODEL = "tts-1-hd"  # HD model for better prosody and naturalness
+DEFAULT_VOICE = "onyx"      # Deep, calm voice for baseball broadcasting
+DEFAULT_SPEED = 0.95        # Slightly slower for clear, natural pacing
+
+# OpenAI returns raw PCM as 24 kHz, 16-bit, mono - the local engine matches it
+PCM_SAMPLE_RATE = 24000
+PCM_SAMPLE_WIDTH = 2
+PCM_CHANNELS = 1
+
+# OpenAI TTS limit is 4096 characters per request
+MAX_CHARS = 4000  # Leave some buffer
+
+# HTTP statuses worth retrying: rate limits and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Script tokens: words, and the punctuation a narrator pauses at
+SCRIPT_TOKEN_RE = re.compile(r"\.\.\.|\n\n|[A-Za-z0-9'À-ɏ]+|[,;:—.?!]")
+_VOWEL_GROUPS_RE = re.compile(r"[aeiouy]+")
+
+
+class TTSBackend:
+    """Base class for text-to-speech engines"""
+
+    name = "base"
+    billable = False    # Requests cost money (traced as characters_billed)
+
+    def __init__(self, model=DEFAULT_MODEL, voice=DEFAULT_VOICE, speed=DEFAULT_SPEED):
+        """
+        Args:
+            model: TTS model name
+            voice: Default voice for requests that don't specify one
+            speed: Default speaking speed (None lets the engine decide)
+        """
+        self.model = model
+        self.voice = voice
+        self.speed = speed
+
+    def synthesize(self, text, voice=None, speed=None, response_format="mp3"):
+        """
+        Convert text to audio bytes
+
+        Args:
+            text: Text to speak
+            voice: Voice name (defaults to the backend's voice)
+            speed: Speaking speed (defaults to the backend's speed)
+            response_format: "mp3", "wav" or "pcm"
+
+        Returns:
+            bytes of encoded audio
+        """
+        raise NotImplementedError
+
+    def iter_audio(self, text, voice=None, speed=None, response_format="mp3"):
+        """
+        Yield encoded audio bytes as they are produced
+
+        Engines that can't stream yield the whole result at once.
+        """
+        yield self.synthesize(text, voice=voice, speed=speed, response_format=response_format)
+
+    def stream_to_file(self, text, output_file, voice=None, speed=None):
+        """Synthesize text and save it, picking the format from the file extension"""
+        response_format = os.path.splitext(output_file)[1].lstrip('.').lower() or "mp3"
+        audio = self.synthesize(text, voice=voice, speed=speed, response_format=response_format)
+        with open(output_file, 'wb') as f:
+            f.write(audio)
+        return output_file
+
+
+class OpenAITTSBackend(TTSBackend):
+    """OpenAI speech endpoint (`audio.speech.create`)"""
+
+    name = "openai"
+    billable = True
+
+    def __init__(self, api_key=None, base_url=None, max_retries=None, **kwargs):
+        """
+        Args:
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY)
+            base_url: Alternative endpoint (defaults to OPENAI_BASE_URL or api.openai.com)
+            max_retries: Retries inside the OpenAI client (None keeps the SDK default;
+                use 0 when synthesize_chunks handles retries)
+            **kwargs: model, voice and speed defaults
+        """
+        super().__init__(**kwargs)
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.base_url = base_url or os.getenv('OPENAI_BASE_URL')
+        self.max_retries = max_retries
+        self._client = None
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use and reused for every request"""
+        if self._client is None:
+            from openai import OpenAI
+            options = {'api_key': self.api_key, 'base_url': self.base_url}
+            if self.max_retries is not None:
+                options['max_retries'] = self.max_retries
+            self._client = OpenAI(**options)
+        return self._client
+
+    def _request_params(self, text, voice, speed, response_format):
+        params = {
+            'model': self.model,
+            'voice': voice or self.voice,
+            'input': text,
+            'response_format': response_format,
+        }
+        speed = speed if speed is not None else self.speed
+        if speed is not None:
+            params['speed'] = speed
+        return params
+
+    def synthesize(self, text, voice=None, speed=None, response_format="mp3"):
+        response = self.client.audio.speech.create(
+            **self._request_params(text, voice, speed, response_format)
+        )
+        return response.content
+
+    def iter_audio(self, text, voice=None, speed=None, response_format="mp3", chunk_size=16384):
+        with self.client.audio.speech.with_streaming_response.create(
+            **self._request_params(text, voice, speed, response_format)
+        ) as response:
+            for data in response.iter_bytes(chunk_size):
+                yield data
+
+    def stream_to_file(self, text, output_file, voice=None, speed=None):
+        response_format = os.path.splitext(output_file)[1].lstrip('.').lower() or "mp3"
+        response = self.client.audio.speech.create(
+            **self._request_params(text, voice, speed, response_format)
+        )
+        response.stream_to_file(output_file)
+        return output_file
+
+
+class LocalTTSBackend(TTSBackend):
+    """
+    Deterministic, network-free speech stand-in
+
+    Renders each word as a short voiced tone and each punctuation mark as a pause,
+    paced like a broadcaster (~150 words per minute at speed 1.0). The same text
+    always produces the same bytes, so audio length and timing are realistic
+    enough to load-test and benchmark the whole pipeline on CI machines.
+
+    MP3 output is the same tones encoded with ffmpeg; without ffmpeg it falls
+    back to silent frames of the right duration (with a warning).
+    """
+
+    name = "local"
+
+    SYLLABLE_MS = 140   # One voiced syllable
+    WORD_GAP_MS = 50    # Gap between words
+    PAUSE_MS = {        # Pauses after punctuation
+        ',': 220,
+        ';': 300,
+        ':': 300,
+        '—': 250,
+        '.': 450,
+        '?': 450,
+        '!': 450,
+        '...': 650,
+        '\n\n': 800,
+    }
+    PITCHES_HZ = (98, 110, 123, 131, 147)  # Low, calm speaking range
+
+
+    def __init__(self, sample_rate=PCM_SAMPLE_RATE, **kwargs):
+        super().__init__(**kwargs)
+        self.sample_rate = sample_rate
+        self._syllables = {}
+        self._warned_silent = False
+
+    def _frames(self, ms, speed):
+        return int(self.sample_rate * ms / 1000.0 / speed)
+
+    def _syllable(self, pitch_hz, speed):
+        """One enveloped tone burst, cached per pitch and speed"""
+        key = (pitch_hz, speed)
+        if key not in self._syllables:
+            frames = self._frames(self.SYLLABLE_MS, speed)
+            samples = []
+            for n in range(frames):
+                t = n / self.sample_rate
+                envelope = math.sin(math.pi * n / frames)  # Soft attack and release
+                value = (0.6 * math.sin(2 * math.pi * pitch_hz * t)
+                         + 0.3 * math.sin(4 * math.pi * pitch_hz * t)
+                         + 0.1 * math.sin(6 * math.pi * pitch_hz * t))
+                samples.append(int(6000 * envelope * value))
+            self._syllables[key] = struct.pack(f'<{frames}h', *samples)
+        return self._syllables[key]
+
+    def render_pcm(self, text, voice=None, speed=None):
+        """Render text to raw 16-bit mono PCM"""
+        speed = speed if speed is not None else (self.speed or 1.0)
+        voice_offset = zlib.crc32((voice or self.voice).encode()) % len(self.PITCHES_HZ)
+        word_gap = b'\x00\x00' * self._frames(self.WORD_GAP_MS, speed)
+
+        parts = []
+        for token in SCRIPT_TOKEN_RE.findall(text):
+            if token in self.PAUSE_MS:
+                parts.append(b'\x00\x00' * self._frames(self.PAUSE_MS[token], speed))
+                continue
+            # Deterministic intonation: pitch depends only on the word and voice
+            pitch_index = (zlib.crc32(token.lower().encode()) + voice_offset) % len(self.PITCHES_HZ)
+            syllable = self._syllable(self.PITCHES_HZ[pitch_index], speed)
+            parts.append(syllable * count_syllables(token))
+            parts.append(word_gap)
+        return b''.join(parts)
+
+    def synthesize(self, text, voice=None, speed=None, response_format="mp3"):
+        pcm = self.render_pcm(text, voice=voice, speed=speed)
+        if response_format == "pcm":
+            return pcm
+        if response_format == "wav":
+            return pcm_to_wav(pcm, self.sample_rate)
+        if response_format == "mp3":
+            audio = encode_mp3(pcm, self.sample_rate)
+            if audio is not None:
+                return audio
+            if not self._warned_silent:
+                self._warned_silent = True
+                print("⚠️  ffmpeg not found: the local TTS engine's MP3 output is SILENT "
+                      "(right duration, no tones). Install ffmpeg, or request wav or pcm to hear it")
+            return silent_mp3(len(pcm) // PCM_SAMPLE_WIDTH, self.sample_rate)
+        raise ValueError(f"Local TTS backend does not support '{response_format}' output")
+
+    def iter_audio(self, text, voice=None, speed=None, response_format="mp3", chunk_size=16384):
+        audio = self.synthesize(text, voice=voice, speed=speed, response_format=response_format)
+        for offset in range(0, len(audio), chunk_size):
+            yield audio[offset:offset + chunk_size]
+
+
+def count_syllables(word):
+    """Rough syllable count of a word: its vowel groups, at least one"""
+    return max(1, len(_VOWEL_GROUPS_RE.findall(word.lower())))
+
+
+def pcm_to_wav(pcm, sample_rate=PCM_SAMPLE_RATE, channels=PCM_CHANNELS, sample_width=PCM_SAMPLE_WIDTH):
+    """Wrap raw PCM bytes in a WAV container"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def audio_segment_from_bytes(audio, response_format="pcm", sample_rate=PCM_SAMPLE_RATE):
+    """
+    Load synthesized audio straight from memory as a pydub AudioSegment
+
+    Raw PCM needs no decoding at all; WAV is parsed in-process; MP3 is decoded
+    from the buffer without a temp file.
+    """
+    from pydub import AudioSegment
+
+    if response_format == "pcm":
+        return AudioSegment(data=audio, sample_width=PCM_SAMPLE_WIDTH,
+                            frame_rate=sample_rate, channels=PCM_CHANNELS)
+    return AudioSegment.from_file(io.BytesIO(audio), format=response_format)
+
+
+def synthesize_segment(backend, text, response_format="pcm", **kwargs):
+    """
+    Synthesize text and return it as an in-memory AudioSegment
+
+    Requests raw PCM by default so the mixer gets samples with no disk round trip
+    and no MP3 encode/decode cycle.
+    """
+    audio = backend.synthesize(text, response_format=response_format, **kwargs)
+    return audio_segment_from_bytes(audio, response_format)
+
+
+def encode_mp3(pcm, sample_rate=PCM_SAMPLE_RATE, bitrate="48k"):
+    """
+    Encode 16-bit mono PCM to a bare MP3 stream (no ID3 tag or Xing/Info frame) with ffmpeg
+
+    Returns:
+        MP3 bytes, or None if ffmpeg is not installed
+    """
+    if shutil.which('ffmpeg') is None:
+        return None
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 's16le', '-ar', str(sample_rate),
+         '-ac', str(PCM_CHANNELS), '-i', 'pipe:0', '-map_metadata', '-1', '-bitexact',
+         '-b:a', bitrate, '-id3v2_version', '0', '-write_xing', '0', '-f', 'mp3', 'pipe:1'],
+        input=pcm, capture_output=True, check=True
+    )
+    return result.stdout
+
+
+def silent_mp3(num_samples, sample_rate=PCM_SAMPLE_RATE):
+    """
+    Build a constant-bitrate MP3 stream of silence lasting num_samples
+
+    The local engine's MP3 fallback when ffmpeg is missing: it keeps the duration
+    of the spoken text but carries silent frames (MPEG-2 Layer III, mono, 48 kbps).
+    """
+    sample_rate_index = {22050: 0, 24000: 1, 16000: 2}[sample_rate]
+    bitrate_kbps = 48
+    header = struct.pack('>I', (
+        0xFFE00000                   # Frame sync
+        | (0b10 << 19)               # MPEG-2
+        | (0b01 << 17)               # Layer III
+        | (1 << 16)                  # No CRC
+        | (6 << 12)                  # 48 kbps
+        | (sample_rate_index << 10)
+        | (0b11 << 6)                # Mono
+    ))
+    frame_size = 72 * bitrate_kbps * 1000 // sample_rate
+    frame = header + b'\x00' * (frame_size - len(header))
+    samples_per_frame = 576
+    return frame * -(-num_samples // samples_per_frame)
+
+
+class SynthesisStats:
+    """Thread-safe counters for chunked synthesis (latency, retries, failures)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies_ms = []  # One entry per chunk, including time spent retrying
+        self.characters = 0
+        self.retries = 0
+        self.failures = 0
+
+    def record_success(self, latency_ms, characters):
+        with self._lock:
+            self.latencies_ms.append(latency_ms)
+            self.characters += characters
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def percentile(self, pct):
+        """Latency percentile in ms (nearest-rank), or 0 with no samples"""
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        rank = max(1, int(round(pct / 100.0 * len(ordered))))
+        return ordered[min(rank, len(ordered)) - 1]
+
+
+def split_text_into_chunks(text, max_chars=MAX_CHARS):
+    """
+    Split text into request-sized chunks
+
+    Splits on double newlines (inning boundaries) to keep context, falling back
+    to sentence boundaries for a paragraph that is longer than max_chars on its own.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    current_chunk = ""
+
+    paragraphs = []
+    for para in text.split('\n\n'):
+        if len(para) <= max_chars:
+            paragraphs.append(para)
+        else:
+            sentence = ""
+            for piece in re.split(r'(?<=[.!?])\s+', para):
+                if sentence and len(sentence) + len(piece) + 1 > max_chars:
+                    paragraphs.append(sentence)
+                    sentence = ""
+                sentence = f"{sentence} {piece}" if sentence else piece
+            if sentence:
+                paragraphs.append(sentence)
+
+    for para in paragraphs:
+        if len(current_chunk) + len(para) + 2 <= max_chars:
+            current_chunk += para + '\n\n'
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = para + '\n\n'
+
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+
+    return chunks
+
+
+def is_retryable_error(error):
+    """True for rate limits, transient server errors and dropped connections"""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError', 'ConnectionError', 'TimeoutError')
+
+
+def retry_delay(error, attempt, backoff_s=0.5):
+    """
+    Seconds to wait before retry number `attempt` (1-based)
+
+    Uses the server's Retry-After header when given, otherwise exponential backoff.
+    Jitter keeps throttled workers from retrying in lockstep.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        delay = float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        delay = backoff_s * 2 ** (attempt - 1)
+    return delay * random.uniform(1.0, 1.5)
+
+
+@contextlib.contextmanager
+def request_span(backend, text, voice=None):
+    """span('tts.request') for one chunk's request, retries included, recording the bytes sent"""
+    with span('tts.request', backend=backend.name, voice=voice or backend.voice) as request:
+        request.add('bytes_out', len(text.encode()))
+        yield request
+
+
+def record_response(request, backend, text, received, retries):
+    """Record a chunk's successful response on its request_span: bytes received, retries, characters billed"""
+    request.set(retries=retries)
+    request.add('bytes_in', received)
+    if backend.billable:
+        request.add('characters_billed', len(text))
+
+
+def synthesize_with_retry(backend, text, max_retries=3, backoff_s=0.5, stats=None, **kwargs):
+    """
+    Synthesize one chunk, retrying rate limits and transient failures
+
+    Waits for the server's Retry-After when given, otherwise backs off exponentially,
+    with jitter so concurrent workers spread out their retries.
+
+    Args:
+        backend: TTSBackend to call
+        text: Chunk text
+        max_retries: Retries after the first attempt
+        backoff_s: First backoff delay (doubles on each retry)
+        stats: Optional SynthesisStats to record into
+        **kwargs: Passed to backend.synthesize (voice, speed, response_format)
+
+    Returns:
+        bytes of encoded audio
+    """
+    attempt = 0
+    start = time.perf_counter()
+    with request_span(backend, text, kwargs.get('voice')) as request:
+        while True:
+            try:
+                audio = backend.synthesize(text, **kwargs)
+                if stats is not None:
+                    stats.record_success((time.perf_counter() - start) * 1000, len(text))
+                record_response(request, backend, text, len(audio), attempt)
+                return audio
+            except Exception as e:
+                if attempt >= max_retries or not is_retryable_error(e):
+                    if stats is not None:
+                        stats.record_failure()
+                    raise
+                attempt += 1
+                if stats is not None:
+                    stats.record_retry()
+                time.sleep(retry_delay(e, attempt, backoff_s))
+
+
+def synthesis_key(backend, text, voice=None, speed=None, response_format="mp3"):
+    """Identity of a synthesis request: equal keys give the same audio"""
+    return (backend.name, getattr(backend, 'base_url', None), backend.model, voice or backend.voice,
+            speed if speed is not None else backend.speed, response_format, text)
+
+
+def synthesize_chunks(backend, chunks, max_workers=4, max_retries=3, backoff_s=0.5, stats=None, **kwargs):
+    """
+    Synthesize chunks concurrently, returning their audio in chunk order
+
+    Args:
+        backend: TTSBackend to call
+        chunks: List of chunk texts
+        max_workers: Concurrent requests in flight
+        max_retries: Retries per chunk (see synthesize_with_retry)
+        backoff_s: First backoff delay
+        stats: Optional SynthesisStats to record into
+        **kwargs: Passed to backend.synthesize (voice, speed, response_format)
+
+    A chunk that another job in the process is already synthesizing with the
+    same voice, speed and format waits for that request instead of repeating it.
+
+    Returns:
+        List of audio bytes, one per chunk
+    """
+    def synthesize_one(chunk):
+        start = time.perf_counter()
+        audio, shared = flight('tts').do(synthesis_key(backend, chunk, **kwargs), synthesize_with_retry,
+                                         backend, chunk, max_retries=max_retries, backoff_s=backoff_s,
+                                         stats=stats, **kwargs)
+        if shared:
+            count('shared')
+            if stats is not None:
+                stats.record_success((time.perf_counter() - start) * 1000, len(chunk))
+        return audio
+
+    with span('tts.synthesize', chunks=len(chunks)):
+        if max_workers <= 1 or len(chunks) <= 1:
+            return [synthesize_one(chunk) for chunk in chunks]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(bind(synthesize_one), chunks))
+
+
+def get_tts_backend(name=None, **kwargs):
+    """
+    Create the configured TTS backend
+
+    Args:
+        name: "openai" or "local" (defaults to the TTS_BACKEND environment variable, then "openai")
+        **kwargs: Passed to the backend (model, voice, speed, ...)
+
+    Returns:
+        TTSBackend, or None if the backend cannot be used (e.g. missing API key)
+    """
+    name = (name or os.getenv('TTS_BACKEND') or "openai").lower()
+
+    if name == "local":
+        return LocalTTSBackend(**kwargs)
+
+    if name == "openai":
+        backend = OpenAITTSBackend(**kwargs)
+        if not backend.api_key:
+            print("Error: OPENAI_API_KEY environment variable not set")
+            print("Please set your OpenAI API key:")
+            print("export OPENAI_API_KEY='your-api-key-here'")
+            print("Or run offline with: export TTS_BACKEND=local")
+            return None
+        return backend
+
+    print(f"Error: unknown TTS backend '{name}' (choose 'openai' or 'local')")
+    return None
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Load test for chunked speech synthesis
+Runs the full text_to_speech path against the local stand-in TTS server for a sweep
+of concurrency and retry settings, reporting throughput, p50/p99 chunk latency and
+error recovery - so the fastest safe settings can be found without spending money
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from baseball_broadcast_ai import text_to_speech
+from tts_backends import OpenAITTSBackend, SynthesisStats, split_text_into_chunks
+from tts_server import StandInTTSServer
+
+DEFAULT_SCRIPT = "Los_Angeles_Dodgers_vs_Toronto_Blue_Jays_script.txt"
+
+
+def run_once(server, script, workers, retries, max_chars, output_dir):
+    """Synthesize the script once and return a result row"""
+    # Our retry layer is what's being tuned, so the SDK must not retry on its own
+    backend = OpenAITTSBackend(api_key="stand-in", base_url=server.url, max_retries=0)
+    stats = SynthesisStats()
+    before = dict(server.counters)
+
+    output_file = os.path.join(output_dir, f"load_test_w{workers}_r{retries}.mp3")
+    start = time.perf_counter()
+    ok = text_to_speech(script, output_file, backend=backend, max_workers=workers,
+                        max_retries=retries, max_chars=max_chars, stats=stats)
+    elapsed = time.perf_counter() - start
+
+    chunks = len(split_text_into_chunks(script, max_chars))
+    throttled = ((server.counters['rate_limited'] - before['rate_limited'])
+                 + (server.counters['over_capacity'] - before['over_capacity']))
+    return {
+        'workers': workers,
+        'retries': retries,
+        'ok': ok,
+        'seconds': elapsed,
+        'chunks_per_s': chunks / elapsed if ok else 0.0,
+        'chars_per_s': stats.characters / elapsed,
+        'p50_ms': stats.percentile(50),
+        'p99_ms': stats.percentile(99),
+        'retried': stats.retries,
+        'failed': stats.failures,
+        'throttled': throttled,
+        'server_errors': server.counters['server_errors'] - before['server_errors'],
+    }
+
+
+def print_report(rows):
+    print("\n" + "=" * 96)
+    print(f"{'workers':>7} {'retries':>7} {'result':>7} {'time s':>8} {'chunk/s':>8} {'char/s':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'retried':>7} {'429s':>5} {'5xx':>5}")
+    print("-" * 96)
+    for row in rows:
+        print(f"{row['workers']:>7} {row['retries']:>7} {'ok' if row['ok'] else 'FAIL':>7} "
+              f"{row['seconds']:>8.2f} {row['chunks_per_s']:>8.2f} {row['chars_per_s']:>9.0f} "
+              f"{row['p50_ms']:>8.0f} {row['p99_ms']:>8.0f} {row['retried']:>7} "
+              f"{row['throttled']:>5} {row['server_errors']:>5}")
+    print("=" * 96)
+
+    successful = [row for row in rows if row['ok']]
+    if successful:
+        best = min(successful, key=lambda row: row['seconds'])
+        print(f"🏁 Fastest safe setting: max_workers={best['workers']}, max_retries={best['retries']} "
+              f"({best['seconds']:.2f}s)")
+    else:
+        print("❌ No setting completed - raise retries or lower concurrency")
+
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test text_to_speech against the stand-in TTS server")
+    parser.add_argument('--script', default=DEFAULT_SCRIPT, help="Script text file to synthesize")
+    parser.add_argument('--workers', type=parse_int_list, default=[1, 2, 4, 8],
+                        help="Comma-separated concurrency levels to sweep")
+    parser.add_argument('--retries', type=parse_int_list, default=[3],
+                        help="Comma-separated retry counts to sweep")
+    parser.add_argument('--max-chars', type=int, default=1000, help="Characters per TTS request")
+    parser.add_argument('--base-latency-ms', type=float, default=200)
+    parser.add_argument('--latency-ms-per-char', type=float, default=0.5)
+    parser.add_argument('--rate-limit-rps', type=float, default=None)
+    parser.add_argument('--rate-limit-burst', type=int, default=5)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--max-concurrent', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    with open(args.script) as f:
+        script = f.read()
+
+    server = StandInTTSServer(
+        ('127.0.0.1', 0),
+        base_latency_ms=args.base_latency_ms,
+        latency_ms_per_char=args.latency_ms_per_char,
+        rate_limit_rps=args.rate_limit_rps,
+        rate_limit_burst=args.rate_limit_burst,
+        error_rate=args.error_rate,
+        max_concurrent=args.max_concurrent,
+        seed=args.seed
+    )
+    server.start_in_background()
+
+    print("🎙️  TTS Load Test")
+    print("=" * 60)
+    print(f"Server: {server.url}")
+    print(f"Script: {args.script} ({len(script)} chars, "
+          f"{len(split_text_into_chunks(script, args.max_chars))} chunks of ≤{args.max_chars})")
+
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            for retries in args.retries:
+                for workers in args.workers:
+                    print(f"\n▶️  max_workers={workers}, max_retries={retries}")
+                    rows.append(run_once(server, script, workers, retries, args.max_chars, output_dir))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI speech endpoint
+Serves POST /v1/audio/speech with the local TTS engine, adding configurable latency,
+429 rate limiting, random 5xx errors and a concurrent connection cap so synthesis
+concurrency and retry settings can be tuned without spending money
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tts_backends import LocalTTSBackend
+
+CONTENT_TYPES = {
+    'mp3': 'audio/mpeg',
+    'wav': 'audio/wav',
+    'pcm': 'audio/pcm',
+}
+
+
+class TokenBucket:
+    """Requests-per-second limiter with a small burst allowance"""
+
+    def __init__(self, rate_per_s, burst):
+        self.rate_per_s = rate_per_s
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token, or return seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_s)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate_per_s
+
+
+class StandInTTSServer(ThreadingHTTPServer):
+    """HTTP server that behaves like a slow, throttled, occasionally failing TTS API"""
+
+    daemon_threads = True
+
+    def __init__(self, address, base_latency_ms=200, latency_ms_per_char=0.5,
+                 rate_limit_rps=None, rate_limit_burst=5, error_rate=0.0,
+                 max_concurrent=None, seed=None):
+        """
+        Args:
+            address: (host, port) to bind; port 0 picks a free port
+            base_latency_ms: Fixed latency per request
+            latency_ms_per_char: Extra latency per input character
+            rate_limit_rps: Requests per second before answering 429 (None = unlimited)
+            rate_limit_burst: Requests allowed back to back before throttling starts
+            error_rate: Fraction of requests answered with a random 5xx
+            max_concurrent: Requests in flight before answering 429 (None = unlimited)
+            seed: Seed for the error generator, for reproducible runs
+        """
+        super().__init__(address, SpeechRequestHandler)
+        self.base_latency_ms = base_latency_ms
+        self.latency_ms_per_char = latency_ms_per_char
+        self.rate_limiter = TokenBucket(rate_limit_rps, rate_limit_burst) if rate_limit_rps else None
+        self.error_rate = error_rate
+        self.slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self.engine = LocalTTSBackend()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {
+            'requests': 0,
+            'ok': 0,
+            'rate_limited': 0,
+            'over_capacity': 0,
+            'server_errors': 0,
+            'bad_requests': 0,
+            'characters': 0,
+        }
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def roll_error(self):
+        """Pick a 5xx status for this request, or None"""
+        with self._lock:
+            if self._random.random() < self.error_rate:
+                return self._random.choice([500, 502, 503])
+        return None
+
+    def start_in_background(self):
+        """Serve from a daemon thread and return the thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class SpeechRequestHandler(BaseHTTPRequestHandler):
+    """Handles the OpenAI-compatible speech route plus a /stats page"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep load-test output readable
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, error_type, headers=None):
+        self._send_json(status, {'error': {'message': message, 'type': error_type}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with self.server._lock:
+                counters = dict(self.server.counters)
+            self._send_json(200, counters)
+        else:
+            self._send_error(404, f"Unknown route {self.path}", 'invalid_request_error')
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        raw_body = self.rfile.read(length)
+
+        if self.path.rstrip('/') != '/v1/audio/speech':
+            self._send_error(404, f"Unknown route {self.path}", 'invalid_request_error')
+            return
+
+        server.count('requests')
+
+        try:
+            request = json.loads(raw_body or b'{}')
+            text = request['input']
+        except (ValueError, KeyError):
+            server.count('bad_requests')
+            self._send_error(400, "Request must be JSON with an 'input' field", 'invalid_request_error')
+            return
+
+        if len(text) > 4096:
+            server.count('bad_requests')
+            self._send_error(400, "Input is longer than 4096 characters", 'invalid_request_error')
+            return
+
+        response_format = request.get('response_format', 'mp3')
+        if response_format not in CONTENT_TYPES:
+            server.count('bad_requests')
+            self._send_error(400, f"Unsupported response_format '{response_format}'", 'invalid_request_error')
+            return
+
+        if server.slots is not None and not server.slots.acquire(blocking=False):
+            server.count('over_capacity')
+            self._send_error(429, "Too many concurrent requests", 'rate_limit_error', {'Retry-After': '0.2'})
+            return
+
+        try:
+            if server.rate_limiter is not None:
+                wait_s = server.rate_limiter.try_acquire()
+                if wait_s:
+                    server.count('rate_limited')
+                    self._send_error(429, "Rate limit reached for requests", 'rate_limit_error',
+                                     {'Retry-After': f"{wait_s:.3f}"})
+                    return
+
+            # Simulated synthesis time grows with the text, like the real API
+            time.sleep((server.base_latency_ms + server.latency_ms_per_char * len(text)) / 1000.0)
+
+            status = server.roll_error()
+            if status:
+                server.count('server_errors')
+                self._send_error(status, "The server had an error while processing your request", 'server_error')
+                return
+
+            audio = server.engine.synthesize(
+                text,
+                voice=request.get('voice'),
+                speed=request.get('speed'),
+                response_format=response_format
+            )
+            server.count('ok')
+            server.count('characters', len(text))
+
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPES[response_format])
+            self.send_header('Content-Length', str(len(audio)))
+            self.end_headers()
+            self.wfile.write(audio)
+        finally:
+            if server.slots is not None:
+                server.slots.release()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI speech endpoint")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--base-latency-ms', type=float, default=200)
+    parser.add_argument('--latency-ms-per-char', type=float, default=0.5)
+    parser.add_argument('--rate-limit-rps', type=float, default=None)
+    parser.add_argument('--rate-limit-burst', type=int, default=5)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-concurrent', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    return parser
+
+
+def main():
+    args = build_arg_parser().parse_args()
+    server = StandInTTSServer(
+        (args.host, args.port),
+        base_latency_ms=args.base_latency_ms,
+        latency_ms_per_char=args.latency_ms_per_char,
+        rate_limit_rps=args.rate_limit_rps,
+        rate_limit_burst=args.rate_limit_burst,
+        error_rate=args.error_rate,
+        max_concurrent=args.max_concurrent,
+        seed=args.seed
+    )
+    print(f"🎙️  Stand-in TTS server listening on {server.url}")
+    print(f"   export OPENAI_BASE_URL={server.url}")
+    print(f"   Stats: http://{args.host}:{server.server_address[1]}/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping server")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Per-unit synthesis timing
+Synthesizes the broadcast one unit at a time (pitch line, at-bat outcome, inning
+summary), measures each unit's decoded duration as it comes back, and writes a
+cumulative timing map next to the audio - so the mixer gets exact pitch offsets
+with no estimation and no second analysis pass
+"""
+
+import json
+import os
+
+from mp3_frames import mp3_duration_seconds, stitch_mp3
+from tts_backends import synthesize_chunks
+
+
+def timing_path(audio_file):
+    """Where the timing map for an audio file lives (<audio>.timing.json)"""
+    return os.path.splitext(audio_file)[0] + ".timing.json"
+
+
+def synthesize_units(units, output_file, backend, max_workers=4, max_retries=3, stats=None):
+    """
+    Synthesize broadcast units separately, stitch them and record where each one lands
+
+    Whitespace-only units are not spoken. Each unit's duration is counted from its
+    MP3 frames, which are copied unchanged into the stitched file, so the offsets
+    are exact for the audio written.
+
+    Args:
+        units: Units from generate_broadcast.generate_broadcast_units
+        output_file: MP3 file to write (the timing map goes next to it)
+        backend: TTSBackend to use
+        max_workers: Concurrent TTS requests
+        max_retries: Retries per unit on rate limits and server errors
+        stats: Optional tts_backends.SynthesisStats
+
+    Returns:
+        Timing map dict (as saved)
+    """
+    spoken = [unit for unit in units if unit['text'].strip()]
+    audio_chunks = synthesize_chunks(
+        backend, [unit['text'].strip() for unit in spoken],
+        max_workers=max_workers,
+        max_retries=max_retries,
+        stats=stats,
+        response_format="mp3"
+    )
+
+    entries = []
+    pitches = {}
+    position_ms = 0.0
+    for unit, chunk in zip(spoken, audio_chunks):
+        duration_ms = mp3_duration_seconds(chunk) * 1000
+        entries.append({
+            'kind': unit['kind'],
+            'pitch_index': unit['pitch_index'],
+            'start_ms': round(position_ms, 3),
+            'duration_ms': round(duration_ms, 3),
+        })
+        if unit['pitch_index'] is not None:
+            span = pitches.setdefault(str(unit['pitch_index']), {'start_ms': round(position_ms, 3)})
+            span['end_ms'] = round(position_ms + duration_ms, 3)
+        position_ms += duration_ms
+
+    with open(output_file, 'wb') as f:
+        f.write(stitch_mp3(audio_chunks))
+
+    timing = {
+        'audio': os.path.basename(output_file),
+        'duration_ms': round(position_ms, 3),
+        'units': entries,
+        'pitches': pitches,
+    }
+    with open(timing_path(output_file), 'w') as f:
+        json.dump(timing, f, indent=1)
+    return timing
+
+
+def load_timing(audio_file):
+    """
+    Timing map saved next to an audio file
+
+    Returns:
+        dict, or None if the audio was synthesized without timing
+    """
+    try:
+        with open(timing_path(audio_file)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def apply_timing(pitch_events, timing, anchor="end"):
+    """
+    Set each pitch event's timestamp_ms from a timing map
+
+    Args:
+        pitch_events: Event dicts in broadcast pitch order (pitch_index = list position)
+        timing: Timing map from synthesize_units / load_timing
+        anchor: "end" puts the event right after the pitch's narration (outcome
+            included), "start" right before it
+
+    Returns:
+        Number of events that got a timestamp
+    """
+    key = 'end_ms' if anchor == "end" else 'start_ms'
+    applied = 0
+    for index, event in enumerate(pitch_events):
+        span = timing['pitches'].get(str(index))
+        if span is not None:
+            event['timestamp_ms'] = int(round(span[key]))
+            applied += 1
+    return applied